@@ -0,0 +1,114 @@
+"""
+Suivi groupé de l'activité des utilisateurs
+
+Le middleware ne fait plus d'UPDATE par requête: la dernière activité de chaque
+utilisateur (et de sa session, repérée par le claim sid du token JWT) est gardée en
+mémoire puis écrite par deux UPDATE groupés toutes les
+USER_ACTIVITY_FLUSH_INTERVAL secondes, par un thread du processus (démarré à la
+première activité notée): un worker inactif écrit aussi ses dernières activités.
+Un utilisateur est donc écrit au plus une fois par intervalle, quel que soit son
+nombre de requêtes. À l'arrêt du processus, la file est vidée si la base est
+encore accessible.
+
+L'intervalle doit rester inférieur à la fenêtre « en ligne » de UserSession
+(5 minutes). Les vues qui lisent l'activité (sessions actives, utilisateurs
+connectés) vident la file avant de lire.
+"""
+import atexit
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityTracker:
+    """Dernières activités en attente d'écriture, par utilisateur et par session"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users = {}  # user_id -> datetime
+        self._sessions = {}  # clé de session (claim sid) -> datetime
+        self._pid = os.getpid()
+        self._thread = None
+        self._wakeup = threading.Event()
+        self._stopping = False
+
+    @property
+    def interval(self):
+        return getattr(settings, 'USER_ACTIVITY_FLUSH_INTERVAL', 60)
+
+    def touch(self, user_id, session_id=None, when=None):
+        """Note l'activité de l'utilisateur (et de la session `session_id`) sans écrire en base"""
+        when = when or timezone.now()
+        with self._lock:
+            if self._pid != os.getpid():
+                # Processus forké: l'état et le thread du parent ne concernent pas ce worker
+                self._users, self._sessions, self._pid, self._thread = {}, {}, os.getpid(), None
+            self._users[user_id] = when
+            if session_id:
+                self._sessions[session_id] = when
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name='user-activity-writer', daemon=True)
+                self._thread.start()
+
+    def pending(self):
+        with self._lock:
+            return {'users': len(self._users), 'sessions': len(self._sessions)}
+
+    def flush(self):
+        """Écrit les activités en attente (un UPDATE pour les utilisateurs, un pour les sessions)"""
+        from .models import User, UserSession
+
+        with self._lock:
+            users, self._users = self._users, {}
+            sessions, self._sessions = self._sessions, {}
+        if not users and not sessions:
+            return 0
+
+        if users:
+            User.objects.filter(id__in=users).update(last_activity=Case(
+                *[When(id=user_id, then=Value(when)) for user_id, when in users.items()],
+                output_field=DateTimeField(),
+            ))
+        if sessions:
+            UserSession.objects.filter(session_id__in=sessions, is_active=True).update(last_activity=Case(
+                *[When(session_id=session_id, then=Value(when)) for session_id, when in sessions.items()],
+                output_field=DateTimeField(),
+            ))
+        return len(users) + len(sessions)
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(self.interval)
+            if self._stopping:
+                break
+            try:
+                close_old_connections()
+                self.flush()
+            except Exception:
+                logger.exception('Erreur du thread d\'écriture de l\'activité des utilisateurs')
+        connection.close()
+
+    def shutdown(self):
+        """Vide la file à l'arrêt du processus, sans erreur si la base n'est plus disponible"""
+        self._stopping = True
+        self._wakeup.set()
+        if self._pid != os.getpid() or not (self._users or self._sessions):
+            return
+        try:
+            self.flush()
+        except DatabaseError:
+            # Base déjà fermée ou détruite (fin des tests, arrêt de Django): rien à sauver
+            logger.debug('Activité des utilisateurs non écrite à l\'arrêt', exc_info=True)
+
+
+activity_tracker = ActivityTracker()
+atexit.register(activity_tracker.shutdown)
@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class AuthenticationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.authentication'
\ No newline at end of file
+    name = 'apps.authentication'
+    
+    def ready(self):
+        import apps.authentication.signals
@@ -0,0 +1,50 @@
+"""
+Authentification JWT avec résolution de l'utilisateur en cache
+"""
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .cache import CACHED_USER_FIELDS, cache_user, cached_user_fields, user_cache_enabled
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication sans requête User quand l'utilisateur est en cache
+    (cache partagé entre processus uniquement, voir cache.py).
+
+    L'utilisateur renvoyé est une instance partielle: seuls id, role, is_active et
+    must_change_password sont chargés; le premier accès à un autre champ charge
+    tous les autres en une requête (User.refresh_from_db).
+    """
+
+    def get_user(self, validated_token):
+        if getattr(api_settings, 'CHECK_REVOKE_TOKEN', False) or not user_cache_enabled():
+            # Hash du mot de passe comparé, ou cache propre au processus: pas de cache
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        fields = cached_user_fields(user_id)
+        if fields is None:
+            user = super().get_user(validated_token)
+            cache_user(user)
+            return user
+
+        if getattr(api_settings, 'CHECK_USER_IS_ACTIVE', True) and not fields['is_active']:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        return self._partial_user(user_id, fields)
+
+    def _partial_user(self, user_id, fields):
+        model = self.user_model
+        values = {api_settings.USER_ID_FIELD: user_id, **fields}
+        attnames = [
+            field.attname for field in model._meta.concrete_fields
+            if field.attname in values
+        ]
+        return model.from_db(model.objects.db, attnames, [values[name] for name in attnames])
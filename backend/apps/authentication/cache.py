@@ -0,0 +1,61 @@
+"""
+Cache des utilisateurs authentifiés par JWT
+
+L'entrée d'un utilisateur ne contient que les champs utilisés par les contrôles
+de permission (CACHED_USER_FIELDS). Elle est rangée sous une clé qui contient un
+numéro de version propre à l'utilisateur: invalider revient à incrémenter cette
+version (à chaque save/delete de User, donc changement de rôle, désactivation,
+changement de mot de passe).
+
+Le cache n'est utilisé que s'il est commun à tous les processus (Redis,
+Memcached, base: voir apps/products/cache.py). Avec un cache propre au
+processus (LocMemCache), une désactivation ou un changement de rôle fait dans
+un autre worker ou par une commande (reset_password) ne serait pas vu avant
+AUTH_USER_CACHE_TIMEOUT: l'utilisateur est alors relu en base à chaque requête.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.products.cache import shared_cache
+
+
+CACHED_USER_FIELDS = ('role', 'is_active', 'must_change_password')
+
+
+def user_cache_enabled():
+    return shared_cache()
+
+
+def _version_key(user_id):
+    return f'auth:user_version:{user_id}'
+
+
+def user_cache_version(user_id):
+    return cache.get_or_set(_version_key(user_id), 1, None)
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}:{user_cache_version(user_id)}'
+
+
+def cache_user(user):
+    cache.set(
+        user_cache_key(user.pk),
+        {field: getattr(user, field) for field in CACHED_USER_FIELDS},
+        getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 300),
+    )
+
+
+def cached_user_fields(user_id):
+    """Champs en cache de l'utilisateur, ou None"""
+    return cache.get(user_cache_key(user_id))
+
+
+def invalidate_user(user_id):
+    """Invalide l'entrée en cache d'un utilisateur"""
+    if not user_cache_enabled():
+        return
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        cache.set(_version_key(user_id), 2, None)
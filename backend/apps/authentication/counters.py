@@ -0,0 +1,124 @@
+"""
+Compteur dénormalisé des notifications non lues (NotificationCounter)
+
+Le badge (NotificationViewSet.unread_count) lit une ligne par clé primaire au lieu
+d'un COUNT(*) sur les notifications. Le compteur est modifié dans la même
+transaction que les notifications:
+- add_unread   après insertion (send_notifications, create_notification) ou
+               suppression de non lues (compactage, apps/authentication/retention.py);
+- mark_read    passage en lues, d'une liste de notifications ou de toutes.
+Les compteurs manquants (nouvel utilisateur) sont créés à partir du décompte réel.
+Une dérive (notifications supprimées, écriture directe en base) est corrigée par
+repair(), lancé périodiquement: python manage.py repair_notification_counters
+"""
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Notification, NotificationCounter, User
+
+
+def count_unread(user_ids=None):
+    """Décompte réel des non lues par utilisateur (tous les utilisateurs si user_ids est None)"""
+    queryset = Notification.objects.filter(is_read=False)
+    if user_ids is not None:
+        queryset = queryset.filter(user_id__in=user_ids)
+    return dict(
+        queryset.order_by().values('user_id').annotate(total=Count('id')).values_list('user_id', 'total')
+    )
+
+
+def _initialize(user_ids):
+    """Crée les compteurs manquants à partir du décompte réel"""
+    counts = count_unread(user_ids)
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(user_id=user_id, unread=counts.get(user_id, 0)) for user_id in user_ids],
+        ignore_conflicts=True,
+    )
+
+
+def unread_counts(user_ids):
+    """Nombre de non lues de chaque utilisateur: {user_id: compteur}"""
+    user_ids = set(user_ids)
+    counts = dict(NotificationCounter.objects.filter(user_id__in=user_ids).values_list('user_id', 'unread'))
+    missing = user_ids - counts.keys()
+    if missing:
+        _initialize(missing)
+        counts.update(NotificationCounter.objects.filter(user_id__in=missing).values_list('user_id', 'unread'))
+    return counts
+
+
+def unread_count(user_id):
+    return unread_counts([user_id]).get(user_id, 0)
+
+
+def add_unread(counts):
+    """
+    Ajoute counts[user_id] au compteur de chaque utilisateur: nombre de notifications
+    non lues déjà insérées (ou supprimées, si négatif)
+    """
+    if not counts:
+        return
+    updated = NotificationCounter.objects.filter(user_id__in=counts).update(unread=Greatest(
+        F('unread') + Case(
+            *[When(user_id=user_id, then=Value(count)) for user_id, count in counts.items()],
+            default=Value(0),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    ))
+    if updated < len(counts):
+        existing = set(NotificationCounter.objects.filter(user_id__in=counts).values_list('user_id', flat=True))
+        # Le décompte réel inclut déjà les notifications qui viennent d'être insérées
+        _initialize(set(counts) - existing)
+
+
+def mark_read(user_id, notification_ids=None, when=None):
+    """
+    Marque comme lues les notifications `notification_ids` de l'utilisateur (toutes si None).
+    Renvoie (nombre de notifications modifiées, nouveau nombre de non lues).
+    """
+    with transaction.atomic():
+        # Verrou du compteur: les insertions concurrentes attendent la fin du passage en lues
+        counter = NotificationCounter.objects.select_for_update().filter(user_id=user_id).first()
+        if counter is None:
+            _initialize([user_id])
+            counter = NotificationCounter.objects.select_for_update().get(user_id=user_id)
+
+        queryset = Notification.objects.filter(user_id=user_id, is_read=False)
+        if notification_ids is not None:
+            queryset = queryset.filter(pk__in=notification_ids)
+        updated = queryset.update(is_read=True, read_at=when or timezone.now())
+
+        unread = 0 if notification_ids is None else max(counter.unread - updated, 0)
+        if unread != counter.unread:
+            NotificationCounter.objects.filter(user_id=user_id).update(unread=unread)
+    return updated, unread
+
+
+def repair(dry_run=False):
+    """
+    Recale chaque compteur sur le décompte réel et crée les compteurs manquants.
+    Renvoie (écarts [(user_id, compteur, réel)], ids des utilisateurs sans compteur).
+    """
+    # Compteurs lus avant le décompte: une insertion entre les deux lectures modifie
+    # le compteur, et la mise à jour conditionnelle ci-dessous l'ignore alors
+    counters = dict(NotificationCounter.objects.values_list('user_id', 'unread'))
+    actual = count_unread()
+    missing = set(User.objects.values_list('id', flat=True)) - counters.keys()
+
+    ecarts = [
+        (user_id, unread, actual.get(user_id, 0))
+        for user_id, unread in counters.items()
+        if unread != actual.get(user_id, 0)
+    ]
+    if dry_run:
+        return ecarts, missing
+
+    for user_id, unread, reel in ecarts:
+        # Condition sur l'ancienne valeur: un compteur modifié entre-temps n'est pas écrasé
+        NotificationCounter.objects.filter(user_id=user_id, unread=unread).update(unread=reel)
+    if missing:
+        _initialize(missing)
+    return ecarts, missing
@@ -0,0 +1,139 @@
+"""
+Bus d'événements métier
+
+Les modèles (via leurs signaux) publient des événements typés: order_created,
+order_status_changed, payment_received, stock_low, catalog_changed...
+Dans une transaction, les événements sont retenus jusqu'au commit (rien n'est
+envoyé si la transaction est annulée), dédupliqués sur (nom, clé) puis remis une
+seule fois, par lots, aux gestionnaires abonnés (notifications, logs, cache).
+Hors transaction, ils sont remis immédiatement.
+
+Chaque événement enregistre un callback transaction.on_commit; Django abandonne
+ceux des savepoints annulés. Le premier callback exécuté après le commit remet
+d'un coup les événements dont le callback existe encore (références faibles,
+libérées dès l'abandon par Django), les autres callbacks ne font plus rien.
+
+    event_bus.publish('stock_low', produit.id, nom=produit.nom, stock=produit.stock_actuel)
+
+    @event_bus.subscribe('stock_low')
+    def notifier_stock_faible(events):
+        ...  # events: liste d'Event (nom, cle, donnees)
+
+Publications répétées d'un même événement: les données des suivantes complètent
+celles de la première, sauf les champs de STICKY_FIELDS (ex. l'ancien statut
+d'une commande passée par plusieurs statuts dans la même transaction).
+"""
+import logging
+import threading
+import weakref
+from collections import OrderedDict, defaultdict, namedtuple
+
+from django.db import transaction
+
+
+logger = logging.getLogger(__name__)
+
+Event = namedtuple('Event', ['nom', 'cle', 'donnees'])
+
+STICKY_FIELDS = ('ancien_statut',)
+
+
+class _Confirmation:
+    """
+    Callback on_commit d'un événement. Django ne garde que les callbacks des
+    savepoints validés: un callback encore référencé au moment du commit est
+    celui d'un événement confirmé.
+    """
+
+    def __init__(self, bus, event):
+        self.bus = bus
+        self.event = event
+        self.done = False
+
+    def __call__(self):
+        if not self.done:
+            self.bus._dispatch_confirmed()
+
+
+class EventBus:
+    """Publication, déduplication par transaction et remise groupée des événements"""
+
+    def __init__(self):
+        self._handlers = defaultdict(list)
+        self._local = threading.local()
+
+    def subscribe(self, *noms):
+        """Décorateur: abonne un gestionnaire (appelé avec une liste d'Event) aux événements `noms`"""
+        def decorator(handler):
+            for nom in noms:
+                if handler not in self._handlers[nom]:
+                    self._handlers[nom].append(handler)
+            return handler
+        return decorator
+
+    def publish(self, nom, cle, /, **donnees):
+        event = Event(nom, cle, donnees)
+        if not transaction.get_connection().in_atomic_block:
+            self.dispatch([event])
+            return
+        confirmation = _Confirmation(self, event)
+        transaction.on_commit(confirmation)
+        # Références faibles: celles des savepoints annulés (et des transactions
+        # annulées) disparaissent avec les callbacks que Django abandonne
+        pending = self._pending()
+        pending[:] = [ref for ref in pending if ref() is not None]
+        pending.append(weakref.ref(confirmation))
+
+    def dispatch(self, events):
+        """Remet les événements aux gestionnaires, un appel par gestionnaire et par type"""
+        par_nom = OrderedDict()
+        for event in events:
+            par_nom.setdefault(event.nom, []).append(event)
+        for nom, lot in par_nom.items():
+            for handler in self._handlers.get(nom, []):
+                try:
+                    handler(lot)
+                except Exception:
+                    # Un gestionnaire en erreur ne doit pas bloquer les autres
+                    logger.exception(f"Erreur du gestionnaire {handler.__name__} pour '{nom}'")
+
+    # ------------------------------------------------------------------ interne
+
+    def _pending(self):
+        pending = getattr(self._local, 'pending', None)
+        if pending is None:
+            pending = self._local.pending = []
+        return pending
+
+    def _dispatch_confirmed(self):
+        """
+        Premier callback exécuté après le commit: remet en un lot tous les événements
+        confirmés de la transaction (les callbacks suivants n'ont plus rien à faire)
+        """
+        confirmations = [ref() for ref in self._pending()]
+        self._local.pending = []
+        committed = OrderedDict()
+        for confirmation in confirmations:
+            if confirmation is None:
+                continue  # savepoint ou transaction annulé
+            confirmation.done = True
+            self._merge(committed, confirmation.event)
+        if committed:
+            self.dispatch(list(committed.values()))
+
+    @staticmethod
+    def _merge(committed, event):
+        """Déduplication sur (nom, clé): les données suivantes complètent les premières"""
+        key = (event.nom, event.cle)
+        previous = committed.get(key)
+        if previous is None:
+            committed[key] = event
+            return
+        donnees = {**previous.donnees, **event.donnees}
+        for champ in STICKY_FIELDS:
+            if champ in previous.donnees:
+                donnees[champ] = previous.donnees[champ]
+        committed[key] = Event(event.nom, event.cle, donnees)
+
+
+event_bus = EventBus()
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.authentication.models import UserSession
+
+
+class Command(BaseCommand):
+    help = (
+        'Désactive les sessions sans activité depuis USER_SESSION_STALE_HOURS heures '
+        '(à planifier périodiquement: garde petit l\'index des sessions actives)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=None,
+                            help='Inactivité en heures (défaut: settings.USER_SESSION_STALE_HOURS)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Affiche le nombre de sessions concernées sans les modifier')
+
+    def handle(self, *args, **options):
+        if options['hours'] is not None and options['hours'] < 1:
+            raise CommandError('--hours doit être supérieur à 0')
+
+        if options['dry_run']:
+            count = UserSession.objects.stale(options['hours']).count()
+            self.stdout.write(f'{count} session(s) à désactiver (aucune modification effectuée)')
+            return
+
+        count = UserSession.cleanup_old_sessions(options['hours'])
+        self.stdout.write(self.style.SUCCESS(f'{count} session(s) désactivée(s)'))
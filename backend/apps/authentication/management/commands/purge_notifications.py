@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.authentication.retention import apply_retention, retention_settings
+
+
+class Command(BaseCommand):
+    help = (
+        'Supprime les notifications lues expirées et regroupe les non lues anciennes '
+        'de même type et même objet en une notification résumé (par lots)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Affiche le nombre de notifications concernées sans rien modifier')
+        parser.add_argument('--read-days', type=int, default=None,
+                            help='Âge des notifications lues à supprimer (défaut: NOTIFICATION_READ_RETENTION_DAYS, 0 = aucune)')
+        parser.add_argument('--compact-days', type=int, default=None,
+                            help='Âge des non lues à regrouper (défaut: NOTIFICATION_COMPACT_AFTER_DAYS, 0 = aucun)')
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Nombre de notifications lues supprimées par lot (défaut: 5000)')
+        parser.add_argument('--user-chunk-size', type=int, default=200,
+                            help="Nombre d'utilisateurs compactés par transaction (défaut: 200)")
+        parser.add_argument('--pause', type=float, default=0,
+                            help='Pause en secondes entre deux lots (défaut: 0)')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1 or options['user_chunk_size'] < 1:
+            raise CommandError('--chunk-size et --user-chunk-size doivent être supérieurs à 0')
+        for option in ('read_days', 'compact_days'):
+            if options[option] is not None and options[option] < 0:
+                raise CommandError(f"--{option.replace('_', '-')} ne peut pas être négatif")
+
+        read_days, compact_days = retention_settings()
+        read_days = read_days if options['read_days'] is None else options['read_days']
+        compact_days = compact_days if options['compact_days'] is None else options['compact_days']
+
+        debut = time.monotonic()
+        resultat = apply_retention(
+            read_days=read_days,
+            compact_days=compact_days,
+            chunk_size=options['chunk_size'],
+            user_chunk_size=options['user_chunk_size'],
+            pause=options['pause'],
+            dry_run=options['dry_run'],
+        )
+        if read_days:
+            self.stdout.write(f"Lues de plus de {read_days} jours: {resultat['purged']}")
+        if compact_days:
+            self.stdout.write(f"Non lues de plus de {compact_days} jours regroupées: {resultat['compacted']}")
+
+        total = resultat['purged'] + resultat['compacted']
+        if options['dry_run']:
+            self.stdout.write(f'{total} notification(s) à supprimer (aucune modification effectuée)')
+        else:
+            duree = time.monotonic() - debut
+            self.stdout.write(self.style.SUCCESS(f'{total} notification(s) supprimée(s) en {duree:.2f}s'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from apps.authentication.counters import repair
+
+
+class Command(BaseCommand):
+    help = (
+        'Recale les compteurs de notifications non lues sur le décompte réel '
+        '(à planifier périodiquement, ex. toutes les heures)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Affiche les écarts sans modifier la base')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        ecarts, missing = repair(dry_run=dry_run)
+
+        for user_id, unread, reel in ecarts:
+            self.stdout.write(f'Utilisateur #{user_id}: {unread} -> {reel} ({reel - unread:+d})')
+        if missing:
+            self.stdout.write(f'{len(missing)} compteur(s) manquant(s)' + ('' if dry_run else ' créé(s)'))
+
+        if dry_run:
+            self.stdout.write(f'{len(ecarts)} compteur(s) à corriger (aucune modification effectuée)')
+            return
+        self.stdout.write(self.style.SUCCESS(f'{len(ecarts)} compteur(s) corrigé(s)'))
@@ -1,13 +1,14 @@
 """
 Middleware pour mettre à jour l'activité des sessions utilisateurs
 """
-from django.utils import timezone
 
 
 class UpdateUserActivityMiddleware:
     """
-    Middleware qui met à jour la dernière activité de l'utilisateur
-    et de sa session à chaque requête authentifiée
+    Middleware qui note la dernière activité de l'utilisateur
+    et de sa session à chaque requête authentifiée.
+
+    L'écriture en base est groupée et différée (apps/authentication/activity.py).
     """
     
     def __init__(self, get_response):
@@ -21,29 +22,12 @@ class UpdateUserActivityMiddleware:
         if hasattr(request, 'user') and request.user and request.user.is_authenticated:
             try:
                 # Import ici pour éviter les erreurs de chargement
-                from apps.authentication.models import UserSession
-                
-                now = timezone.now()
+                from apps.authentication.activity import activity_tracker
                 
-                # Mettre à jour la dernière activité de l'utilisateur
-                if hasattr(request.user, 'last_activity'):
-                    request.user.last_activity = now
-                    request.user.save(update_fields=['last_activity'])
+                from apps.authentication.models import session_key
                 
-                # Extraire le token depuis l'en-tête Authorization
-                auth_header = request.META.get('HTTP_AUTHORIZATION', '')
-                if auth_header.startswith('Bearer '):
-                    token = auth_header[7:][:100]  # Premières 100 caractères du token
-                    
-                    # Trouver et mettre à jour la session correspondante
-                    sessions = UserSession.objects.filter(
-                        user=request.user,
-                        token__startswith=token[:50],  # Comparaison partielle
-                        is_active=True
-                    )
-                    
-                    if sessions.exists():
-                        sessions.update(last_activity=now)
+                # Session repérée par le claim sid du token validé par JWTAuthentication
+                activity_tracker.touch(request.user.pk, session_key(getattr(request, 'auth', None)))
                     
             except Exception as e:
                 # Ne pas bloquer la requête en cas d'erreur
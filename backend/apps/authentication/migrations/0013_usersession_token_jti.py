@@ -0,0 +1,51 @@
+# Generated by Django 4.2.30 on 2026-10-19 19:18
+
+import base64
+import json
+
+from django.db import migrations, models
+
+
+def jti_from_token(token):
+    """Claim jti lu dans la charge utile du JWT stocké (sans vérification de signature)"""
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        return json.loads(base64.urlsafe_b64decode(payload)).get('jti')
+    except (IndexError, ValueError, AttributeError):
+        return None
+
+
+def backfill_token_jti(apps, schema_editor):
+    """Renseigne token_jti pour les sessions existantes (jetons tronqués ou illisibles ignorés)"""
+    UserSession = apps.get_model('authentication', 'UserSession')
+    vus = set()
+    a_modifier = []
+    for session in UserSession.objects.filter(token_jti__isnull=True).only('id', 'token').iterator():
+        jti = jti_from_token(session.token)
+        if not jti or jti in vus or len(jti) > 64:
+            continue
+        vus.add(jti)
+        session.token_jti = jti
+        a_modifier.append(session)
+    UserSession.objects.bulk_update(a_modifier, ['token_jti'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0012_add_password_reset_token'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='usersession',
+            name='user_sessio_token_7a1a38_idx',
+        ),
+        migrations.AddField(
+            model_name='usersession',
+            name='token_jti',
+            field=models.CharField(blank=True, help_text="Claim jti du token d'accès, clé de recherche exacte de la session", max_length=64, null=True, unique=True, verbose_name='Identifiant du token (jti)'),
+        ),
+        migrations.RunPython(backfill_token_jti, migrations.RunPython.noop),
+    ]
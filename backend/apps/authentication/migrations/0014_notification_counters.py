@@ -0,0 +1,49 @@
+# Generated by Django 4.2.30 on 2026-10-19 19:33
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def create_counters(apps, schema_editor):
+    """Un compteur par utilisateur, initialisé au nombre réel de notifications non lues"""
+    User = apps.get_model('authentication', 'User')
+    Notification = apps.get_model('authentication', 'Notification')
+    NotificationCounter = apps.get_model('authentication', 'NotificationCounter')
+    counts = dict(
+        Notification.objects.filter(is_read=False).order_by()
+        .values('user_id').annotate(total=Count('id')).values_list('user_id', 'total')
+    )
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(user_id=user_id, unread=counts.get(user_id, 0))
+         for user_id in User.objects.values_list('id', flat=True)],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0013_usersession_token_jti'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notification_counter', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+                ('unread', models.PositiveIntegerField(default=0, verbose_name='Non lues')),
+            ],
+            options={
+                'verbose_name': 'Compteur de notifications',
+                'verbose_name_plural': 'Compteurs de notifications',
+                'db_table': 'notification_counters',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'is_read', '-created_at'], name='notif_user_read_created_idx'),
+        ),
+        migrations.RunPython(create_counters, migrations.RunPython.noop),
+    ]
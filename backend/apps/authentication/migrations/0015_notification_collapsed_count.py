@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 19:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0014_notification_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='collapsed_count',
+            field=models.PositiveIntegerField(default=1, help_text='Nombre de notifications résumées par cette ligne (compactage, apps/authentication/retention.py)', verbose_name='Notifications regroupées'),
+        ),
+    ]
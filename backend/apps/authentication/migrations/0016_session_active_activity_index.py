@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 19:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0015_notification_collapsed_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='usersession',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['user', '-last_activity'], name='session_active_activity_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 19:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0016_session_active_activity_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='usersession',
+            name='token_jti',
+            field=models.CharField(blank=True, help_text='Claim sid des tokens (jti du refresh token de connexion), clé de recherche exacte de la session', max_length=64, null=True, unique=True, verbose_name='Identifiant du token (jti)'),
+        ),
+    ]
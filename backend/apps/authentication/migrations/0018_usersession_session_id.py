@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-19 20:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0017_session_claim'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='usersession',
+            old_name='token_jti',
+            new_name='session_id',
+        ),
+        migrations.AlterField(
+            model_name='usersession',
+            name='session_id',
+            field=models.CharField(blank=True, help_text='Claim sid des tokens: jti du refresh token émis à la connexion, conservé aux rafraîchissements (différent du jti des access tokens). Sessions antérieures au claim sid: jti de leur token', max_length=64, null=True, unique=True, verbose_name='Identifiant de session'),
+        ),
+    ]
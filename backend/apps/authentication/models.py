@@ -1,6 +1,8 @@
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.core.validators import RegexValidator, MinValueValidator, MaxValueValidator
+from django.db.models.functions import RowNumber
 from django.utils import timezone
 
 
@@ -87,6 +89,14 @@ class User(AbstractUser):
             self.must_change_password = True
         super().save(*args, **kwargs)
 
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        # Instance partielle (cache d'authentification): le premier champ différé
+        # lu charge tous les champs différés en une seule requête
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred and set(fields) <= deferred:
+            fields = deferred
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+
     def __str__(self):
         return f"{self.username} ({self.get_role_display()})"
 
@@ -355,22 +365,119 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False, verbose_name='Lue')
     read_at = models.DateTimeField(null=True, blank=True, verbose_name='Lue le')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Créée le')
+    collapsed_count = models.PositiveIntegerField(
+        default=1,
+        verbose_name='Notifications regroupées',
+        help_text='Nombre de notifications résumées par cette ligne (compactage, apps/authentication/retention.py)'
+    )
     
     class Meta:
         db_table = 'notifications'
         ordering = ['-created_at']
         verbose_name = 'Notification'
         verbose_name_plural = 'Notifications'
+        indexes = [
+            # Liste et non lues d'un utilisateur, les plus récentes d'abord
+            models.Index(fields=['user', 'is_read', '-created_at'], name='notif_user_read_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.user.email}"
     
     def mark_as_read(self):
-        """Marquer la notification comme lue"""
-        from django.utils import timezone
+        """
+        Marquer la notification comme lue (et décrémenter le compteur de non lues).
+        Renvoie le nouveau nombre de notifications non lues de l'utilisateur.
+        """
+        from .counters import mark_read
+        self.read_at = self.read_at or timezone.now()
         self.is_read = True
-        self.read_at = timezone.now()
-        self.save()
+        return mark_read(self.user_id, [self.pk], when=self.read_at)[1]
+
+
+class NotificationCounter(models.Model):
+    """
+    Nombre de notifications non lues par utilisateur (dénormalisé, apps/authentication/counters.py).
+    Réparé périodiquement par: python manage.py repair_notification_counters
+    """
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='notification_counter',
+        verbose_name='Utilisateur'
+    )
+    unread = models.PositiveIntegerField(default=0, verbose_name='Non lues')
+
+    class Meta:
+        db_table = 'notification_counters'
+        verbose_name = 'Compteur de notifications'
+        verbose_name_plural = 'Compteurs de notifications'
+
+    def __str__(self):
+        return f"{self.user_id}: {self.unread} non lue(s)"
+
+
+# Claim des tokens JWT qui identifie la UserSession: jti du refresh token émis à la
+# connexion, copié dans chaque access token dérivé et conservé par la rotation
+# (le jti de l'access token change à chaque /auth/token/refresh/)
+SESSION_CLAIM = 'sid'
+
+
+def session_key(token):
+    """
+    Identifiant de session (UserSession.session_id) d'un token validé: son claim sid.
+    Repli sur le jti pour les tokens émis avant le claim sid, dont la session a été
+    enregistrée sous ce jti (migration 0013); ils expirent d'eux-mêmes.
+    """
+    if token is None or not hasattr(token, 'get'):
+        return None
+    return token.get(SESSION_CLAIM) or token.get('jti')
+
+
+def online_since():
+    """Début de la fenêtre « en ligne »: activité dans les 5 dernières minutes"""
+    return timezone.now() - timezone.timedelta(minutes=5)
+
+
+class UserSessionQuerySet(models.QuerySet):
+    """Requêtes ensemblistes sur les sessions (en ligne, dernière par utilisateur, périmées)"""
+
+    def active(self):
+        """Sessions actives et en ligne"""
+        return self.filter(is_active=True, last_activity__gte=online_since())
+
+    def with_online(self):
+        """Annote `online` (lu par UserSession.is_online) au lieu d'un calcul Python par objet"""
+        return self.annotate(online=models.Case(
+            models.When(is_active=True, last_activity__gte=online_since(), then=models.Value(True)),
+            default=models.Value(False),
+            output_field=models.BooleanField(),
+        ))
+
+    def latest_per_user(self):
+        """
+        Session la plus récente de chaque utilisateur, annotée de `user_sessions`
+        (nombre de sessions de l'utilisateur dans le queryset): fonctions de fenêtre, une requête
+        """
+        return self.annotate(
+            rang=models.Window(
+                RowNumber(),
+                partition_by=[models.F('user_id')],
+                order_by=[models.F('last_activity').desc(), models.F('id').desc()],
+            ),
+            user_sessions=models.Window(models.Count('id'), partition_by=[models.F('user_id')]),
+        ).filter(rang=1)
+
+    def stale(self, hours=None):
+        """Sessions encore actives sans activité depuis `hours` heures (USER_SESSION_STALE_HOURS)"""
+        hours = hours if hours is not None else getattr(settings, 'USER_SESSION_STALE_HOURS', 24)
+        return self.filter(is_active=True, last_activity__lt=timezone.now() - timezone.timedelta(hours=hours))
+
+    def deactivate(self):
+        """Déconnecte les sessions en un UPDATE; renvoie le nombre de sessions modifiées"""
+        return self.update(is_active=False, logout_time=timezone.now())
 
 
 class UserSession(models.Model):
@@ -387,6 +494,18 @@ class UserSession(models.Model):
         unique=True,
         verbose_name='Token JWT'
     )
+    session_id = models.CharField(
+        max_length=64,
+        unique=True,
+        null=True,
+        blank=True,
+        verbose_name='Identifiant de session',
+        help_text=(
+            'Claim sid des tokens: jti du refresh token émis à la connexion, conservé aux '
+            'rafraîchissements (différent du jti des access tokens). Sessions antérieures '
+            'au claim sid: jti de leur token'
+        )
+    )
     ip_address = models.GenericIPAddressField(
         null=True,
         blank=True,
@@ -418,6 +537,8 @@ class UserSession(models.Model):
         blank=True,
         verbose_name='Heure de déconnexion'
     )
+
+    objects = UserSessionQuerySet.as_manager()
     
     class Meta:
         db_table = 'user_sessions'
@@ -426,7 +547,13 @@ class UserSession(models.Model):
         verbose_name_plural = 'Sessions utilisateurs'
         indexes = [
             models.Index(fields=['user', 'is_active']),
-            models.Index(fields=['token']),
+            # Index partiel: seules les sessions actives (les périmées sont désactivées
+            # par manage.py deactivate_stale_sessions), dernière activité par utilisateur
+            models.Index(
+                fields=['user', '-last_activity'],
+                condition=models.Q(is_active=True),
+                name='session_active_activity_idx',
+            ),
         ]
     
     def __str__(self):
@@ -441,10 +568,9 @@ class UserSession(models.Model):
     @property
     def is_online(self):
         """Vérifie si l'utilisateur est en ligne (actif dans les 5 dernières minutes)"""
-        if not self.is_active:
-            return False
-        time_threshold = timezone.now() - timezone.timedelta(minutes=5)
-        return self.last_activity >= time_threshold
+        if 'online' in self.__dict__:
+            return self.online  # annotation de UserSession.objects.with_online()
+        return self.is_active and self.last_activity >= online_since()
     
     def logout(self):
         """Marquer la session comme déconnectée"""
@@ -455,23 +581,12 @@ class UserSession(models.Model):
     @classmethod
     def get_active_sessions(cls):
         """Récupérer toutes les sessions actives"""
-        time_threshold = timezone.now() - timezone.timedelta(minutes=5)
-        return cls.objects.filter(
-            is_active=True,
-            last_activity__gte=time_threshold
-        ).select_related('user')
+        return cls.objects.active().with_online().select_related('user')
     
     @classmethod
-    def cleanup_old_sessions(cls):
-        """Nettoyer les sessions inactives depuis plus de 24h"""
-        time_threshold = timezone.now() - timezone.timedelta(hours=24)
-        inactive_sessions = cls.objects.filter(
-            is_active=True,
-            last_activity__lt=time_threshold
-        )
-        count = inactive_sessions.count()
-        inactive_sessions.update(is_active=False, logout_time=timezone.now())
-        return count
+    def cleanup_old_sessions(cls, hours=None):
+        """Nettoyer les sessions inactives depuis plus de 24h (un UPDATE, renvoie le nombre)"""
+        return cls.objects.stale(hours).deactivate()
 
 
 class PasswordResetToken(models.Model):
@@ -1,14 +1,172 @@
 """
 Service de notifications pour SYGLA-H2O
 Gère la création automatique des notifications système
+
+Diffusion: les destinataires (utilisateurs actifs des rôles concernés dont les
+préférences autorisent le type de notification) sont lus en une requête, les
+notifications insérées en un bulk_create (avec le compteur de non lues de chaque
+destinataire, apps/authentication/counters.py), le tout dans une tâche différée
+(apps/tasks/runner.py) exécutée après le commit, hors de la requête.
+Les notifications créées sont ensuite poussées aux destinataires connectés par le
+flux SSE (apps/authentication/stream.py).
 """
 
+from collections import Counter
+
 from django.db import transaction
+from django.db.models import Q
 from apps.authentication.models import User, Notification, NotificationPreferences
+from apps.authentication.counters import add_unread
+from apps.authentication.events import event_bus
+from apps.authentication.stream import push_notifications
+from apps.tasks.runner import defer
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Mapping entre types de notification et préférences
+PREFERENCE_MAPPING = {
+    'client_created': 'notify_client_created',
+    'client_updated': 'notify_client_created',
+    'order_created': 'notify_order_created',
+    'order_validated': 'notify_order_validated',
+    'order_updated': 'notify_order_created',
+    'order_cancelled': 'notify_order_created',
+    'delivery_assigned': 'notify_delivery_assigned',
+    'delivery_completed': 'notify_delivery_completed',
+    'stock_low': 'notify_stock_low',
+    'stock_out': 'notify_stock_low',
+    'stock_movement': 'notify_stock_updated',
+    'product_created': 'notify_stock_updated',
+    'product_updated': 'notify_stock_updated',
+    'sale_created': 'notify_order_created',
+    'sale_completed': 'notify_order_created',
+    'payment_received': 'notify_order_created',
+}
+
+# Rôles concernés par type de notification
+ROLE_MAPPING = {
+    'client_created': ['admin', 'vendeur'],
+    'client_updated': ['admin', 'vendeur'],
+    'order_created': ['admin', 'vendeur', 'stock'],
+    'order_validated': ['admin', 'vendeur', 'stock', 'livreur'],
+    'order_updated': ['admin', 'vendeur'],
+    'order_cancelled': ['admin', 'vendeur'],
+    'delivery_assigned': ['admin', 'livreur'],
+    'delivery_completed': ['admin', 'vendeur', 'livreur'],
+    'stock_low': ['admin', 'stock'],
+    'stock_out': ['admin', 'stock'],
+    'stock_movement': ['admin', 'stock'],
+    'product_created': ['admin', 'stock'],
+    'product_updated': ['admin', 'stock'],
+    'sale_created': ['admin', 'vendeur'],
+    'sale_completed': ['admin', 'vendeur'],
+    'payment_received': ['admin', 'vendeur'],
+}
+
+
+def _default_preference(field):
+    return NotificationPreferences._meta.get_field(field).default
+
+
+def recipients_queryset(roles, notification_type, exclude_user_id=None, respect_preferences=True):
+    """
+    Utilisateurs actifs des rôles donnés dont les préférences acceptent le type
+    de notification. Sans ligne NotificationPreferences, les valeurs par défaut
+    du modèle s'appliquent.
+    """
+    users = User.objects.filter(is_active=True, role__in=roles)
+    if exclude_user_id:
+        users = users.exclude(id=exclude_user_id)
+    if not respect_preferences:
+        return users
+
+    preference_field = PREFERENCE_MAPPING.get(notification_type)
+    accepte = Q(notification_preferences__enable_browser_notifications=True)
+    if preference_field:
+        accepte &= Q(**{f'notification_preferences__{preference_field}': True})
+
+    defauts_acceptent = _default_preference('enable_browser_notifications') and (
+        not preference_field or _default_preference(preference_field)
+    )
+    if defauts_acceptent:
+        accepte |= Q(notification_preferences__isnull=True)
+
+    return users.filter(accepte)
+
+
+def send_notifications(items):
+    """
+    Envoie immédiatement un lot de notifications: une requête de destinataires par
+    (rôles, type, utilisateur exclu, préférences) et un seul bulk_create.
+    `items`: dicts roles, type, title, message et optionnellement exclude_user_id,
+    respect_preferences, related (related_order_id, related_product_id...).
+    """
+    destinataires = {}
+    notifications = []
+    for item in items:
+        groupe = (
+            tuple(item['roles']),
+            item['type'],
+            item.get('exclude_user_id'),
+            item.get('respect_preferences', True),
+        )
+        if groupe not in destinataires:
+            destinataires[groupe] = list(
+                recipients_queryset(*groupe).values_list('id', flat=True)
+            )
+        notifications.extend(
+            Notification(
+                user_id=user_id,
+                type=item['type'],
+                title=item['title'],
+                message=item['message'],
+                **item.get('related', {})
+            )
+            for user_id in destinataires[groupe]
+        )
+    with transaction.atomic():
+        Notification.objects.bulk_create(notifications)
+        add_unread(Counter(notification.user_id for notification in notifications))
+    _push(notifications)
+    return notifications
+
+
+def _push(notifications):
+    try:
+        push_notifications(notifications)
+    except Exception as e:
+        # Le flux temps réel est un confort: les notifications sont déjà enregistrées
+        logger.error(f"❌ Erreur diffusion temps réel des notifications: {e}")
+
+
+def send_notifications_later(items):
+    """
+    Diffère l'envoi d'un lot de notifications (tâche 'notifications.send',
+    apps/authentication/tasks.py): programmé au commit de la transaction en cours,
+    exécuté hors de la requête.
+    """
+    if items:
+        defer('notifications.send', items=items)
+
+
+def fan_out(roles, notification_type, title, message, exclude_user=None, respect_preferences=True, **related):
+    """
+    Notifie les utilisateurs des rôles donnés (selon leurs préférences si `respect_preferences`).
+    L'envoi est une tâche différée, exécutée après le commit de la transaction en cours.
+    `related`: related_order_id, related_product_id, related_client_id, related_sale_id
+    """
+    item = {
+        'roles': roles,
+        'type': notification_type,
+        'title': title,
+        'message': message,
+        'exclude_user_id': exclude_user.pk if exclude_user is not None else None,
+        'respect_preferences': respect_preferences,
+        'related': related,
+    }
+    send_notifications_later([item])
+
 
 class NotificationService:
     """Service centralisé pour la gestion des notifications"""
@@ -17,79 +175,14 @@ class NotificationService:
     def get_users_to_notify(notification_type, exclude_user=None):
         """
         Retourne la liste des utilisateurs à notifier selon le type de notification
-        et leurs préférences
+        et leurs préférences (une seule requête)
         """
-        # Mapping entre types de notification et préférences
-        preference_mapping = {
-            'client_created': 'notify_client_created',
-            'client_updated': 'notify_client_created',
-            'order_created': 'notify_order_created',
-            'order_validated': 'notify_order_validated',
-            'order_updated': 'notify_order_created',
-            'order_cancelled': 'notify_order_created',
-            'delivery_assigned': 'notify_delivery_assigned',
-            'delivery_completed': 'notify_delivery_completed',
-            'stock_low': 'notify_stock_low',
-            'stock_out': 'notify_stock_low',
-            'stock_movement': 'notify_stock_updated',
-            'product_created': 'notify_stock_updated',
-            'product_updated': 'notify_stock_updated',
-            'sale_created': 'notify_order_created',
-            'sale_completed': 'notify_order_created',
-            'payment_received': 'notify_order_created',
-        }
-        
-        # Rôles concernés par type de notification
-        role_mapping = {
-            'client_created': ['admin', 'vendeur'],
-            'client_updated': ['admin', 'vendeur'],
-            'order_created': ['admin', 'vendeur', 'stock'],
-            'order_validated': ['admin', 'vendeur', 'stock', 'livreur'],
-            'order_updated': ['admin', 'vendeur'],
-            'order_cancelled': ['admin', 'vendeur'],
-            'delivery_assigned': ['admin', 'livreur'],
-            'delivery_completed': ['admin', 'vendeur', 'livreur'],
-            'stock_low': ['admin', 'stock'],
-            'stock_out': ['admin', 'stock'],
-            'stock_movement': ['admin', 'stock'],
-            'product_created': ['admin', 'stock'],
-            'product_updated': ['admin', 'stock'],
-            'sale_created': ['admin', 'vendeur'],
-            'sale_completed': ['admin', 'vendeur'],
-            'payment_received': ['admin', 'vendeur'],
-        }
-        
-        preference_field = preference_mapping.get(notification_type)
-        allowed_roles = role_mapping.get(notification_type, ['admin'])
-        
-        # Récupérer les utilisateurs actifs avec les rôles appropriés
-        users = User.objects.filter(
-            is_active=True,
-            role__in=allowed_roles
-        )
-        
-        if exclude_user:
-            users = users.exclude(id=exclude_user.id)
-        
-        # Filtrer par préférences si un champ de préférence existe
-        users_to_notify = []
-        for user in users:
-            try:
-                prefs = NotificationPreferences.get_or_create_for_user(user)
-                # Vérifier si les notifications navigateur sont activées
-                if prefs.enable_browser_notifications:
-                    # Vérifier la préférence spécifique si elle existe
-                    if preference_field:
-                        if getattr(prefs, preference_field, True):
-                            users_to_notify.append(user)
-                    else:
-                        users_to_notify.append(user)
-            except Exception as e:
-                logger.error(f"Erreur préférences pour {user.email}: {e}")
-                # En cas d'erreur, inclure l'utilisateur par défaut
-                users_to_notify.append(user)
-        
-        return users_to_notify
+        allowed_roles = ROLE_MAPPING.get(notification_type, ['admin'])
+        return list(recipients_queryset(
+            allowed_roles,
+            notification_type,
+            exclude_user.id if exclude_user else None
+        ))
     
     @staticmethod
     def create_notification(
@@ -104,16 +197,19 @@ class NotificationService:
     ):
         """Crée une notification pour un utilisateur spécifique"""
         try:
-            notification = Notification.objects.create(
-                user=user,
-                type=notification_type,
-                title=title,
-                message=message,
-                related_order_id=related_order_id,
-                related_product_id=related_product_id,
-                related_client_id=related_client_id,
-                related_sale_id=related_sale_id
-            )
+            with transaction.atomic():
+                notification = Notification.objects.create(
+                    user=user,
+                    type=notification_type,
+                    title=title,
+                    message=message,
+                    related_order_id=related_order_id,
+                    related_product_id=related_product_id,
+                    related_client_id=related_client_id,
+                    related_sale_id=related_sale_id
+                )
+                add_unread({user.id: 1})
+            _push([notification])
             logger.info(f"🔔 Notification créée pour {user.email}: {title}")
             return notification
         except Exception as e:
@@ -132,27 +228,18 @@ class NotificationService:
         related_client_id=None,
         related_sale_id=None
     ):
-        """Envoie une notification à tous les utilisateurs concernés"""
-        users = cls.get_users_to_notify(notification_type, exclude_user)
-        notifications = []
-        
-        with transaction.atomic():
-            for user in users:
-                notif = cls.create_notification(
-                    user=user,
-                    notification_type=notification_type,
-                    title=title,
-                    message=message,
-                    related_order_id=related_order_id,
-                    related_product_id=related_product_id,
-                    related_client_id=related_client_id,
-                    related_sale_id=related_sale_id
-                )
-                if notif:
-                    notifications.append(notif)
-        
-        logger.info(f"📬 {len(notifications)} notification(s) envoyée(s) pour: {title}")
-        return notifications
+        """Envoie une notification à tous les utilisateurs concernés (après commit, en un bulk_create)"""
+        fan_out(
+            ROLE_MAPPING.get(notification_type, ['admin']),
+            notification_type,
+            title,
+            message,
+            exclude_user=exclude_user,
+            related_order_id=related_order_id,
+            related_product_id=related_product_id,
+            related_client_id=related_client_id,
+            related_sale_id=related_sale_id
+        )
     
     # ============== NOTIFICATIONS CLIENTS ==============
     
@@ -318,8 +405,16 @@ class NotificationService:
 
 # Fonction utilitaire pour vérifier et notifier le stock faible
 def check_and_notify_low_stock(product):
-    """Vérifie le stock d'un produit et envoie une notification si nécessaire"""
-    if product.stock_actuel <= 0:
-        NotificationService.notify_stock_out(product)
-    elif product.stock_actuel <= product.stock_minimal:
-        NotificationService.notify_stock_low(product)
+    """
+    Vérifie le stock d'un produit et publie l'événement stock_low si nécessaire.
+    Les notifications (une par produit et par transaction) partent du gestionnaire
+    de apps/products/notifications.py.
+    """
+    if product.stock_actuel <= product.stock_minimal:
+        event_bus.publish(
+            'stock_low',
+            product.id,
+            nom=product.nom,
+            stock_actuel=product.stock_actuel,
+            stock_minimal=product.stock_minimal,
+        )
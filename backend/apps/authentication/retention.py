@@ -0,0 +1,156 @@
+"""
+Rétention des notifications
+
+Deux opérations (manage.py purge_notifications):
+- purge: les notifications lues depuis plus de NOTIFICATION_READ_RETENTION_DAYS
+  jours sont supprimées par lots d'identifiants (DELETE SQL direct, transactions courtes);
+- compactage: les notifications non lues plus anciennes que
+  NOTIFICATION_COMPACT_AFTER_DAYS jours sont regroupées par (utilisateur, type,
+  objet lié). La plus récente de chaque groupe est gardée comme résumé
+  (collapsed_count, titre suffixé « (×N) »), les autres sont supprimées et le
+  compteur de non lues (apps/authentication/counters.py) est diminué d'autant.
+  Le compactage avance par lots d'utilisateurs, une transaction par lot.
+"""
+import re
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+from .counters import add_unread
+from .models import Notification, NotificationCounter
+
+
+GROUP_FIELDS = ('user_id', 'type', 'related_order_id', 'related_product_id', 'related_client_id', 'related_sale_id')
+SUMMARY_SUFFIX = re.compile(r' \(×\d+\)$')
+
+
+def retention_settings():
+    """(jours de conservation des lues, âge en jours des non lues à compacter)"""
+    return (
+        getattr(settings, 'NOTIFICATION_READ_RETENTION_DAYS', 30),
+        getattr(settings, 'NOTIFICATION_COMPACT_AFTER_DAYS', 7),
+    )
+
+
+def expired_read(days, now=None):
+    limite = (now or timezone.now()) - timedelta(days=days)
+    return Notification.objects.filter(is_read=True, created_at__lt=limite)
+
+
+def compactable_unread(days, now=None):
+    limite = (now or timezone.now()) - timedelta(days=days)
+    return Notification.objects.filter(is_read=False, created_at__lt=limite)
+
+
+def purge_read(days, chunk_size=5000, pause=0):
+    """Supprime par lots les notifications lues expirées; retourne le nombre supprimé"""
+    total = 0
+    ids_queryset = expired_read(days).order_by().values_list('id', flat=True)
+    while True:
+        ids = list(ids_queryset[:chunk_size])
+        if not ids:
+            break
+        with transaction.atomic():
+            # Notification n'a aucune relation inverse: pas besoin du Collector de l'ORM
+            total += Notification.objects.filter(id__in=ids, is_read=True)._raw_delete(Notification.objects.db)
+        if pause:
+            time.sleep(pause)
+    return total
+
+
+def summary_title(title, count):
+    title = SUMMARY_SUFFIX.sub('', title)
+    suffix = f' (×{count})'
+    max_length = Notification._meta.get_field('title').max_length
+    return title[:max_length - len(suffix)] + suffix
+
+
+def compact_users(user_ids, days, now=None):
+    """
+    Compacte les non lues anciennes des utilisateurs `user_ids` (une transaction).
+    Retourne le nombre de notifications supprimées.
+    """
+    with transaction.atomic():
+        # Verrou des compteurs: un passage en lues concurrent attend la fin du lot
+        list(NotificationCounter.objects.select_for_update().filter(user_id__in=user_ids).values_list('user_id'))
+
+        anciennes = compactable_unread(days, now).filter(user_id__in=user_ids)
+        groupes = list(
+            anciennes.order_by().values(*GROUP_FIELDS)
+            .annotate(lignes=Count('id'), total=Sum('collapsed_count'), garde=Max('id'))
+        )
+        resumes = {groupe['garde']: groupe['total'] for groupe in groupes if groupe['lignes'] > 1}
+        if not resumes:
+            return 0
+
+        gardees = {groupe['garde'] for groupe in groupes}
+        a_supprimer = anciennes.exclude(id__in=gardees)
+        par_utilisateur = dict(
+            a_supprimer.order_by().values('user_id').annotate(n=Count('id')).values_list('user_id', 'n')
+        )
+        supprimees = a_supprimer.order_by()._raw_delete(Notification.objects.db)
+
+        notifications = list(Notification.objects.filter(id__in=resumes).only('id', 'title', 'collapsed_count'))
+        for notification in notifications:
+            notification.collapsed_count = resumes[notification.id]
+            notification.title = summary_title(notification.title, notification.collapsed_count)
+        Notification.objects.bulk_update(notifications, ['title', 'collapsed_count'])
+
+        add_unread({user_id: -n for user_id, n in par_utilisateur.items()})
+    return supprimees
+
+
+def compact_unread(days, chunk_size=200, pause=0):
+    """
+    Compacte les non lues anciennes, par lots de `chunk_size` utilisateurs.
+    Retourne le nombre de notifications supprimées.
+    """
+    now = timezone.now()
+    total = 0
+    last_user_id = 0
+    while True:
+        user_ids = list(
+            compactable_unread(days, now).filter(user_id__gt=last_user_id)
+            .order_by('user_id').values_list('user_id', flat=True).distinct()[:chunk_size]
+        )
+        if not user_ids:
+            break
+        total += compact_users(user_ids, days, now)
+        last_user_id = user_ids[-1]
+        if pause:
+            time.sleep(pause)
+    return total
+
+
+def count_compactable(days):
+    """Nombre de notifications que le compactage supprimerait"""
+    groupes = compactable_unread(days).order_by().values(*GROUP_FIELDS).annotate(lignes=Count('id'))
+    return sum(groupe['lignes'] - 1 for groupe in groupes)
+
+
+def apply_retention(read_days=None, compact_days=None, chunk_size=5000, user_chunk_size=200, pause=0, dry_run=False):
+    """
+    Purge des lues expirées puis compactage des non lues anciennes.
+    Jours à None: valeur de settings; 0: étape désactivée.
+    Retourne {'purged': n, 'compacted': n} (nombres à supprimer en dry_run).
+    """
+    default_read, default_compact = retention_settings()
+    read_days = default_read if read_days is None else read_days
+    compact_days = default_compact if compact_days is None else compact_days
+
+    resultat = {'purged': 0, 'compacted': 0}
+    if read_days:
+        resultat['purged'] = (
+            expired_read(read_days).count() if dry_run
+            else purge_read(read_days, chunk_size=chunk_size, pause=pause)
+        )
+    if compact_days:
+        resultat['compacted'] = (
+            count_compactable(compact_days) if dry_run
+            else compact_unread(compact_days, chunk_size=user_chunk_size, pause=pause)
+        )
+    return resultat
@@ -209,7 +209,7 @@ class NotificationSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'type', 'type_display', 'title', 'message',
             'related_order_id', 'related_product_id', 'related_client_id', 'related_sale_id',
-            'is_read', 'read_at', 'created_at', 'time_ago'
+            'is_read', 'read_at', 'created_at', 'time_ago', 'collapsed_count'
         ]
         read_only_fields = ['id', 'created_at']
     
@@ -0,0 +1,14 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import User
+from .cache import invalidate_user
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalider_cache_utilisateur(sender, instance, **kwargs):
+    """
+    Invalide l'utilisateur en cache à chaque enregistrement (rôle, activation,
+    mot de passe...) ou suppression.
+    """
+    invalidate_user(instance.pk)
@@ -0,0 +1,309 @@
+"""
+Flux temps réel (Server-Sent Events) des notifications et des statuts de commande
+
+Le frontend n'interroge plus /notifications/ toutes les 5 secondes: il ouvre un
+EventSource sur /api/auth/notifications/stream/ et reçoit
+- `notification`   nouvelle notification (données de NotificationSerializer);
+- `unread_count`   nouveau nombre de notifications non lues;
+- `order_status`   commande créée ou changement de statut;
+- `resync`         des événements ont été perdus: recharger les données.
+
+Les événements passent par un diffuseur en mémoire (StreamBroker) qui garde les
+SSE_BUFFER_SIZE derniers pour la reprise (en-tête Last-Event-ID). Avec plusieurs
+workers, SSE_BACKEND='postgres' relaie chaque événement par LISTEN/NOTIFY vers
+les diffuseurs de tous les processus. Chaque diffuseur numérote les événements
+dans l'ordre où il les reçoit (époque du processus + rang): une reprise sur un
+autre worker commence par `resync`.
+
+Réglages (settings.py):
+    SSE_BACKEND              'local' (un seul processus) ou 'postgres'
+    SSE_HEARTBEAT_SECONDS    commentaire envoyé sans événement (garde la connexion ouverte)
+    SSE_STREAM_MAX_SECONDS   durée d'une connexion, le navigateur se reconnecte ensuite
+    SSE_BUFFER_SIZE          événements gardés pour la reprise
+    SSE_MAX_STREAMS          connexions simultanées par processus (503 au-delà)
+    SSE_TICKET_MAX_AGE       validité (s) du ticket d'ouverture du flux
+"""
+import bisect
+import json
+import logging
+import os
+import secrets
+import select
+import threading
+import time
+from collections import namedtuple
+from operator import attrgetter
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+
+
+logger = logging.getLogger(__name__)
+
+PG_CHANNEL = 'sygla_stream'
+PG_PAYLOAD_MAX = 7900  # limite de pg_notify: 8000 octets
+
+# audience: None = tous les utilisateurs connectés, sinon frozenset d'ids utilisateur
+StreamEvent = namedtuple('StreamEvent', ['id', 'type', 'data', 'audience'])
+
+
+def format_event(event_type, data, event_id=None):
+    """Trame SSE (id, event, data)"""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event_type}')
+    lines.append(f'data: {json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+class StreamBroker:
+    """Diffusion en mémoire des événements aux flux ouverts, avec tampon de reprise"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._reset()
+
+    def _reset(self):
+        self._buffer = []  # StreamEvent triés par id
+        self._dropped_upto = 0  # id du dernier événement sorti du tampon
+        self._last_id = 0
+        self._streams = 0
+        self._relay = None
+        self._pid = os.getpid()
+        # Les ids ne valent que dans ce processus: l'époque les distingue (Last-Event-ID)
+        self._epoch = secrets.token_hex(4)
+
+    def _check_process(self):
+        """Processus forké (workers gunicorn): ni flux, ni relais, ni tampon hérités du parent"""
+        if self._pid != os.getpid():
+            self._reset()
+
+    @staticmethod
+    def _setting(name, default):
+        return getattr(settings, name, default)
+
+    @property
+    def backend(self):
+        return self._setting('SSE_BACKEND', 'local')
+
+    # ------------------------------------------------------------ publication
+
+    def publish(self, event_type, data, user_ids=None):
+        """
+        Diffuse un événement à `user_ids` (tous les utilisateurs connectés si None).
+        Dans une transaction, la diffusion a lieu après le commit.
+        """
+        audience = frozenset(user_ids) if user_ids is not None else None
+        if connection.in_atomic_block:
+            transaction.on_commit(lambda: self._send(event_type, data, audience))
+        else:
+            self._send(event_type, data, audience)
+
+    def _send(self, event_type, data, audience):
+        if self.backend == 'postgres' and self._notify_postgres(event_type, data, audience):
+            return  # reçu en retour par le relais LISTEN de chaque processus
+        self._append(event_type, data, audience)
+
+    def _append(self, event_type, data, audience):
+        with self._condition:
+            self._check_process()
+            # Identifiant attribué à l'entrée dans le tampon, dans l'ordre de réception:
+            # un événement ne peut pas arriver derrière le last_id d'un flux déjà servi
+            self._last_id += 1
+            self._buffer.append(StreamEvent(self._last_id, event_type, data, audience))
+            overflow = len(self._buffer) - self._setting('SSE_BUFFER_SIZE', 500)
+            if overflow > 0:
+                self._dropped_upto = self._buffer[overflow - 1].id
+                del self._buffer[:overflow]
+            self._condition.notify_all()
+
+    # ------------------------------------------------------------ lecture
+
+    def event_id(self, event_id):
+        """Identifiant SSE (champ id) d'un événement de ce processus"""
+        return f'{self._epoch}:{event_id}'
+
+    def resume_point(self, last_event_id):
+        """
+        Position de reprise d'un flux d'après son Last-Event-ID.
+        Sans identifiant: seulement les événements à venir. Identifiant d'un autre
+        processus (ou d'avant un redémarrage): -1, le flux commence par `resync`.
+        """
+        with self._condition:
+            self._check_process()
+            if not last_event_id:
+                return self._last_id
+            epoch, _, position = str(last_event_id).partition(':')
+            if epoch != self._epoch or not position.isdigit():
+                return -1
+            return min(int(position), self._last_id)
+
+    def since(self, last_id, user_id):
+        """
+        Événements destinés à `user_id` postérieurs à `last_id`.
+        Renvoie (événements, complet, parcouru): complet=False si des événements ont
+        quitté le tampon; parcouru = id du dernier événement examiné (destiné ou non
+        à l'utilisateur), nouvelle position du flux.
+        """
+        with self._condition:
+            start = bisect.bisect_right(self._buffer, last_id, key=attrgetter('id'))
+            events = [
+                event for event in self._buffer[start:]
+                if event.audience is None or user_id in event.audience
+            ]
+            return events, last_id >= self._dropped_upto, max(last_id, self._last_id)
+
+    def latest_id(self):
+        with self._condition:
+            return self._last_id
+
+    def wait(self, last_id, timeout):
+        """Attend un événement postérieur à `last_id`; False si le délai est écoulé"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._last_id > last_id, timeout)
+
+    # ------------------------------------------------------------ connexions
+
+    def acquire(self):
+        """Réserve une place de flux; False si SSE_MAX_STREAMS est atteint"""
+        with self._condition:
+            self._check_process()
+            if self._streams >= self._setting('SSE_MAX_STREAMS', 24):
+                return False
+            self._streams += 1
+        if self.backend == 'postgres':
+            self._start_relay()
+        return True
+
+    def release(self):
+        with self._condition:
+            self._streams = max(self._streams - 1, 0)
+
+    # ------------------------------------------------------------ PostgreSQL
+
+    def _notify_postgres(self, event_type, data, audience):
+        payload = json.dumps({
+            'type': event_type,
+            'data': data,
+            'audience': sorted(audience) if audience is not None else None,
+        }, cls=DjangoJSONEncoder, ensure_ascii=False)
+        if len(payload.encode('utf-8')) > PG_PAYLOAD_MAX:
+            logger.warning(f"Événement SSE '{event_type}' trop volumineux pour NOTIFY, diffusé localement")
+            return False
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_notify(%s, %s)', [PG_CHANNEL, payload])
+            return True
+        except Exception:
+            logger.exception(f"NOTIFY impossible pour l'événement SSE '{event_type}'")
+            return False
+
+    def _start_relay(self):
+        with self._condition:
+            if self._relay is not None and self._relay.is_alive():
+                return
+            self._relay = threading.Thread(target=self._listen, name='sse-relay', daemon=True)
+            self._relay.start()
+
+    def _listen(self):
+        """Thread relais: LISTEN sur une connexion dédiée, reconnexion en cas d'erreur"""
+        import psycopg2
+        from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+        delay = 1
+        while True:
+            pg = None
+            try:
+                pg = psycopg2.connect(**connection.get_connection_params())
+                pg.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+                with pg.cursor() as cursor:
+                    cursor.execute(f'LISTEN {PG_CHANNEL}')
+                delay = 1
+                while True:
+                    if select.select([pg], [], [], 30) == ([], [], []):
+                        continue
+                    pg.poll()
+                    while pg.notifies:
+                        self._receive(pg.notifies.pop(0).payload)
+            except Exception:
+                logger.exception(f'Relais SSE interrompu, reconnexion dans {delay}s')
+                time.sleep(delay)
+                delay = min(delay * 2, 60)
+            finally:
+                if pg is not None:
+                    pg.close()
+
+    def _receive(self, payload):
+        message = json.loads(payload)
+        audience = message['audience']
+        self._append(
+            message['type'],
+            message['data'],
+            frozenset(audience) if audience is not None else None,
+        )
+
+
+broker = StreamBroker()
+
+
+class EventStream:
+    """
+    Corps de la réponse SSE d'un utilisateur (place réservée par broker.acquire()).
+    Django appelle close() à la fin de la réponse, même si le flux n'a jamais été lu.
+    """
+
+    def __init__(self, user_id, last_id, unread):
+        self.user_id = user_id
+        self.last_id = last_id
+        self.unread = unread
+        self._closed = False
+
+    def __iter__(self):
+        heartbeat = getattr(settings, 'SSE_HEARTBEAT_SECONDS', 20)
+        deadline = time.monotonic() + getattr(settings, 'SSE_STREAM_MAX_SECONDS', 300)
+        if not connection.in_atomic_block:
+            connection.close()  # pas de connexion SQL gardée pendant le flux
+        yield f'retry: {heartbeat * 1000}\n\n'
+        yield format_event('unread_count', {'count': self.unread})
+        while True:
+            events, complete, scanned = broker.since(self.last_id, self.user_id)
+            if not complete:
+                self.last_id = broker.latest_id()
+                yield format_event('resync', {}, broker.event_id(self.last_id))
+                continue
+            for event in events:
+                yield format_event(event.type, event.data, broker.event_id(event.id))
+            # Position avancée aussi sur les événements destinés à d'autres utilisateurs
+            self.last_id = scanned
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return  # le navigateur se reconnecte avec Last-Event-ID
+            if not broker.wait(self.last_id, min(heartbeat, remaining)):
+                yield ': ping\n\n'
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            broker.release()
+
+
+def push_notifications(notifications):
+    """Diffuse des notifications créées et le nouveau compteur de non lues de leurs destinataires"""
+    from .serializers import NotificationSerializer
+
+    if not notifications:
+        return
+    for notification in notifications:
+        broker.publish('notification', NotificationSerializer(notification).data, [notification.user_id])
+    push_unread_counts({notification.user_id for notification in notifications})
+
+
+def push_unread_counts(user_ids):
+    """Diffuse le nombre de notifications non lues de chaque utilisateur (compteurs dénormalisés)"""
+    from .counters import unread_counts
+
+    for user_id, count in unread_counts(user_ids).items():
+        broker.publish('unread_count', {'count': count}, [user_id])
@@ -0,0 +1,37 @@
+"""
+Tâches différées de l'authentification (apps/tasks/runner.py)
+"""
+import logging
+
+from django.conf import settings
+from django.core.mail import send_mail
+
+from apps.tasks.runner import task
+from .notification_service import send_notifications
+
+
+logger = logging.getLogger(__name__)
+
+
+@task('emails.send', max_attempts=5)
+def send_email(subject, message, recipient_list, html_message=None, from_email=None):
+    """Envoi SMTP; une erreur déclenche un nouvel essai"""
+    send_mail(
+        subject=subject,
+        message=message,
+        from_email=from_email or getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@sygla-h2o.com'),
+        recipient_list=recipient_list,
+        html_message=html_message,
+        fail_silently=False,
+    )
+    logger.info(f"✅ Email '{subject}' envoyé à {', '.join(recipient_list)}")
+
+
+@task('notifications.send', max_attempts=3, atomic=True)
+def send_notification_batch(items):
+    """
+    Lot de notifications (voir send_notifications). Atomique: notifications, compteurs
+    de non lues et suppression de la tâche validés ensemble, pas de doublon au rejeu.
+    """
+    notifications = send_notifications(items)
+    logger.info(f"📬 {len(notifications)} notification(s) envoyée(s)")
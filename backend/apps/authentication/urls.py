@@ -1,5 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from rest_framework_simplejwt.views import TokenRefreshView
 from . import views
 from .views_database import get_database_stats, create_backup, list_backups, restore_backup, download_backup
 
@@ -9,6 +10,9 @@ router.register(r'notifications', views.NotificationViewSet, basename='notificat
 router.register(r'sessions', views.UserSessionViewSet, basename='user-session')
 
 urlpatterns = [
+    # Flux temps réel (avant le router: 'stream' serait pris pour un identifiant de notification)
+    path('notifications/stream/', views.notification_stream, name='notification-stream'),
+
     # Router URLs
     path('', include(router.urls)),
     
@@ -16,6 +20,8 @@ urlpatterns = [
     path('register/', views.RegisterView.as_view(), name='register'),
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
+    # Renouvellement de l'access token (rotation du refresh token, même session: claim sid)
+    path('token/refresh/', TokenRefreshView.as_view(), name='token-refresh'),
     path('profile/', views.ProfileView.as_view(), name='profile'),
     path('change-password/', views.change_password_view, name='change-password'),
     path('force-change-password/', views.force_change_password_view, name='force-change-password'),
@@ -5,15 +5,21 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
 from django.shortcuts import get_object_or_404
-from django.core.mail import send_mail
 from django.conf import settings
-from .models import User, Notification, UserSession, PasswordResetToken
+from django.core import signing
+from django.db.models import F
+from django.http import JsonResponse, StreamingHttpResponse
+from .models import SESSION_CLAIM, User, Notification, UserSession, PasswordResetToken, session_key
 from .serializers import (
     UserSerializer, LoginSerializer, UserProfileSerializer,
     ChangePasswordSerializer, NotificationSerializer, UserSessionSerializer,
     ActiveUserSerializer, PasswordResetRequestSerializer, PasswordResetConfirmSerializer
 )
 from apps.logs.utils import create_log, LogTimer
+from apps.tasks.runner import defer
+from .activity import activity_tracker
+from .counters import mark_read, unread_count
+from .stream import EventStream, broker
 
 
 class RegisterView(generics.CreateAPIView):
@@ -90,6 +96,10 @@ def login_view(request):
             }, status=status.HTTP_403_FORBIDDEN)
         
         refresh = RefreshToken.for_user(user)
+        # Session identifiée par le jti du refresh token, porté par tous les tokens dérivés (claim sid)
+        refresh[SESSION_CLAIM] = refresh['jti']
+        # Un seul access token: chaque lecture de refresh.access_token en génère un nouveau (autre jti)
+        access_token = refresh.access_token
         
         # Capturer l'heure de connexion
         login_time = timezone.now()
@@ -110,15 +120,16 @@ def login_view(request):
             # Créer la session
             UserSession.objects.create(
                 user=user,
-                token=str(refresh.access_token)[:500],  # Limiter à 500 caractères
+                token=str(access_token)[:500],  # Limiter à 500 caractères
+                session_id=refresh['jti'],
                 ip_address=ip_address,
                 user_agent=user_agent,
                 device_info=device_info
             )
             
-            # Mettre à jour la dernière activité de l'utilisateur
+            # Dernière activité écrite par lots (apps/authentication/activity.py)
             user.last_activity = login_time
-            user.save(update_fields=['last_activity'])
+            activity_tracker.touch(user.id, when=login_time)
             
         except Exception as e:
             print(f"Erreur lors de la création de la session: {e}")
@@ -130,7 +141,7 @@ def login_view(request):
             'user': UserProfileSerializer(user, context={'request': request}).data,
             'tokens': {
                 'refresh': str(refresh),
-                'access': str(refresh.access_token),
+                'access': str(access_token),
             },
             'must_change_password': must_change_password,
             'message': 'Connexion réussie'
@@ -185,14 +196,13 @@ def logout_view(request):
         
         # Marquer la session comme déconnectée
         try:
-            # Récupérer le token d'accès depuis l'en-tête
-            auth_header = request.META.get('HTTP_AUTHORIZATION', '')
-            if auth_header.startswith('Bearer '):
-                access_token = auth_header[7:][:500]
+            # Session du token d'accès validé par JWTAuthentication (claim sid)
+            sid = session_key(request.auth)
+            if sid:
                 # Trouver et fermer la session
                 sessions = UserSession.objects.filter(
                     user=request.user,
-                    token__startswith=access_token[:100],  # Comparaison partielle
+                    session_id=sid,
                     is_active=True
                 )
                 for session in sessions:
@@ -502,19 +512,14 @@ L'équipe SYGLA-H2O
             print(f"Lien: {reset_link}")
             print("=" * 60)
         
-        try:
-            send_mail(
-                subject=subject,
-                message=message,
-                from_email=getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@sygla-h2o.com'),
-                recipient_list=[email],
-                html_message=html_message,
-                fail_silently=False,
-            )
-            print("✅ Email envoyé avec succès!")
-        except Exception as mail_error:
-            print(f"⚠️ Erreur d'envoi d'email: {mail_error}")
-            print("📋 Utilisez le lien ci-dessus pour réinitialiser le mot de passe.")
+        # Envoi SMTP hors de la requête, avec nouveaux essais (apps/authentication/tasks.py)
+        defer(
+            'emails.send',
+            subject=subject,
+            message=message,
+            recipient_list=[email],
+            html_message=html_message,
+        )
         
         # Log de la demande
         try:
@@ -1026,41 +1031,91 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     def mark_as_read(self, request, pk=None):
         """Marque une notification comme lue"""
         notification = self.get_object()
-        notification.mark_as_read()
+        unread = notification.mark_as_read()
+        broker.publish('unread_count', {'count': unread}, [request.user.id])  # autres onglets / appareils
         
         return Response({
             'status': 'success',
             'message': 'Notification marquée comme lue',
-            'data': self.get_serializer(notification).data
+            'data': self.get_serializer(notification).data,
+            'unread_count': unread
         })
     
     @action(detail=False, methods=['post'])
     def mark_all_as_read(self, request):
         """Marque toutes les notifications comme lues"""
-        updated = Notification.objects.filter(
-            user=request.user,
-            is_read=False
-        ).update(is_read=True)
+        updated, unread = mark_read(request.user.id)
+        if updated:
+            broker.publish('unread_count', {'count': unread}, [request.user.id])
         
         return Response({
             'status': 'success',
             'message': f'{updated} notification(s) marquée(s) comme lue(s)',
-            'count': updated
+            'count': updated,
+            'unread_count': unread
         })
     
     @action(detail=False, methods=['get'])
     def unread_count(self, request):
-        """Retourne le nombre de notifications non lues"""
-        count = Notification.objects.filter(
-            user=request.user,
-            is_read=False
-        ).count()
-        
+        """Retourne le nombre de notifications non lues (compteur dénormalisé, lu par clé primaire)"""
+        return Response({
+            'count': unread_count(request.user.id)
+        })
+
+    @action(detail=False, methods=['post'])
+    def stream_ticket(self, request):
+        """
+        Ticket d'ouverture du flux SSE (EventSource ne peut pas envoyer l'en-tête
+        Authorization): signé, lié à l'utilisateur et à la session du token JWT
+        """
+        sid = session_key(request.auth)
+        ticket = signing.dumps({'user': request.user.id, 'sid': sid}, salt=STREAM_TICKET_SALT)
         return Response({
-            'count': count
+            'ticket': ticket,
+            'expires_in': settings.SSE_TICKET_MAX_AGE,
         })
 
 
+STREAM_TICKET_SALT = 'authentication.notification_stream'
+
+
+def notification_stream(request):
+    """
+    Flux Server-Sent Events des notifications et statuts de commande (apps/authentication/stream.py).
+    Authentification par ticket (?ticket=, voir NotificationViewSet.stream_ticket);
+    reprise après l'en-tête Last-Event-ID ou ?last_event_id=.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Méthode non autorisée'}, status=405)
+    try:
+        ticket = signing.loads(
+            request.GET.get('ticket', ''),
+            salt=STREAM_TICKET_SALT,
+            max_age=settings.SSE_TICKET_MAX_AGE,
+        )
+    except signing.BadSignature:
+        return JsonResponse({'error': 'Ticket invalide ou expiré'}, status=401)
+
+    user = User.objects.filter(id=ticket['user'], is_active=True).only('id').first()
+    if user is None or (
+        ticket.get('sid') and not UserSession.objects.filter(session_id=ticket['sid'], is_active=True).exists()
+    ):
+        return JsonResponse({'error': 'Session expirée'}, status=401)
+
+    last_id = broker.resume_point(request.headers.get('Last-Event-ID') or request.GET.get('last_event_id'))
+    unread = unread_count(user.id)
+
+    if not broker.acquire():
+        response = JsonResponse({'error': 'Trop de connexions temps réel, réessayez plus tard'}, status=503)
+        response['Retry-After'] = '30'
+        return response
+
+    response = StreamingHttpResponse(EventStream(user.id, last_id, unread), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # pas de mise en tampon par le proxy
+    return response
+
+
 class UserSessionViewSet(viewsets.ReadOnlyModelViewSet):
     """
     ViewSet pour consulter les sessions utilisateurs
@@ -1070,15 +1125,18 @@ class UserSessionViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
+        # Écrire l'activité en attente pour que last_activity soit à jour
+        activity_tracker.flush()
         # Seuls les admins peuvent voir toutes les sessions
         if self.request.user.role == 'admin':
-            return UserSession.objects.select_related('user').all()
+            return UserSession.objects.with_online().select_related('user')
         # Les autres utilisateurs ne voient que leurs propres sessions
-        return UserSession.objects.filter(user=self.request.user)
+        return UserSession.objects.with_online().filter(user=self.request.user)
     
     @action(detail=False, methods=['get'])
     def active(self, request):
         """Retourne uniquement les sessions actives"""
+        activity_tracker.flush()
         sessions = UserSession.get_active_sessions()
         
         # Filtrer selon le rôle
@@ -1098,50 +1156,34 @@ class UserSessionViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Récupérer les sessions actives
-        active_sessions = UserSession.get_active_sessions()
-        
-        # Grouper par utilisateur
-        users_dict = {}
-        for session in active_sessions:
-            user_id = session.user.id
-            if user_id not in users_dict:
-                users_dict[user_id] = {
-                    'user': session.user,
-                    'sessions': []
-                }
-            users_dict[user_id]['sessions'].append(session)
-        
-        # Sérialiser les utilisateurs
-        connected_users = []
-        for user_data in users_dict.values():
-            user = user_data['user']
-            sessions = user_data['sessions']
-            
-            # Prendre la session la plus récente
-            latest_session = max(sessions, key=lambda s: s.last_activity)
-            
-            connected_users.append({
-                'id': user.id,
-                'username': user.username,
-                'email': user.email,
-                'full_name': user.full_name,
-                'role': user.role,
-                'role_display': user.get_role_display(),
-                'last_activity': user.last_activity,
+        # Session la plus récente de chaque utilisateur connecté, en une requête
+        # (activité en attente écrite d'abord)
+        activity_tracker.flush()
+        latest_sessions = UserSession.get_active_sessions().latest_per_user().order_by(
+            F('user__last_activity').desc(nulls_last=True)
+        )
+        
+        connected_users = [
+            {
+                'id': session.user.id,
+                'username': session.user.username,
+                'email': session.user.email,
+                'full_name': session.user.full_name,
+                'role': session.user.role,
+                'role_display': session.user.get_role_display(),
+                'last_activity': session.user.last_activity,
                 'session': {
-                    'id': latest_session.id,
-                    'ip_address': latest_session.ip_address,
-                    'device_info': latest_session.device_info,
-                    'login_time': latest_session.login_time,
-                    'last_activity': latest_session.last_activity,
-                    'is_online': latest_session.is_online
+                    'id': session.id,
+                    'ip_address': session.ip_address,
+                    'device_info': session.device_info,
+                    'login_time': session.login_time,
+                    'last_activity': session.last_activity,
+                    'is_online': session.is_online
                 },
-                'total_active_sessions': len(sessions)
-            })
-        
-        # Trier par dernière activité
-        connected_users.sort(key=lambda u: u['last_activity'], reverse=True)
+                'total_active_sessions': session.user_sessions
+            }
+            for session in latest_sessions
+        ]
         
         return Response({
             'count': len(connected_users),
@@ -1157,6 +1199,7 @@ class UserSessionViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
+        activity_tracker.flush()  # une session active dans l'intervalle n'est pas périmée
         count = UserSession.cleanup_old_sessions()
         
         return Response({
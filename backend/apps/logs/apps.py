@@ -1,7 +1,21 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def ensure_search_backend(sender, using, **kwargs):
+    """SQLite supprime les triggers FTS quand une migration reconstruit la table des logs"""
+    from django.db import connections
+    from apps.logs.search import install_search_backend
+
+    connection = connections[using]
+    if connection.vendor == 'sqlite':
+        install_search_backend(connection)
 
 
 class LogsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.logs'
     verbose_name = 'Logs Système'
+    
+    def ready(self):
+        post_migrate.connect(ensure_search_backend, sender=self)
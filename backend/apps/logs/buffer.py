@@ -0,0 +1,207 @@
+"""
+Écriture différée des logs système
+
+create_log ne fait plus d'INSERT dans la requête: le log est placé dans une file
+bornée en mémoire et un thread d'arrière-plan l'écrit par lots (bulk_create),
+dès que la taille du lot est atteinte ou que l'intervalle de vidage est écoulé.
+La file est vidée à l'arrêt du worker (atexit).
+
+Réglages (settings.py):
+    SYSTEM_LOG_ASYNC            False = écriture synchrone (tests, scripts)
+    SYSTEM_LOG_QUEUE_SIZE       taille maximale de la file
+    SYSTEM_LOG_BATCH_SIZE       nombre de logs par bulk_create
+    SYSTEM_LOG_FLUSH_INTERVAL   délai maximal (s) avant écriture d'un lot incomplet
+    SYSTEM_LOG_FULL_POLICY      'drop' (log perdu) ou 'block' (attente bornée puis perte)
+    SYSTEM_LOG_BLOCK_TIMEOUT    attente maximale (s) en mode 'block'
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+
+logger = logging.getLogger(__name__)
+
+
+class LogWriter:
+    """File bornée + thread d'écriture par lots pour SystemLog"""
+
+    def __init__(self):
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._counters = {
+            'enqueued': 0,
+            'written': 0,
+            'dropped': 0,
+            'blocked': 0,
+            'failed': 0,
+            'flushes': 0,
+        }
+
+    # ------------------------------------------------------------------ config
+
+    @staticmethod
+    def _setting(name, default):
+        return getattr(settings, name, default)
+
+    @property
+    def asynchronous(self):
+        return self._setting('SYSTEM_LOG_ASYNC', True)
+
+    @property
+    def batch_size(self):
+        return self._setting('SYSTEM_LOG_BATCH_SIZE', 200)
+
+    @property
+    def flush_interval(self):
+        return self._setting('SYSTEM_LOG_FLUSH_INTERVAL', 2.0)
+
+    # ----------------------------------------------------------------- écriture
+
+    def write(self, log):
+        """
+        Enregistre un SystemLog (instance non sauvegardée).
+        En mode synchrone le log est sauvegardé immédiatement.
+        """
+        if not self.asynchronous:
+            log.save()
+            self._count('written')
+            self._record_rollups([log])
+            return log
+
+        self._ensure_started()
+        try:
+            if self._setting('SYSTEM_LOG_FULL_POLICY', 'drop') == 'block':
+                try:
+                    self._queue.put_nowait(log)
+                except queue.Full:
+                    self._count('blocked')
+                    self._wakeup.set()
+                    self._queue.put(log, timeout=self._setting('SYSTEM_LOG_BLOCK_TIMEOUT', 0.05))
+            else:
+                self._queue.put_nowait(log)
+        except queue.Full:
+            self._count('dropped')
+            return log
+
+        self._count('enqueued')
+        if self._queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+        return log
+
+    def flush(self):
+        """Écrit immédiatement tous les logs en attente (appelable depuis n'importe quel thread)"""
+        if self._queue is None:
+            return 0
+        total = 0
+        with self._flush_lock:
+            while True:
+                batch = self._drain(self.batch_size)
+                if not batch:
+                    break
+                total += self._write_batch(batch)
+        return total
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._counters)
+        data.update({
+            'asynchronous': self.asynchronous,
+            'pending': self._queue.qsize() if self._queue is not None else 0,
+            'capacity': self._setting('SYSTEM_LOG_QUEUE_SIZE', 10000),
+            'running': bool(self._thread and self._thread.is_alive()),
+        })
+        return data
+
+    # ------------------------------------------------------------------ interne
+
+    def _count(self, name, value=1):
+        with self._lock:
+            self._counters[name] += value
+
+    def _ensure_started(self):
+        # Après un fork (workers gunicorn), le thread du parent n'existe pas dans l'enfant
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._queue = queue.Queue(maxsize=self._setting('SYSTEM_LOG_QUEUE_SIZE', 10000))
+            self._pid = os.getpid()
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='systemlog-writer', daemon=True)
+            self._thread.start()
+
+    def _drain(self, limit):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write_batch(self, batch):
+        from .models import SystemLog
+
+        try:
+            SystemLog.objects.bulk_create(batch)
+            saved = batch
+        except Exception:
+            # Un log invalide ne doit pas faire perdre tout le lot
+            logger.exception('Écriture groupée des logs système impossible, écriture unitaire')
+            saved = []
+            for log in batch:
+                try:
+                    log.save()
+                    saved.append(log)
+                except Exception:
+                    self._count('failed')
+        self._count('written', len(saved))
+        self._count('flushes')
+        self._record_rollups(saved)
+        return len(saved)
+
+    @staticmethod
+    def _record_rollups(logs):
+        from .rollup import record_logs
+
+        try:
+            record_logs(logs)
+        except Exception:
+            logger.exception('Mise à jour des agrégats horaires des logs impossible')
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                close_old_connections()
+                self.flush()
+            except Exception:
+                logger.exception('Erreur du thread d\'écriture des logs système')
+        connection.close()
+
+    def shutdown(self):
+        """Vide la file à l'arrêt du processus"""
+        self._stopping = True
+        self._wakeup.set()
+        if self._pid == os.getpid():
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Logs système perdus à l\'arrêt')
+
+
+log_writer = LogWriter()
+atexit.register(log_writer.shutdown)
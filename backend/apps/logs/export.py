@@ -0,0 +1,80 @@
+"""
+Export en flux des logs système (NDJSON ou CSV, éventuellement compressé en gzip)
+
+Les lignes sont lues par paquets avec .values().iterator(chunk_size=...) et
+écrites au fil de l'eau: la mémoire utilisée ne dépend pas du nombre de logs.
+"""
+import csv
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+EXPORT_FIELDS = [
+    'id', 'timestamp', 'type', 'module', 'message', 'details', 'user_id', 'user__email',
+    'ip_address', 'request_method', 'endpoint', 'status_code', 'response_time_ms', 'metadata',
+]
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+CHUNK_SIZE = 2000
+
+
+def _rows(queryset):
+    return queryset.values(*EXPORT_FIELDS).iterator(chunk_size=CHUNK_SIZE)
+
+
+def ndjson_lines(queryset):
+    encoder = DjangoJSONEncoder()
+    for row in _rows(queryset):
+        row['user_email'] = row.pop('user__email')
+        yield encoder.encode(row) + '\n'
+
+
+class _Echo:
+    """Pseudo-fichier pour csv.writer: retourne la ligne au lieu de l'écrire"""
+    def write(self, value):
+        return value
+
+
+def csv_lines(queryset):
+    writer = csv.writer(_Echo())
+    headers = [field.replace('user__email', 'user_email') for field in EXPORT_FIELDS]
+    yield '﻿' + writer.writerow(headers)  # BOM pour Excel
+    for row in _rows(queryset):
+        if row['timestamp'] is not None:
+            row['timestamp'] = row['timestamp'].isoformat()
+        row['metadata'] = json.dumps(row['metadata'], cls=DjangoJSONEncoder, ensure_ascii=False)
+        yield writer.writerow([row[field] for field in EXPORT_FIELDS])
+
+
+def encode(lines, batch_bytes=64 * 1024):
+    """Regroupe les lignes en blocs d'environ `batch_bytes` octets UTF-8"""
+    buffer, size = [], 0
+    for line in lines:
+        data = line.encode('utf-8')
+        buffer.append(data)
+        size += len(data)
+        if size >= batch_bytes:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def gzip_stream(chunks):
+    """Compresse un flux d'octets au format gzip, bloc par bloc"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(queryset, export_format, compress=False):
+    lines = ndjson_lines(queryset) if export_format == 'ndjson' else csv_lines(queryset)
+    chunks = encode(lines)
+    return gzip_stream(chunks) if compress else chunks
@@ -0,0 +1,126 @@
+"""
+Analyse de latence des requêtes à partir de SystemLog.response_time_ms
+
+Les percentiles sont calculés par la base de données:
+- PostgreSQL: percentile_cont(...) WITHIN GROUP (ORDER BY response_time_ms);
+- autres bases: histogramme à paliers fixes (un COUNT conditionnel par palier),
+  le percentile est interpolé dans le palier qui le contient.
+"""
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models import Aggregate, Avg, Count, FloatField, Max, Q
+from django.utils import timezone
+
+from .models import SystemLog
+
+
+PERCENTILES = (('p50', 0.5), ('p90', 0.9), ('p99', 0.99))
+GROUP_FIELDS = ('endpoint', 'module')
+
+# Bornes supérieures des paliers de l'histogramme (ms)
+HISTOGRAM_BOUNDS = (
+    5, 10, 20, 35, 50, 75, 100, 150, 200, 300, 500, 750,
+    1000, 1500, 2000, 3000, 5000, 10000, 30000,
+)
+
+
+class PercentileCont(Aggregate):
+    """percentile_cont PostgreSQL (valeur interpolée)"""
+    function = 'percentile_cont'
+    template = '%(function)s(%(percentile)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = FloatField()
+
+    def __init__(self, expression, percentile, **extra):
+        super().__init__(expression, percentile=float(percentile), **extra)
+
+
+def logs_in_window(since, until=None):
+    queryset = SystemLog.objects.filter(timestamp__gte=since, response_time_ms__isnull=False)
+    if until is not None:
+        queryset = queryset.filter(timestamp__lt=until)
+    return queryset
+
+
+def percentiles_from_histogram(buckets, count):
+    """Interpole les percentiles à partir des effectifs par palier"""
+    resultat = {}
+    for nom, fraction in PERCENTILES:
+        rang = fraction * count
+        cumul = 0
+        borne_basse = 0.0
+        valeur = None
+        for borne_haute, effectif in zip(HISTOGRAM_BOUNDS + (None,), buckets):
+            if effectif and cumul + effectif >= rang:
+                if borne_haute is None:
+                    valeur = None  # au-delà du dernier palier: remplacé par le max
+                else:
+                    valeur = borne_basse + (borne_haute - borne_basse) * (rang - cumul) / effectif
+                break
+            cumul += effectif
+            if borne_haute is not None:
+                borne_basse = float(borne_haute)
+        resultat[nom] = valeur
+    return resultat
+
+
+def latency_stats(since, until=None, group_by='endpoint', limit=50):
+    """
+    Statistiques de latence par endpoint ou par module sur une fenêtre de temps.
+
+    Retourne une liste triée par p99 décroissant:
+    [{group, count, throughput_per_min, avg_ms, p50_ms, p90_ms, p99_ms, max_ms}, ...]
+    """
+    if group_by not in GROUP_FIELDS:
+        raise ValueError(f"group_by doit être parmi: {', '.join(GROUP_FIELDS)}")
+
+    until = until or timezone.now()
+    minutes = max((until - since).total_seconds() / 60, 1 / 60)
+    queryset = logs_in_window(since, until).values(group_by).order_by()
+
+    aggregates = {
+        'count': Count('id'),
+        'avg_ms': Avg('response_time_ms'),
+        'max_ms': Max('response_time_ms'),
+    }
+    use_percentile_cont = connection.vendor == 'postgresql'
+    if use_percentile_cont:
+        for nom, fraction in PERCENTILES:
+            aggregates[nom] = PercentileCont('response_time_ms', fraction)
+    else:
+        borne_basse = None
+        for index, borne_haute in enumerate(HISTOGRAM_BOUNDS + (None,)):
+            condition = Q()
+            if borne_basse is not None:
+                condition &= Q(response_time_ms__gt=borne_basse)
+            if borne_haute is not None:
+                condition &= Q(response_time_ms__lte=borne_haute)
+            aggregates[f'b{index}'] = Count('id', filter=condition)
+            borne_basse = borne_haute
+
+    rows = []
+    for row in queryset.annotate(**aggregates):
+        if use_percentile_cont:
+            percentiles = {nom: row[nom] for nom, _ in PERCENTILES}
+        else:
+            buckets = [row[f'b{index}'] for index in range(len(HISTOGRAM_BOUNDS) + 1)]
+            percentiles = percentiles_from_histogram(buckets, row['count'])
+        max_ms = row['max_ms']
+        rows.append({
+            'group': row[group_by] or '',
+            'count': row['count'],
+            'throughput_per_min': round(row['count'] / minutes, 3),
+            'avg_ms': round(row['avg_ms'], 1) if row['avg_ms'] is not None else None,
+            **{
+                f'{nom}_ms': round(min(valeur, max_ms) if valeur is not None else max_ms, 1)
+                for nom, valeur in percentiles.items()
+            },
+            'max_ms': round(max_ms, 1) if max_ms is not None else None,
+        })
+
+    rows.sort(key=lambda row: row['p99_ms'] or 0, reverse=True)
+    return rows[:limit]
+
+
+def default_window(hours=24):
+    return timezone.now() - timedelta(hours=hours)
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.logs.retention import purge_expired_logs, retention_days
+
+
+class Command(BaseCommand):
+    help = 'Supprime les logs système plus anciens que leur durée de conservation (par lots)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Affiche le nombre de logs expirés sans les supprimer')
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Nombre de logs supprimés par lot (défaut: 5000)')
+        parser.add_argument('--pause', type=float, default=0,
+                            help='Pause en secondes entre deux lots (défaut: 0)')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size doit être supérieur à 0')
+
+        debut = time.monotonic()
+        resultat = purge_expired_logs(
+            chunk_size=options['chunk_size'],
+            pause=options['pause'],
+            dry_run=options['dry_run'],
+        )
+        durees = retention_days()
+        for log_type, count in resultat.items():
+            self.stdout.write(f'{log_type}: {count} log(s) de plus de {durees[log_type]} jours')
+
+        total = sum(resultat.values())
+        if options['dry_run']:
+            self.stdout.write(f'{total} log(s) à supprimer (aucune modification effectuée)')
+        else:
+            duree = time.monotonic() - debut
+            self.stdout.write(self.style.SUCCESS(f'{total} log(s) supprimé(s) en {duree:.2f}s'))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from apps.logs.models import QueryFingerprint
+
+
+SORTS = {
+    'n_plus_one': ('-n_plus_one_requests', '-total_ms'),
+    'total': ('-total_ms',),
+    'slow': ('-slow_executions', '-max_ms'),
+    'max': ('-max_ms',),
+}
+
+
+class Command(BaseCommand):
+    help = 'Affiche les requêtes SQL les plus problématiques (N+1, lentes) détectées par l\'inspecteur'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sort', choices=sorted(SORTS), default='n_plus_one',
+                            help='Critère de tri (défaut: n_plus_one)')
+        parser.add_argument('--limit', type=int, default=20,
+                            help='Nombre de requêtes affichées (défaut: 20)')
+        parser.add_argument('--reset', action='store_true',
+                            help='Efface les statistiques collectées')
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            count, _ = QueryFingerprint.objects.all().delete()
+            self.stdout.write(self.style.SUCCESS(f'{count} empreinte(s) effacée(s)'))
+            return
+
+        offenders = QueryFingerprint.objects.order_by(*SORTS[options['sort']])[:options['limit']]
+        if not offenders:
+            self.stdout.write('Aucune requête problématique enregistrée')
+            return
+
+        for rang, item in enumerate(offenders, start=1):
+            moyenne = item.total_ms / item.executions if item.executions else 0
+            self.stdout.write(self.style.WARNING(
+                f'#{rang} [{item.fingerprint}] N+1: {item.n_plus_one_requests} requête(s) HTTP, '
+                f'lentes: {item.slow_executions}, exécutions: {item.executions}, '
+                f'total: {item.total_ms:.0f}ms, moy: {moyenne:.1f}ms, max: {item.max_ms:.0f}ms'
+            ))
+            self.stdout.write(f'    route: {item.last_route or "-"}')
+            self.stdout.write(f'    origine: {item.last_origin or "-"}')
+            self.stdout.write(f'    {item.sql[:500]}')
@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.logs.rollup import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les agrégats horaires des logs (SystemLogHourly) à partir des logs détaillés'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int,
+                            help='Ne recalcule que les N derniers jours (défaut: tout)')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['days'] is not None:
+            if options['days'] < 1:
+                raise CommandError('--days doit être supérieur à 0')
+            since = timezone.now() - timedelta(days=options['days'])
+        self.stdout.write(
+            'Attention: les agrégats recalculés ne comptent que les logs encore présents; '
+            'les heures antérieures au plus ancien log (purgées) sont conservées telles quelles'
+        )
+        count = rebuild(since)
+        self.stdout.write(self.style.SUCCESS(f'{count} agrégat(s) horaire(s) recalculé(s)'))
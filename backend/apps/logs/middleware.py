@@ -0,0 +1,143 @@
+"""
+Middleware de mesure des performances des requêtes
+"""
+import random
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from .performance import route_stats
+from .queries import inspector_for_request, query_stats
+from .profiling import TOKEN_HEADER, armed_state, capture_lock, matching_session, profile_request
+
+
+UNRESOLVED_ROUTE = '<unresolved>'
+KNOWN_METHODS = frozenset({'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'})
+
+
+class QueryTimer:
+    """execute_wrapper: compte les requêtes SQL et cumule leur durée"""
+    __slots__ = ('count', 'duration')
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class RequestTimingMiddleware:
+    """
+    Mesure le temps total, le nombre de requêtes SQL et le temps SQL de chaque requête.
+
+    - ajoute l'en-tête Server-Timing (db, app, total) visible dans les outils du navigateur;
+    - enregistre un échantillon (settings.PERF_SAMPLE_RATE) dans les histogrammes par route;
+    - journalise dans SystemLog les requêtes plus lentes que settings.PERF_SLOW_REQUEST_MS;
+    - inspecte les requêtes SQL (N+1, requêtes lentes) selon settings.QUERY_INSPECTOR_MODE.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PERF_SAMPLE_RATE', 1.0)
+        self.slow_request_ms = getattr(settings, 'PERF_SLOW_REQUEST_MS', 1000)
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        inspector = inspector_for_request()
+        start = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            if inspector is None:
+                response = self.get_response(request)
+            else:
+                with connection.execute_wrapper(inspector):
+                    response = self.get_response(request)
+        total_ms = (time.perf_counter() - start) * 1000
+        sql_ms = timer.duration * 1000
+
+        response['Server-Timing'] = (
+            f'db;dur={sql_ms:.1f};desc="{timer.count} SQL", '
+            f'app;dur={max(total_ms - sql_ms, 0):.1f}, '
+            f'total;dur={total_ms:.1f}'
+        )
+
+        try:
+            route = self._route(request)
+            if self.sample_rate >= 1 or random.random() < self.sample_rate:
+                route_stats.record(route, total_ms, sql_ms, timer.count, response.status_code)
+            if total_ms >= self.slow_request_ms:
+                self._log_slow_request(request, response, route, total_ms, sql_ms, timer.count)
+            if inspector is not None:
+                query_stats.add(inspector, route)
+                query_stats.flush_if_due()
+        except Exception:
+            pass  # La mesure ne doit jamais faire échouer la requête
+
+        return response
+
+    @staticmethod
+    def _route(request):
+        """
+        Motif d'URL résolu (ex: api/products/<int:pk>/) pour regrouper les requêtes.
+        Les URL non résolues (404) et les méthodes inconnues sont regroupées sous une
+        seule clé: un robot qui essaie des chemins ne doit pas faire grossir les statistiques.
+        """
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return UNRESOLVED_ROUTE
+        method = request.method if request.method in KNOWN_METHODS else 'OTHER'
+        return f'{method} /{(match.route or "").lstrip("/")}'
+
+    @staticmethod
+    def _log_slow_request(request, response, route, total_ms, sql_ms, queries):
+        from .utils import create_log
+
+        user = getattr(request, 'user', None)
+        create_log(
+            log_type='warning',
+            message=f"Requête lente: {route} ({total_ms:.0f}ms)",
+            details=f"{queries} requête(s) SQL, {sql_ms:.0f}ms en base",
+            user=user if user is not None and user.is_authenticated else None,
+            module='system',
+            request=request,
+            metadata={
+                'route': route,
+                'sqlQueries': queries,
+                'sqlTimeMs': round(sql_ms, 1),
+                'totalTimeMs': round(total_ms, 1),
+            },
+            status_code=response.status_code,
+            response_time=total_ms,
+        )
+
+
+class ProfilingMiddleware:
+    """
+    Profile les requêtes ciblées par une session de profilage armée (apps/logs/profiling.py).
+    Sans session armée ni en-tête X-Profile-Token, la requête passe directement.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if TOKEN_HEADER not in request.META and not armed_state.sessions():
+            return self.get_response(request)
+
+        if not capture_lock.acquire(blocking=False):
+            # Une requête de ce processus est déjà profilée: celle-ci passe sans réserver de place
+            return self.get_response(request)
+        try:
+            match = matching_session(request)
+            if match is not None:
+                session_id, trace_memory = match
+                return profile_request(self.get_response, request, session_id, trace_memory)
+        finally:
+            capture_lock.release()
+        return self.get_response(request)
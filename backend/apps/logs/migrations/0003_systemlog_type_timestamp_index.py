@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 19:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0002_systemlog_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='systemlog',
+            index=models.Index(fields=['type', 'timestamp'], name='logs_system_type_823a54_idx'),
+        ),
+    ]
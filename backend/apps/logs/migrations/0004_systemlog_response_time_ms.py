@@ -0,0 +1,44 @@
+# Generated by Django 4.2.30 on 2026-10-19 19:05
+
+from django.db import migrations, models
+
+
+def parse_response_times(apps, schema_editor):
+    """
+    Renseigne response_time_ms à partir des anciennes valeurs texte ("123ms", "2.3s").
+    Une requête UPDATE par valeur distincte.
+    """
+    SystemLog = apps.get_model('logs', 'SystemLog')
+    valeurs = SystemLog.objects.exclude(response_time='').values_list('response_time', flat=True).distinct()
+    for valeur in list(valeurs):
+        texte = valeur.strip().lower().replace(',', '.')
+        try:
+            if texte.endswith('ms'):
+                ms = float(texte[:-2])
+            elif texte.endswith('s'):
+                ms = float(texte[:-1]) * 1000
+            else:
+                ms = float(texte)
+        except ValueError:
+            continue
+        SystemLog.objects.filter(response_time=valeur).update(response_time_ms=ms)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0003_systemlog_type_timestamp_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='systemlog',
+            name='response_time_ms',
+            field=models.FloatField(blank=True, null=True, verbose_name='Temps de réponse (ms)'),
+        ),
+        migrations.AddIndex(
+            model_name='systemlog',
+            index=models.Index(fields=['timestamp', 'endpoint'], name='logs_system_timesta_8d82cc_idx'),
+        ),
+        migrations.RunPython(parse_response_times, migrations.RunPython.noop),
+    ]
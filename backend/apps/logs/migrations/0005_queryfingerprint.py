@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-19 19:08
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0004_systemlog_response_time_ms'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueryFingerprint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=16, unique=True, verbose_name='Empreinte')),
+                ('sql', models.TextField(verbose_name='SQL normalisé')),
+                ('executions', models.PositiveBigIntegerField(default=0, verbose_name='Exécutions')),
+                ('total_ms', models.FloatField(default=0, verbose_name='Temps cumulé (ms)')),
+                ('max_ms', models.FloatField(default=0, verbose_name='Temps maximal (ms)')),
+                ('n_plus_one_requests', models.PositiveIntegerField(default=0, verbose_name='Requêtes HTTP avec N+1')),
+                ('slow_executions', models.PositiveIntegerField(default=0, verbose_name='Exécutions lentes')),
+                ('last_origin', models.CharField(blank=True, max_length=255, verbose_name='Origine (code)')),
+                ('last_route', models.CharField(blank=True, max_length=255, verbose_name='Dernière route')),
+                ('first_seen', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Première détection')),
+                ('last_seen', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Dernière détection')),
+            ],
+            options={
+                'verbose_name': 'Empreinte de requête SQL',
+                'verbose_name_plural': 'Empreintes de requêtes SQL',
+                'ordering': ['-n_plus_one_requests', '-total_ms'],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Recherche plein texte: colonne tsvector + GIN (PostgreSQL) ou table FTS5 (SQLite)
+
+from django.db import migrations
+
+
+def install(apps, schema_editor):
+    from apps.logs.search import install_search_backend
+    install_search_backend(schema_editor.connection)
+
+
+def uninstall(apps, schema_editor):
+    from apps.logs.search import uninstall_search_backend
+    uninstall_search_backend(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0005_queryfingerprint'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.30 on 2026-10-19 19:10
+
+from datetime import timezone as dt_timezone
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+
+
+def backfill_hourly(apps, schema_editor):
+    """Agrégats horaires des logs déjà présents (une requête groupée)"""
+    SystemLog = apps.get_model('logs', 'SystemLog')
+    SystemLogHourly = apps.get_model('logs', 'SystemLogHourly')
+    rows = (
+        SystemLog.objects.annotate(bucket=TruncHour('timestamp', tzinfo=dt_timezone.utc))
+        .values('bucket', 'type', 'module')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    SystemLogHourly.objects.bulk_create(
+        [SystemLogHourly(**row) for row in rows.iterator(chunk_size=2000)],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0006_systemlog_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SystemLogHourly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(verbose_name='Heure')),
+                ('type', models.CharField(max_length=20, verbose_name='Type')),
+                ('module', models.CharField(max_length=50, verbose_name='Module')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Nombre de logs')),
+            ],
+            options={
+                'verbose_name': 'Agrégat horaire des logs',
+                'verbose_name_plural': 'Agrégats horaires des logs',
+                'ordering': ['-bucket'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='systemlog',
+            index=models.Index(fields=['timestamp', 'type', 'module'], name='logs_system_timesta_78d9ba_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='systemloghourly',
+            constraint=models.UniqueConstraint(fields=('bucket', 'type', 'module'), name='unique_log_hour_bucket'),
+        ),
+        migrations.RunPython(backfill_hourly, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.30 on 2026-10-19 19:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('logs', '0007_systemloghourly'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfilingSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path_prefix', models.CharField(blank=True, max_length=255, verbose_name='Préfixe du chemin')),
+                ('method', models.CharField(blank=True, max_length=10, verbose_name='Méthode HTTP')),
+                ('remaining', models.PositiveIntegerField(default=0, verbose_name='Requêtes restantes')),
+                ('trace_memory', models.BooleanField(default=True, verbose_name='Suivi mémoire (tracemalloc)')),
+                ('expires_at', models.DateTimeField(verbose_name='Expiration')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Date de création')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Créé par')),
+            ],
+            options={
+                'verbose_name': 'Session de profilage',
+                'verbose_name_plural': 'Sessions de profilage',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProfileCapture',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('method', models.CharField(max_length=10, verbose_name='Méthode HTTP')),
+                ('path', models.CharField(max_length=500, verbose_name='Chemin')),
+                ('status_code', models.IntegerField(blank=True, null=True, verbose_name='Code de statut')),
+                ('duration_ms', models.FloatField(verbose_name='Durée (ms)')),
+                ('prof_data', models.BinaryField(verbose_name='Statistiques cProfile (.prof)')),
+                ('top_functions', models.TextField(blank=True, verbose_name='Fonctions les plus coûteuses')),
+                ('memory_top', models.JSONField(blank=True, default=list, verbose_name='Allocations mémoire principales')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Date de capture')),
+                ('session', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='captures', to='logs.profilingsession', verbose_name='Session')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': 'Capture de profilage',
+                'verbose_name_plural': 'Captures de profilage',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 
 class SystemLog(models.Model):
@@ -91,14 +92,22 @@ class SystemLog(models.Model):
         verbose_name='Temps de réponse'
     )
     
+    # Valeur numérique du temps de réponse, utilisée pour les percentiles de latence
+    response_time_ms = models.FloatField(
+        null=True,
+        blank=True,
+        verbose_name='Temps de réponse (ms)'
+    )
+    
     metadata = models.JSONField(
         default=dict,
         blank=True,
         verbose_name='Métadonnées'
     )
     
+    # Horodatage posé à la création du log (et non à son écriture différée)
     timestamp = models.DateTimeField(
-        auto_now_add=True,
+        default=timezone.now,
         verbose_name='Date et heure'
     )
     
@@ -111,6 +120,9 @@ class SystemLog(models.Model):
             models.Index(fields=['type']),
             models.Index(fields=['module']),
             models.Index(fields=['user']),
+            models.Index(fields=['type', 'timestamp']),  # purge par durée de conservation
+            models.Index(fields=['timestamp', 'endpoint']),  # analyse de latence par fenêtre
+            models.Index(fields=['timestamp', 'type', 'module']),  # séries temporelles
         ]
     
     def __str__(self):
@@ -120,3 +132,117 @@ class SystemLog(models.Model):
     def user_email(self):
         """Retourne l'email de l'utilisateur ou 'system'"""
         return self.user.email if self.user else 'system'
+
+
+class SystemLogHourly(models.Model):
+    """
+    Nombre de logs par heure, type et module, tenu à jour à l'écriture des logs
+    (apps/logs/rollup.py). Sert aux séries temporelles sur de longues périodes
+    et survit à la purge des logs détaillés.
+    """
+    bucket = models.DateTimeField(verbose_name='Heure')
+    type = models.CharField(max_length=20, verbose_name='Type')
+    module = models.CharField(max_length=50, verbose_name='Module')
+    count = models.PositiveIntegerField(default=0, verbose_name='Nombre de logs')
+    
+    class Meta:
+        verbose_name = 'Agrégat horaire des logs'
+        verbose_name_plural = 'Agrégats horaires des logs'
+        ordering = ['-bucket']
+        constraints = [
+            models.UniqueConstraint(fields=['bucket', 'type', 'module'], name='unique_log_hour_bucket'),
+        ]
+    
+    def __str__(self):
+        return f"{self.bucket:%Y-%m-%d %H:00} {self.type}/{self.module}: {self.count}"
+
+
+class QueryFingerprint(models.Model):
+    """
+    Agrégats par empreinte de requête SQL (requêtes N+1 et requêtes lentes)
+    alimentés par l'inspecteur de requêtes (apps/logs/queries.py)
+    """
+    fingerprint = models.CharField(max_length=16, unique=True, verbose_name='Empreinte')
+    sql = models.TextField(verbose_name='SQL normalisé')
+    executions = models.PositiveBigIntegerField(default=0, verbose_name='Exécutions')
+    total_ms = models.FloatField(default=0, verbose_name='Temps cumulé (ms)')
+    max_ms = models.FloatField(default=0, verbose_name='Temps maximal (ms)')
+    n_plus_one_requests = models.PositiveIntegerField(default=0, verbose_name='Requêtes HTTP avec N+1')
+    slow_executions = models.PositiveIntegerField(default=0, verbose_name='Exécutions lentes')
+    last_origin = models.CharField(max_length=255, blank=True, verbose_name='Origine (code)')
+    last_route = models.CharField(max_length=255, blank=True, verbose_name='Dernière route')
+    first_seen = models.DateTimeField(default=timezone.now, verbose_name='Première détection')
+    last_seen = models.DateTimeField(default=timezone.now, verbose_name='Dernière détection')
+    
+    class Meta:
+        verbose_name = 'Empreinte de requête SQL'
+        verbose_name_plural = 'Empreintes de requêtes SQL'
+        ordering = ['-n_plus_one_requests', '-total_ms']
+    
+    def __str__(self):
+        return f"{self.fingerprint} ({self.executions} exécutions)"
+
+
+class ProfilingSession(models.Model):
+    """
+    Profilage armé par un administrateur: les `remaining` prochaines requêtes dont
+    le chemin commence par `path_prefix` seront profilées (apps/logs/profiling.py)
+    """
+    path_prefix = models.CharField(max_length=255, blank=True, verbose_name='Préfixe du chemin')
+    method = models.CharField(max_length=10, blank=True, verbose_name='Méthode HTTP')
+    remaining = models.PositiveIntegerField(default=0, verbose_name='Requêtes restantes')
+    trace_memory = models.BooleanField(default=True, verbose_name='Suivi mémoire (tracemalloc)')
+    expires_at = models.DateTimeField(verbose_name='Expiration')
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Créé par'
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Date de création')
+    
+    class Meta:
+        verbose_name = 'Session de profilage'
+        verbose_name_plural = 'Sessions de profilage'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.method or '*'} {self.path_prefix or '/'} ({self.remaining} restantes)"
+
+
+class ProfileCapture(models.Model):
+    """Résultat du profilage d'une requête (cProfile + tracemalloc)"""
+    session = models.ForeignKey(
+        ProfilingSession,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='captures',
+        verbose_name='Session'
+    )
+    method = models.CharField(max_length=10, verbose_name='Méthode HTTP')
+    path = models.CharField(max_length=500, verbose_name='Chemin')
+    status_code = models.IntegerField(null=True, blank=True, verbose_name='Code de statut')
+    duration_ms = models.FloatField(verbose_name='Durée (ms)')
+    prof_data = models.BinaryField(verbose_name='Statistiques cProfile (.prof)')
+    top_functions = models.TextField(blank=True, verbose_name='Fonctions les plus coûteuses')
+    memory_top = models.JSONField(default=list, blank=True, verbose_name='Allocations mémoire principales')
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Utilisateur'
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Date de capture')
+    
+    class Meta:
+        verbose_name = 'Capture de profilage'
+        verbose_name_plural = 'Captures de profilage'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f}ms)"
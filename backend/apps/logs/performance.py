@@ -0,0 +1,124 @@
+"""
+Statistiques de performance par route, en mémoire
+
+Chaque requête échantillonnée est rangée dans un histogramme par route et par
+minute. Seules les dernières minutes (settings.PERF_WINDOW_MINUTES) sont gardées:
+les statistiques portent donc sur une fenêtre glissante et la mémoire reste bornée.
+Les données sont propres à chaque processus worker.
+"""
+import bisect
+import threading
+import time
+
+from django.conf import settings
+
+from .latency import HISTOGRAM_BOUNDS, percentiles_from_histogram
+
+
+class RouteSlot:
+    """Agrégats d'une route sur une minute"""
+    __slots__ = ('count', 'total_ms', 'max_ms', 'sql_ms', 'queries', 'errors', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.sql_ms = 0.0
+        self.queries = 0
+        self.errors = 0
+        self.buckets = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+
+    def add(self, total_ms, sql_ms, queries, status_code):
+        self.count += 1
+        self.total_ms += total_ms
+        self.max_ms = max(self.max_ms, total_ms)
+        self.sql_ms += sql_ms
+        self.queries += queries
+        if status_code >= 500:
+            self.errors += 1
+        self.buckets[bisect.bisect_left(HISTOGRAM_BOUNDS, total_ms)] += 1
+
+    def merge(self, other):
+        self.count += other.count
+        self.total_ms += other.total_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+        self.sql_ms += other.sql_ms
+        self.queries += other.queries
+        self.errors += other.errors
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+
+
+class RouteStatsRegistry:
+    """Histogrammes glissants par route (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._minutes = {}  # minute -> {route: RouteSlot}
+
+    @property
+    def window_minutes(self):
+        return getattr(settings, 'PERF_WINDOW_MINUTES', 15)
+
+    def record(self, route, total_ms, sql_ms, queries, status_code):
+        minute = int(time.time() // 60)
+        with self._lock:
+            routes = self._minutes.get(minute)
+            if routes is None:
+                routes = self._minutes[minute] = {}
+                limite = minute - self.window_minutes
+                for ancienne in [m for m in self._minutes if m <= limite]:
+                    del self._minutes[ancienne]
+            slot = routes.get(route)
+            if slot is None:
+                slot = routes[route] = RouteSlot()
+            slot.add(total_ms, sql_ms, queries, status_code)
+
+    def snapshot(self):
+        """Fusionne les minutes de la fenêtre: {route: RouteSlot}"""
+        limite = int(time.time() // 60) - self.window_minutes
+        totaux = {}
+        with self._lock:
+            for minute, routes in self._minutes.items():
+                if minute <= limite:
+                    continue
+                for route, slot in routes.items():
+                    total = totaux.get(route)
+                    if total is None:
+                        total = totaux[route] = RouteSlot()
+                    total.merge(slot)
+        return totaux
+
+    def top(self, sort='hot', limit=20):
+        """
+        Routes triées par temps cumulé ('hot') ou par p99 ('slow').
+        """
+        minutes = self.window_minutes
+        rows = []
+        for route, slot in self.snapshot().items():
+            percentiles = percentiles_from_histogram(slot.buckets, slot.count)
+            rows.append({
+                'route': route,
+                'count': slot.count,
+                'per_min': round(slot.count / minutes, 2),
+                'total_ms': round(slot.total_ms, 1),
+                'avg_ms': round(slot.total_ms / slot.count, 1),
+                **{
+                    f'{nom}_ms': round(min(valeur, slot.max_ms) if valeur is not None else slot.max_ms, 1)
+                    for nom, valeur in percentiles.items()
+                },
+                'max_ms': round(slot.max_ms, 1),
+                'avg_sql_ms': round(slot.sql_ms / slot.count, 1),
+                'avg_queries': round(slot.queries / slot.count, 1),
+                'sql_share': round(slot.sql_ms / slot.total_ms, 3) if slot.total_ms else 0,
+                'errors': slot.errors,
+            })
+        key = 'p99_ms' if sort == 'slow' else 'total_ms'
+        rows.sort(key=lambda row: row[key], reverse=True)
+        return rows[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._minutes.clear()
+
+
+route_stats = RouteStatsRegistry()
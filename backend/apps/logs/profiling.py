@@ -0,0 +1,193 @@
+"""
+Profilage à la demande (cProfile + tracemalloc)
+
+Un administrateur arme une ProfilingSession: les N prochaines requêtes dont le
+chemin correspond sont profilées et le résultat est stocké dans ProfileCapture
+(téléchargeable en .prof, lisible avec `python -m pstats` ou snakeviz).
+Une requête portant l'en-tête X-Profile-Token signé (délivré à l'armement)
+est profilée quel que soit son chemin, dans la limite des requêtes restantes et
+de l'expiration de la session (un désarmement invalide aussi le jeton).
+
+Une seule capture à la fois par processus (capture_lock): à partir de Python
+3.12, cProfile refuse un second profileur actif. Les requêtes concurrentes ne
+sont pas profilées et gardent leur place dans la session. Avec les workers
+gthread, une capture contient aussi les fonctions exécutées pendant ce temps
+par les autres threads du processus (sous 3.12+, le profileur est global au
+processus): la comparer au chemin de la requête profilée.
+
+Désarmé, le coût par requête se limite à la lecture d'un état en mémoire,
+rafraîchi depuis la base au plus toutes les PROFILING_REFRESH_SECONDS secondes.
+"""
+import cProfile
+import io
+import logging
+import marshal
+import pstats
+import threading
+import time
+import tracemalloc
+
+from django.core import signing
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ProfilingSession, ProfileCapture
+
+
+logger = logging.getLogger(__name__)
+
+PROFILING_REFRESH_SECONDS = 5
+TOKEN_HEADER = 'HTTP_X_PROFILE_TOKEN'
+TOKEN_SALT = 'apps.logs.profiling'
+TOKEN_MAX_AGE = 15 * 60
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 20
+
+
+class ArmedState:
+    """Sessions actives, mises en cache dans le processus"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = []
+        self._checked_at = None
+
+    def sessions(self):
+        now = time.monotonic()
+        if self._checked_at is None or now - self._checked_at >= PROFILING_REFRESH_SECONDS:
+            self.refresh()
+        return self._sessions
+
+    def refresh(self):
+        with self._lock:
+            try:
+                self._sessions = list(
+                    ProfilingSession.objects.filter(remaining__gt=0, expires_at__gt=timezone.now())
+                    .values('id', 'path_prefix', 'method', 'trace_memory')
+                )
+            except Exception:
+                self._sessions = []  # table absente (migrations non appliquées)
+            self._checked_at = time.monotonic()
+
+
+armed_state = ArmedState()
+
+# Un seul profileur cProfile actif par processus (obligatoire à partir de Python 3.12)
+capture_lock = threading.Lock()
+
+
+def make_token(session):
+    return signing.dumps({'session': session.id}, salt=TOKEN_SALT)
+
+
+def session_from_token(token):
+    """Identifiant de session pour un jeton valide, sinon None"""
+    try:
+        data = signing.loads(token, salt=TOKEN_SALT, max_age=TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    return data.get('session')
+
+
+def matching_session(request):
+    """
+    Retourne (session_id, trace_memory) si la requête doit être profilée, sinon None.
+    Réserve une des requêtes restantes de la session (décrément atomique).
+    """
+    token = request.META.get(TOKEN_HEADER)
+    if token:
+        session_id = session_from_token(token)
+        if session_id is not None:
+            # Mêmes limites que les sessions armées: non expirée, requêtes restantes
+            reserved = ProfilingSession.objects.filter(
+                id=session_id, remaining__gt=0, expires_at__gt=timezone.now()
+            ).update(remaining=F('remaining') - 1)
+            if reserved:
+                trace_memory = ProfilingSession.objects.filter(id=session_id).values_list(
+                    'trace_memory', flat=True
+                ).first()
+                return session_id, bool(trace_memory)
+
+    sessions = armed_state.sessions()
+    if not sessions:
+        return None
+    for session in sessions:
+        if session['method'] and session['method'] != request.method:
+            continue
+        if not request.path.startswith(session['path_prefix'] or '/'):
+            continue
+        reserved = ProfilingSession.objects.filter(id=session['id'], remaining__gt=0).update(
+            remaining=F('remaining') - 1
+        )
+        if reserved:
+            return session['id'], session['trace_memory']
+        armed_state.refresh()  # session épuisée par un autre worker
+    return None
+
+
+def _top_functions(profile):
+    stream = io.StringIO()
+    stats = pstats.Stats(profile, stream=stream)
+    stats.strip_dirs().sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+    return stream.getvalue()
+
+
+def _top_allocations(snapshot):
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    ))
+    return [
+        {
+            'location': str(stat.traceback[0]),
+            'size_kb': round(stat.size / 1024, 1),
+            'count': stat.count,
+        }
+        for stat in snapshot.statistics('lineno')[:TOP_ALLOCATIONS]
+    ]
+
+
+def profile_request(get_response, request, session_id, trace_memory):
+    """
+    Exécute la requête sous cProfile (et tracemalloc) puis enregistre la capture.
+    L'appelant détient capture_lock.
+    """
+    started_tracemalloc = False
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        started_tracemalloc = True
+
+    profile = cProfile.Profile()
+    start = time.perf_counter()
+    try:
+        try:
+            profile.enable()
+        except ValueError:
+            # Autre outil de profilage actif (débogueur, couverture): requête non profilée
+            logger.warning('Profilage impossible: un autre profileur est actif dans le processus')
+            profile = None
+        response = get_response(request)
+    finally:
+        if profile is not None:
+            profile.disable()
+        duration_ms = (time.perf_counter() - start) * 1000
+        snapshot = tracemalloc.take_snapshot() if trace_memory and tracemalloc.is_tracing() else None
+        if started_tracemalloc:
+            tracemalloc.stop()
+
+    if profile is None:
+        return response
+    profile.create_stats()
+    user = getattr(request, 'user', None)
+    ProfileCapture.objects.create(
+        session_id=session_id,
+        method=request.method,
+        path=request.get_full_path()[:500],
+        status_code=response.status_code,
+        duration_ms=duration_ms,
+        prof_data=marshal.dumps(profile.stats),
+        top_functions=_top_functions(profile),
+        memory_top=_top_allocations(snapshot) if snapshot is not None else [],
+        user=user if user is not None and user.is_authenticated else None,
+    )
+    return response
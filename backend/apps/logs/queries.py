@@ -0,0 +1,197 @@
+"""
+Inspection des requêtes SQL: empreintes, détection N+1 et requêtes lentes
+
+Chaque requête SQL est normalisée en empreinte (littéraux et listes IN remplacés
+par des marqueurs). Pendant une requête HTTP inspectée, les empreintes répétées au
+moins settings.QUERY_N1_THRESHOLD fois sont signalées comme N+1; les requêtes plus
+longues que settings.QUERY_SLOW_MS sont notées avec la ligne de code applicative
+qui les a déclenchées. Les agrégats sont conservés en mémoire puis fusionnés
+périodiquement dans la table QueryFingerprint (manage.py query_offenders).
+
+Modes (settings.QUERY_INSPECTOR_MODE):
+    'off'     aucune inspection
+    'sample'  une part des requêtes HTTP (QUERY_INSPECTOR_SAMPLE_RATE) est inspectée
+    'raise'   toutes les requêtes sont inspectées et un N+1 lève NPlusOneError (développement)
+"""
+import hashlib
+import os
+import random
+import re
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+
+class NPlusOneError(Exception):
+    """Requête SQL répétée dans une même requête HTTP (mode 'raise')"""
+
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\bIN\s*\((?:\s*(?:\?|%s|\$\d+)\s*,?)+\)', re.IGNORECASE)
+_PLACEHOLDER_RE = re.compile(r'%s|\$\d+')
+_SPACES_RE = re.compile(r'\s+')
+
+_APPS_DIR = os.path.join(str(settings.BASE_DIR), 'apps') + os.sep
+_SELF_FILES = {os.path.abspath(__file__), os.path.join(_APPS_DIR, 'logs', 'middleware.py')}
+
+
+def normalize_sql(sql):
+    """Remplace les littéraux par '?' et réduit les listes IN (...) à IN (...)"""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _PLACEHOLDER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    return _SPACES_RE.sub(' ', sql).strip()
+
+
+def fingerprint(sql):
+    """Retourne (empreinte courte, SQL normalisé)"""
+    normalized = normalize_sql(sql)
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16], normalized
+
+
+def origin_frame():
+    """Première ligne de code applicatif (apps/...) dans la pile d'appel, ou ''"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_APPS_DIR) and filename not in _SELF_FILES:
+            return f'{os.path.relpath(filename, settings.BASE_DIR)}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return ''
+
+
+class QueryInspector:
+    """execute_wrapper: empreintes et durées des requêtes SQL d'une requête HTTP"""
+
+    def __init__(self, raise_on_n_plus_one=False):
+        self.raise_on_n_plus_one = raise_on_n_plus_one
+        self.threshold = getattr(settings, 'QUERY_N1_THRESHOLD', 5)
+        self.slow_ms = getattr(settings, 'QUERY_SLOW_MS', 200)
+        self.queries = {}  # empreinte -> [sql normalisé, nombre, durée ms, max ms, origine]
+        self.slow = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            self._record(sql, duration_ms)
+
+    def _record(self, sql, duration_ms):
+        key, normalized = fingerprint(sql)
+        entry = self.queries.get(key)
+        if entry is None:
+            entry = self.queries[key] = [normalized, 0, 0.0, 0.0, '']
+        entry[1] += 1
+        entry[2] += duration_ms
+        entry[3] = max(entry[3], duration_ms)
+
+        if duration_ms >= self.slow_ms:
+            origin = origin_frame()
+            entry[4] = origin
+            self.slow.append({
+                'fingerprint': key,
+                'sql': normalized,
+                'duration_ms': round(duration_ms, 1),
+                'origin': origin,
+            })
+
+        if entry[1] == self.threshold:
+            entry[4] = entry[4] or origin_frame()
+            if self.raise_on_n_plus_one:
+                raise NPlusOneError(
+                    f"Requête exécutée {self.threshold} fois ({entry[4] or 'origine inconnue'}): {normalized}"
+                )
+
+    def n_plus_one(self):
+        return {key: entry for key, entry in self.queries.items() if entry[1] >= self.threshold}
+
+
+class QueryStatsStore:
+    """Agrégats en mémoire, fusionnés dans QueryFingerprint toutes les QUERY_STATS_FLUSH_INTERVAL secondes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._last_flush = time.monotonic()
+
+    def add(self, inspector, route):
+        n_plus_one = inspector.n_plus_one()
+        slow = {item['fingerprint'] for item in inspector.slow}
+        if not n_plus_one and not slow:
+            return
+        with self._lock:
+            for key, (normalized, count, total_ms, max_ms, origin) in inspector.queries.items():
+                if key not in n_plus_one and key not in slow:
+                    continue
+                stats = self._pending.get(key)
+                if stats is None:
+                    stats = self._pending[key] = {
+                        'sql': normalized, 'executions': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                        'n_plus_one': 0, 'slow': 0, 'origin': '', 'route': '',
+                    }
+                stats['executions'] += count
+                stats['total_ms'] += total_ms
+                stats['max_ms'] = max(stats['max_ms'], max_ms)
+                stats['n_plus_one'] += 1 if key in n_plus_one else 0
+                stats['slow'] += sum(1 for item in inspector.slow if item['fingerprint'] == key)
+                stats['origin'] = origin or stats['origin']
+                stats['route'] = route
+
+    def flush_if_due(self):
+        interval = getattr(settings, 'QUERY_STATS_FLUSH_INTERVAL', 60)
+        if time.monotonic() - self._last_flush >= interval:
+            self.flush()
+
+    def flush(self):
+        from .models import QueryFingerprint
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+
+        now = timezone.now()
+        with transaction.atomic():
+            existing = set(
+                QueryFingerprint.objects.filter(fingerprint__in=pending).values_list('fingerprint', flat=True)
+            )
+            QueryFingerprint.objects.bulk_create([
+                QueryFingerprint(fingerprint=key, sql=stats['sql'], first_seen=now, last_seen=now)
+                for key, stats in pending.items() if key not in existing
+            ], ignore_conflicts=True)
+            for key, stats in pending.items():
+                QueryFingerprint.objects.filter(fingerprint=key).update(
+                    executions=F('executions') + stats['executions'],
+                    total_ms=F('total_ms') + stats['total_ms'],
+                    max_ms=Greatest(F('max_ms'), Value(stats['max_ms'], output_field=FloatField())),
+                    n_plus_one_requests=F('n_plus_one_requests') + stats['n_plus_one'],
+                    slow_executions=F('slow_executions') + stats['slow'],
+                    last_origin=stats['origin'][:255],
+                    last_route=stats['route'][:255],
+                    last_seen=now,
+                )
+        return len(pending)
+
+
+query_stats = QueryStatsStore()
+
+
+def inspector_for_request():
+    """Retourne un QueryInspector si cette requête doit être inspectée, sinon None"""
+    mode = getattr(settings, 'QUERY_INSPECTOR_MODE', 'sample')
+    if mode == 'raise':
+        return QueryInspector(raise_on_n_plus_one=True)
+    if mode == 'sample' and random.random() < getattr(settings, 'QUERY_INSPECTOR_SAMPLE_RATE', 0.05):
+        return QueryInspector()
+    return None
@@ -0,0 +1,84 @@
+"""
+Rétention des logs système
+
+Chaque type de log a une durée de conservation (settings.SYSTEM_LOG_RETENTION_DAYS).
+Les logs expirés sont supprimés par lots d'identifiants, via l'index (type, timestamp),
+avec un DELETE SQL direct: aucun objet n'est chargé en mémoire et chaque lot est
+une transaction courte qui ne bloque pas l'application.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import SystemLog
+
+
+DEFAULT_RETENTION_DAYS = {
+    'info': 30,
+    'success': 30,
+    'warning': 90,
+    'error': 180,
+}
+
+
+def retention_days():
+    """Durée de conservation (jours) par type de log"""
+    return {**DEFAULT_RETENTION_DAYS, **getattr(settings, 'SYSTEM_LOG_RETENTION_DAYS', {})}
+
+
+def expired_logs(log_type, days, now=None):
+    limite = (now or timezone.now()) - timedelta(days=days)
+    return SystemLog.objects.filter(type=log_type, timestamp__lt=limite)
+
+
+def delete_in_chunks(queryset, chunk_size=5000, pause=0):
+    """
+    Supprime les lignes du queryset par lots d'identifiants.
+    Retourne le nombre de lignes supprimées.
+    """
+    total = 0
+    ids_queryset = queryset.order_by().values_list('id', flat=True)
+    while True:
+        ids = list(ids_queryset[:chunk_size])
+        if not ids:
+            break
+        with transaction.atomic():
+            # SystemLog n'a aucune relation inverse: pas besoin du Collector de l'ORM
+            total += SystemLog.objects.filter(id__in=ids)._raw_delete(SystemLog.objects.db)
+        if pause:
+            time.sleep(pause)
+    return total
+
+
+def purge_expired_logs(chunk_size=5000, pause=0, dry_run=False):
+    """
+    Supprime les logs plus anciens que leur durée de conservation.
+    Retourne un dictionnaire {type: nombre de logs supprimés (ou à supprimer)}.
+    """
+    now = timezone.now()
+    resultat = {}
+    for log_type, days in retention_days().items():
+        if not days:
+            continue  # 0 / None: conservation illimitée
+        queryset = expired_logs(log_type, days, now)
+        if dry_run:
+            resultat[log_type] = queryset.count()
+        else:
+            resultat[log_type] = delete_in_chunks(queryset, chunk_size=chunk_size, pause=pause)
+    return resultat
+
+
+def clear_all_logs(chunk_size=5000):
+    """
+    Vide la table des logs. Sur PostgreSQL un TRUNCATE est instantané quelle que
+    soit la taille de la table; ailleurs, suppression SQL par lots.
+    """
+    count = SystemLog.objects.count()
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE TABLE {connection.ops.quote_name(SystemLog._meta.db_table)}')
+        return count
+    return delete_in_chunks(SystemLog.objects.all(), chunk_size=chunk_size)
@@ -0,0 +1,112 @@
+"""
+Agrégats horaires des logs et séries temporelles
+
+Chaque lot de logs écrit (buffer.py) incrémente SystemLogHourly par
+(heure, type, module). Les séries temporelles courtes sont calculées directement
+sur SystemLog (index timestamp, type, module); les longues utilisent les agrégats.
+"""
+from collections import Counter
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDay, TruncHour
+
+from .models import SystemLog, SystemLogHourly
+
+
+INTERVALS = {'hour': TruncHour, 'day': TruncDay}
+
+
+def hour_bucket(moment):
+    return moment.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def record_logs(logs):
+    """Incrémente les agrégats horaires pour des logs qui viennent d'être écrits"""
+    counts = Counter((hour_bucket(log.timestamp), log.type, log.module or '') for log in logs)
+    for (bucket, log_type, module), count in counts.items():
+        updated = SystemLogHourly.objects.filter(bucket=bucket, type=log_type, module=module).update(
+            count=F('count') + count
+        )
+        if updated:
+            continue
+        try:
+            with transaction.atomic():
+                SystemLogHourly.objects.create(bucket=bucket, type=log_type, module=module, count=count)
+        except IntegrityError:
+            # Créé entre-temps par un autre worker
+            SystemLogHourly.objects.filter(bucket=bucket, type=log_type, module=module).update(
+                count=F('count') + count
+            )
+
+
+def rebuild(since=None):
+    """
+    Recalcule les agrégats horaires depuis SystemLog (depuis `since`, ou tout).
+
+    Les heures antérieures au plus ancien log restant (purgées par purge_logs) ne
+    sont jamais recalculées: leurs agrégats sont la seule trace qui reste. L'heure
+    du plus ancien log est elle aussi conservée, sauf s'il tombe pile sur l'heure:
+    la purge a pu n'en supprimer qu'une partie.
+    Retourne le nombre d'agrégats créés.
+    """
+    oldest = SystemLog.objects.order_by('timestamp').values_list('timestamp', flat=True)[:1]
+    if not oldest:
+        return 0
+    start = hour_bucket(oldest[0])
+    if start != oldest[0]:
+        start += timedelta(hours=1)
+    if since is not None:
+        start = max(start, hour_bucket(since))
+
+    logs = SystemLog.objects.filter(timestamp__gte=start)
+    rollups = SystemLogHourly.objects.filter(bucket__gte=start)
+
+    rows = (
+        logs.annotate(bucket=TruncHour('timestamp', tzinfo=dt_timezone.utc))
+        .values('bucket', 'type', 'module')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    with transaction.atomic():
+        rollups.delete()
+        created = SystemLogHourly.objects.bulk_create(
+            [SystemLogHourly(**row) for row in rows.iterator(chunk_size=2000)],
+            batch_size=1000,
+        )
+    return len(created)
+
+
+def timeseries(since, until, interval='hour', log_type=None, module=None):
+    """
+    Nombre de logs par (intervalle, type, module) entre `since` et `until`.
+
+    Les périodes plus longues que settings.LOG_TIMESERIES_RAW_MAX_HOURS sont
+    calculées sur les agrégats horaires. Retourne (source, lignes).
+    """
+    trunc = INTERVALS[interval]
+    raw_max = timedelta(hours=getattr(settings, 'LOG_TIMESERIES_RAW_MAX_HOURS', 48))
+
+    if until - since <= raw_max:
+        source = 'raw'
+        queryset = SystemLog.objects.filter(timestamp__gte=since, timestamp__lt=until)
+        date_field, total = 'timestamp', Count('id')
+    else:
+        source = 'rollup'
+        queryset = SystemLogHourly.objects.filter(bucket__gte=hour_bucket(since), bucket__lt=until)
+        date_field, total = 'bucket', Sum('count')
+
+    if log_type:
+        queryset = queryset.filter(type=log_type)
+    if module:
+        queryset = queryset.filter(module=module)
+
+    rows = (
+        queryset.annotate(period=trunc(date_field))
+        .values('period', 'type', 'module')
+        .annotate(count=total)
+        .order_by('period', 'type', 'module')
+    )
+    return source, list(rows)
@@ -0,0 +1,205 @@
+"""
+Recherche plein texte dans les logs système
+
+- PostgreSQL: colonne générée `search_vector` (tsvector, dictionnaire français)
+  indexée en GIN, tenue à jour par la base à chaque insertion;
+- SQLite: table virtuelle FTS5 `logs_systemlog_fts` alimentée par triggers;
+- autres bases: repli sur icontains.
+
+La colonne et la table FTS ne sont pas déclarées sur le modèle: elles sont
+créées par la migration 0006 et vérifiées après chaque migrate (post_migrate),
+car SQLite supprime les triggers quand il reconstruit une table.
+"""
+import re
+
+from django.contrib.auth import get_user_model
+from django.utils.html import escape
+from django.db.models import BooleanField, FloatField, Q, TextField
+from django.db.models.expressions import RawSQL
+
+from .models import SystemLog
+
+
+TABLE = SystemLog._meta.db_table
+FTS_TABLE = f'{TABLE}_fts'
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_END = '</mark>'
+# Marqueurs posés par la base autour des termes trouvés, remplacés par <mark>
+# après échappement du texte (render_highlight)
+MARKER_START = '\x02'
+MARKER_END = '\x03'
+
+POSTGRESQL_SETUP = [
+    f"""
+    ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('french', coalesce(message, '')), 'A') ||
+        setweight(to_tsvector('french', coalesce(details, '')), 'B')
+    ) STORED
+    """,
+    f'CREATE INDEX IF NOT EXISTS {TABLE}_search_gin ON {TABLE} USING GIN (search_vector)',
+]
+POSTGRESQL_TEARDOWN = [
+    f'DROP INDEX IF EXISTS {TABLE}_search_gin',
+    f'ALTER TABLE {TABLE} DROP COLUMN IF EXISTS search_vector',
+]
+
+SQLITE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, message, details) VALUES (new.id, new.message, new.details);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, message, details)
+        VALUES ('delete', old.id, old.message, old.details);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF message, details ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, message, details)
+        VALUES ('delete', old.id, old.message, old.details);
+        INSERT INTO {FTS_TABLE}(rowid, message, details) VALUES (new.id, new.message, new.details);
+    END
+    """,
+]
+SQLITE_TEARDOWN = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+
+def install_search_backend(connection):
+    """Crée (si besoin) la structure de recherche pour la base de `connection`"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            for sql in POSTGRESQL_SETUP:
+                cursor.execute(sql)
+        elif connection.vendor == 'sqlite':
+            tables = connection.introspection.table_names(cursor)
+            if TABLE not in tables:
+                return
+            triggers_ok = _sqlite_triggers_count(cursor) == len(SQLITE_TRIGGERS)
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"message, details, content='{TABLE}', content_rowid='id', "
+                f"tokenize='unicode61 remove_diacritics 2')"
+            )
+            for sql in SQLITE_TRIGGERS:
+                cursor.execute(sql)
+            if FTS_TABLE not in tables or not triggers_ok:
+                # Index absent ou triggers perdus: réindexation complète
+                cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def uninstall_search_backend(connection):
+    statements = {'postgresql': POSTGRESQL_TEARDOWN, 'sqlite': SQLITE_TEARDOWN}.get(connection.vendor, [])
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def _sqlite_triggers_count(cursor):
+    cursor.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND tbl_name = %s AND name LIKE %s",
+        [TABLE, f'{FTS_TABLE}_%'],
+    )
+    return cursor.fetchone()[0]
+
+
+def _fts5_query(term):
+    """Transforme la saisie utilisateur en requête FTS5 sûre (mots entre guillemets, préfixe sur le dernier)"""
+    words = re.findall(r'\w+', term, flags=re.UNICODE)
+    if not words:
+        return None
+    parts = [f'"{word}"' for word in words]
+    parts[-1] += '*'
+    return ' '.join(parts)
+
+
+def _email_user_ids(term, limit=500):
+    """Utilisateurs dont l'email contient `term` (recherche des logs d'un utilisateur)"""
+    return list(
+        get_user_model().objects.filter(email__icontains=term).order_by().values_list('id', flat=True)[:limit]
+    )
+
+
+def _restrict(queryset, match_sql, params, user_ids):
+    """
+    Garde les logs dont le texte correspond (`match_sql`) ou dont l'utilisateur est dans
+    `user_ids`. Sans utilisateur trouvé, la condition reste seule dans le WHERE (index utilisé).
+    """
+    if not user_ids:
+        return queryset.extra(where=[match_sql], params=params)
+    return queryset.annotate(
+        search_match=RawSQL(match_sql, params, output_field=BooleanField())
+    ).filter(Q(search_match=True) | Q(user_id__in=user_ids))
+
+
+def search_logs(queryset, term, connection, highlight=True):
+    """
+    Filtre `queryset` sur `term` (texte des logs, ou email de l'utilisateur) et annote
+    `search_rank` (plus grand = plus pertinent) et, si demandé, `search_highlight`
+    (message brut avec les termes entre MARKER_START et MARKER_END, à passer à
+    render_highlight). Les logs trouvés seulement par
+    l'email n'ont ni rang ni surlignage.
+    """
+    term = (term or '').strip()
+    if not term:
+        return queryset
+    user_ids = _email_user_ids(term)
+
+    if connection.vendor == 'postgresql':
+        tsquery = "websearch_to_tsquery('french', %s)"
+        queryset = _restrict(queryset, f'{TABLE}.search_vector @@ {tsquery}', [term], user_ids)
+        queryset = queryset.annotate(
+            search_rank=RawSQL(f'ts_rank({TABLE}.search_vector, {tsquery})', [term], output_field=FloatField())
+        )
+        if highlight:
+            queryset = queryset.annotate(search_highlight=RawSQL(
+                f"ts_headline('french', {TABLE}.message, {tsquery}, %s)",
+                [term, f'StartSel={MARKER_START}, StopSel={MARKER_END}, HighlightAll=true'],
+                output_field=TextField(),
+            ))
+        return queryset
+
+    if connection.vendor == 'sqlite':
+        match = _fts5_query(term)
+        if match is None:
+            return queryset.filter(user_id__in=user_ids)
+        queryset = _restrict(
+            queryset,
+            f'{TABLE}.id IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)',
+            [match],
+            user_ids,
+        )
+        # bm25 est négatif (plus petit = plus pertinent): on l'inverse
+        queryset = queryset.annotate(search_rank=RawSQL(
+            f'(SELECT -bm25({FTS_TABLE}, 2.0, 1.0) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = {TABLE}.id)',
+            [match],
+            output_field=FloatField(),
+        ))
+        if highlight:
+            queryset = queryset.annotate(search_highlight=RawSQL(
+                f"(SELECT highlight({FTS_TABLE}, 0, %s, %s) FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s AND rowid = {TABLE}.id)",
+                [MARKER_START, MARKER_END, match],
+                output_field=TextField(),
+            ))
+        return queryset
+
+    return queryset.filter(Q(message__icontains=term) | Q(details__icontains=term) | Q(user_id__in=user_ids))
+
+
+def render_highlight(text):
+    """
+    Message surligné prêt pour l'affichage HTML: le texte du log (valeurs saisies
+    par les utilisateurs) est échappé, seuls les <mark> posés par la recherche restent.
+    """
+    if text is None:
+        return None
+    return escape(text).replace(MARKER_START, HIGHLIGHT_START).replace(MARKER_END, HIGHLIGHT_END)
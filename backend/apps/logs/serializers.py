@@ -1,9 +1,12 @@
 from rest_framework import serializers
-from .models import SystemLog
+from .models import SystemLog, ProfilingSession, ProfileCapture
+from .search import render_highlight
 
 
 class SystemLogSerializer(serializers.ModelSerializer):
     user_email = serializers.SerializerMethodField()
+    search_rank = serializers.SerializerMethodField()
+    search_highlight = serializers.SerializerMethodField()
     type_display = serializers.CharField(source='get_type_display', read_only=True)
     module_display = serializers.CharField(source='get_module_display', read_only=True)
     
@@ -25,13 +28,25 @@ class SystemLogSerializer(serializers.ModelSerializer):
             'endpoint',
             'status_code',
             'response_time',
+            'response_time_ms',
             'metadata',
-            'timestamp'
+            'timestamp',
+            'search_rank',
+            'search_highlight'
         ]
         read_only_fields = ['id', 'timestamp']
     
     def get_user_email(self, obj):
         return obj.user.email if obj.user else 'system'
+    
+    def get_search_rank(self, obj):
+        # Présent uniquement lors d'une recherche plein texte
+        rank = getattr(obj, 'search_rank', None)
+        return round(rank, 6) if rank is not None else None
+    
+    def get_search_highlight(self, obj):
+        # Texte échappé: seuls les <mark> de la recherche sont du HTML
+        return render_highlight(getattr(obj, 'search_highlight', None))
 
 
 class SystemLogDetailSerializer(serializers.ModelSerializer):
@@ -59,6 +74,7 @@ class SystemLogDetailSerializer(serializers.ModelSerializer):
             'endpoint',
             'status_code',
             'response_time',
+            'response_time_ms',
             'metadata',
             'timestamp'
         ]
@@ -71,3 +87,45 @@ class SystemLogDetailSerializer(serializers.ModelSerializer):
         if obj.user:
             return obj.user.get_full_name() or obj.user.username
         return 'Système'
+
+
+class ProfilingSessionSerializer(serializers.ModelSerializer):
+    captures_count = serializers.IntegerField(read_only=True)
+    
+    class Meta:
+        model = ProfilingSession
+        fields = [
+            'id',
+            'path_prefix',
+            'method',
+            'remaining',
+            'trace_memory',
+            'expires_at',
+            'created_by',
+            'created_at',
+            'captures_count'
+        ]
+        read_only_fields = ['id', 'expires_at', 'created_by', 'created_at']
+
+
+class ProfileCaptureSerializer(serializers.ModelSerializer):
+    """Capture sans les données binaires (.prof téléchargeable séparément)"""
+    
+    class Meta:
+        model = ProfileCapture
+        fields = [
+            'id',
+            'session',
+            'method',
+            'path',
+            'status_code',
+            'duration_ms',
+            'user',
+            'created_at'
+        ]
+
+
+class ProfileCaptureDetailSerializer(ProfileCaptureSerializer):
+    
+    class Meta(ProfileCaptureSerializer.Meta):
+        fields = ProfileCaptureSerializer.Meta.fields + ['top_functions', 'memory_top']
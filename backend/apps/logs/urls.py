@@ -1,10 +1,18 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import SystemLogViewSet
+from .views import (
+    SystemLogViewSet, ProfilingSessionView, ProfileCaptureListView,
+    ProfileCaptureDetailView, ProfileCaptureDownloadView
+)
 
 router = DefaultRouter()
 router.register(r'', SystemLogViewSet, basename='logs')
 
 urlpatterns = [
+    # Profilage à la demande (avant le routeur: `profiling/` serait pris pour un id de log)
+    path('profiling/', ProfilingSessionView.as_view(), name='profiling-sessions'),
+    path('profiling/captures/', ProfileCaptureListView.as_view(), name='profiling-captures'),
+    path('profiling/captures/<int:pk>/', ProfileCaptureDetailView.as_view(), name='profiling-capture-detail'),
+    path('profiling/captures/<int:pk>/download/', ProfileCaptureDownloadView.as_view(), name='profiling-capture-download'),
     path('', include(router.urls)),
 ]
@@ -1,4 +1,6 @@
+from django.utils import timezone
 from .models import SystemLog
+from .buffer import log_writer
 import time
 
 
@@ -17,6 +19,9 @@ def create_log(log_type, message, details='', user=None, module='system',
         metadata: Dict avec des données supplémentaires
         status_code: Code de statut HTTP
         response_time: Temps de réponse
+    
+    Le log est écrit en arrière-plan par lots (voir buffer.py): l'instance
+    retournée n'est sauvegardée immédiatement qu'en mode synchrone.
     """
     log_data = {
         'type': log_type,
@@ -26,7 +31,9 @@ def create_log(log_type, message, details='', user=None, module='system',
         'module': module,
         'metadata': metadata or {},
         'status_code': status_code,
-        'response_time': response_time or '',  # CharField ne peut pas être None
+        'response_time': _format_response_time(response_time),
+        'response_time_ms': parse_response_time(response_time),
+        'timestamp': timezone.now(),
     }
     
     if request:
@@ -44,25 +51,60 @@ def create_log(log_type, message, details='', user=None, module='system',
             'endpoint': request.path,
         })
     
-    return SystemLog.objects.create(**log_data)
+    return log_writer.write(SystemLog(**log_data))
+
+
+def parse_response_time(value):
+    """
+    Convertit un temps de réponse en millisecondes (float).
+    Accepte un nombre (ms) ou une chaîne "123ms" / "2.3s"; retourne None si illisible.
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip().lower().replace(',', '.')
+    try:
+        if text.endswith('ms'):
+            return float(text[:-2])
+        if text.endswith('s'):
+            return float(text[:-1]) * 1000
+        return float(text)
+    except ValueError:
+        return None
+
+
+def _format_response_time(value):
+    """Forme affichable du temps de réponse (CharField ne peut pas être None)"""
+    if isinstance(value, (int, float)):
+        return f"{value:.0f}ms"
+    return value or ''
 
 
 class LogTimer:
-    """Context manager pour mesurer le temps d'exécution"""
+    """Context manager pour mesurer le temps d'exécution (horloge monotone)"""
     def __init__(self):
         self.start_time = None
         self.end_time = None
     
     def __enter__(self):
-        self.start_time = time.time()
+        self.start_time = time.perf_counter()
         return self
     
     def __exit__(self, *args):
-        self.end_time = time.time()
+        self.end_time = time.perf_counter()
+    
+    @property
+    def elapsed_ms(self):
+        if self.start_time is not None:
+            end_time = self.end_time if self.end_time is not None else time.perf_counter()
+            return (end_time - self.start_time) * 1000
+        return 0.0
     
     @property
     def elapsed(self):
-        if self.start_time and self.end_time:
-            elapsed_ms = (self.end_time - self.start_time) * 1000
-            return f"{elapsed_ms:.0f}ms"
-        return "0ms"
+        """
+        Temps écoulé en millisecondes. Mesuré à l'intérieur du bloc `with`
+        (cas des vues qui loggent avant la sortie), c'est le temps écoulé jusqu'ici.
+        """
+        return round(self.elapsed_ms, 3)
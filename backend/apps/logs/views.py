@@ -2,10 +2,29 @@ from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
+from rest_framework import generics
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Count
-from .models import SystemLog
-from .serializers import SystemLogSerializer, SystemLogDetailSerializer
+from django.db import connection
+from django.db.models import Count, F
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+import math
+from datetime import datetime, time, timedelta
+from .models import SystemLog, ProfilingSession, ProfileCapture
+from .buffer import log_writer
+from .retention import clear_all_logs
+from .latency import GROUP_FIELDS, default_window, latency_stats
+from .performance import route_stats
+from .search import search_logs
+from .rollup import INTERVALS, timeseries
+from .export import EXPORT_FORMATS, export_stream
+from .profiling import armed_state, make_token
+from .serializers import (
+    SystemLogSerializer, SystemLogDetailSerializer, ProfilingSessionSerializer,
+    ProfileCaptureSerializer, ProfileCaptureDetailSerializer
+)
 
 
 class SystemLogViewSet(viewsets.ReadOnlyModelViewSet):
@@ -15,9 +34,9 @@ class SystemLogViewSet(viewsets.ReadOnlyModelViewSet):
     """
     queryset = SystemLog.objects.all()
     permission_classes = []  # Temporairement désactivé pour debugging
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    # `search` est traité par l'index plein texte (search.py), pas par SearchFilter
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['type', 'module', 'user']
-    search_fields = ['message', 'details', 'user__email']
     ordering_fields = ['timestamp', 'type', 'module']
     ordering = ['-timestamp']
     
@@ -38,6 +57,43 @@ class SystemLogViewSet(viewsets.ReadOnlyModelViewSet):
         if log_type and log_type != 'all':
             queryset = queryset.filter(type=log_type)
         
+        # Période (ISO 8601: date ou date-heure)
+        since = self._parse_moment(self.request.query_params.get('since'))
+        if since is not None:
+            queryset = queryset.filter(timestamp__gte=since)
+        until = self._parse_moment(self.request.query_params.get('until'), end_of_day=True)
+        if until is not None:
+            queryset = queryset.filter(timestamp__lt=until)
+        
+        # Recherche plein texte (index tsvector / FTS5) ou par email de l'utilisateur
+        search = self.request.query_params.get('search', '').strip()
+        if search:
+            queryset = search_logs(queryset, search, connection, highlight=self.action == 'list')
+        
+        return queryset
+    
+    @staticmethod
+    def _parse_moment(value, end_of_day=False):
+        if not value:
+            return None
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            if day is None:
+                return None
+            if end_of_day:
+                day += timedelta(days=1)
+            moment = datetime.combine(day, time.min)
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return moment
+    
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        # Résultats de recherche triés par pertinence, sauf tri explicite
+        if 'search_rank' in queryset.query.annotations and not self.request.query_params.get('ordering'):
+            # Logs trouvés par l'email seulement (sans rang) après les correspondances du texte
+            queryset = queryset.order_by(F('search_rank').desc(nulls_last=True), '-timestamp')
         return queryset
     
     @action(detail=False, methods=['get'])
@@ -63,6 +119,139 @@ class SystemLogViewSet(viewsets.ReadOnlyModelViewSet):
         
         return Response(result)
     
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Export en flux des logs filtrés (mêmes filtres que la liste: type, module, user,
+        since, until, search). Paramètres: export_format (ndjson|csv), gzip (1/true)
+        """
+        if getattr(request.user, 'role', None) != 'admin':
+            return Response({'error': 'Permission refusée'}, status=status.HTTP_403_FORBIDDEN)
+        
+        # `format` est réservé par DRF à la négociation de contenu
+        export_format = request.query_params.get('export_format', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return Response({'error': 'export_format doit être ndjson ou csv'}, status=status.HTTP_400_BAD_REQUEST)
+        compress = request.query_params.get('gzip', '').lower() in ('1', 'true', 'oui')
+        
+        queryset = self.filter_queryset(self.get_queryset())
+        filename = f"logs_{timezone.localtime():%Y%m%d_%H%M%S}.{export_format}"
+        if compress:
+            filename += '.gz'
+        response = StreamingHttpResponse(
+            export_stream(queryset, export_format, compress=compress),
+            content_type='application/gzip' if compress else EXPORT_FORMATS[export_format],
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    
+    @action(detail=False, methods=['get'])
+    def timeseries(self, request):
+        """
+        Nombre de logs par intervalle (hour|day), type et module
+        
+        Paramètres: interval (défaut hour), days (défaut 1, max 365), type, module
+        """
+        if getattr(request.user, 'role', None) != 'admin':
+            return Response({'error': 'Permission refusée'}, status=status.HTTP_403_FORBIDDEN)
+        
+        interval = request.query_params.get('interval', 'hour')
+        if interval not in INTERVALS:
+            return Response({'error': 'interval doit être hour ou day'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            days = float(request.query_params.get('days', 1))
+            if not math.isfinite(days):
+                raise ValueError(days)
+            days = min(max(days, 1 / 24), 365)
+        except ValueError:
+            return Response({'error': 'days doit être numérique'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        log_type = request.query_params.get('type')
+        module = request.query_params.get('module')
+        until = timezone.now()
+        since = until - timedelta(days=days)
+        source, rows = timeseries(
+            since, until, interval,
+            log_type=log_type if log_type and log_type != 'all' else None,
+            module=module or None,
+        )
+        return Response({
+            'interval': interval,
+            'since': since,
+            'until': until,
+            'source': source,
+            'results': [
+                {'bucket': row['period'], 'type': row['type'], 'module': row['module'], 'count': row['count']}
+                for row in rows
+            ],
+        })
+    
+    @action(detail=False, methods=['get'])
+    def latency(self, request):
+        """
+        Percentiles de temps de réponse (p50/p90/p99) et débit par endpoint ou module
+        
+        Paramètres: hours (fenêtre, défaut 24), group_by (endpoint|module), limit (défaut 50)
+        """
+        if getattr(request.user, 'role', None) != 'admin':
+            return Response({'error': 'Permission refusée'}, status=status.HTTP_403_FORBIDDEN)
+        
+        group_by = request.query_params.get('group_by', 'endpoint')
+        if group_by not in GROUP_FIELDS:
+            return Response(
+                {'error': f"group_by doit être parmi: {', '.join(GROUP_FIELDS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            hours = float(request.query_params.get('hours', 24))
+            if not math.isfinite(hours):  # nan passerait les bornes ci-dessous
+                raise ValueError(hours)
+            hours = min(max(hours, 0.1), 24 * 90)
+            limit = min(max(int(request.query_params.get('limit', 50)), 1), 500)
+        except ValueError:
+            return Response({'error': 'hours et limit doivent être numériques'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        since = default_window(hours)
+        return Response({
+            'group_by': group_by,
+            'since': since,
+            'hours': hours,
+            'results': latency_stats(since, group_by=group_by, limit=limit),
+        })
+    
+    @action(detail=False, methods=['get'])
+    def routes(self, request):
+        """
+        Routes les plus sollicitées (sort=hot) ou les plus lentes (sort=slow)
+        sur la fenêtre glissante en mémoire de ce worker
+        """
+        if getattr(request.user, 'role', None) != 'admin':
+            return Response({'error': 'Permission refusée'}, status=status.HTTP_403_FORBIDDEN)
+        
+        sort = request.query_params.get('sort', 'hot')
+        if sort not in ('hot', 'slow'):
+            return Response({'error': 'sort doit être hot ou slow'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 200)
+        except ValueError:
+            return Response({'error': 'limit doit être numérique'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'sort': sort,
+            'window_minutes': route_stats.window_minutes,
+            'results': route_stats.top(sort=sort, limit=limit),
+        })
+    
+    @action(detail=False, methods=['get'])
+    def buffer(self, request):
+        """
+        Compteurs de l'écriture différée des logs (en attente, écrits, perdus)
+        """
+        if getattr(request.user, 'role', None) != 'admin':
+            return Response({'error': 'Permission refusée'}, status=status.HTTP_403_FORBIDDEN)
+        
+        return Response(log_writer.stats())
+    
     @action(detail=False, methods=['delete'])
     def clear_all(self, request):
         """
@@ -72,10 +261,108 @@ class SystemLogViewSet(viewsets.ReadOnlyModelViewSet):
         # if request.user.role != 'admin':
         #     return Response({'error': 'Permission refusée'}, status=status.HTTP_403_FORBIDDEN)
         
-        count = SystemLog.objects.count()
-        SystemLog.objects.all().delete()
+        count = clear_all_logs()
         
         return Response({
             'message': f'{count} logs effacés avec succès',
             'count': count
         })
+
+
+class ProfilingSessionView(APIView):
+    """
+    Sessions de profilage (admin uniquement)
+    GET: sessions récentes, POST: armer, DELETE: tout désarmer
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        if request.user.role != 'admin':
+            return Response({'error': 'Permission refusée'}, status=status.HTTP_403_FORBIDDEN)
+        
+        sessions = ProfilingSession.objects.annotate(captures_count=Count('captures'))[:50]
+        return Response(ProfilingSessionSerializer(sessions, many=True).data)
+    
+    def post(self, request):
+        """
+        Arme le profilage des `count` prochaines requêtes (défaut 1, max 50) dont le chemin
+        commence par `path_prefix`, pendant `minutes` (défaut 15). Retourne aussi un jeton
+        à envoyer dans l'en-tête X-Profile-Token pour profiler une requête précise
+        (décompté des `count` requêtes de la session).
+        """
+        if request.user.role != 'admin':
+            return Response({'error': 'Permission refusée'}, status=status.HTTP_403_FORBIDDEN)
+        
+        try:
+            count = min(max(int(request.data.get('count', 1)), 1), 50)
+            minutes = min(max(int(request.data.get('minutes', 15)), 1), 24 * 60)
+        except (TypeError, ValueError):
+            return Response({'error': 'count et minutes doivent être des entiers'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        session = ProfilingSession.objects.create(
+            path_prefix=request.data.get('path_prefix', '') or '',
+            method=(request.data.get('method') or '').upper(),
+            remaining=count,
+            trace_memory=str(request.data.get('trace_memory', True)).lower() in ('1', 'true', 'oui'),
+            expires_at=timezone.now() + timedelta(minutes=minutes),
+            created_by=request.user,
+        )
+        armed_state.refresh()
+        
+        data = ProfilingSessionSerializer(session).data
+        data['token'] = make_token(session)
+        data['header'] = 'X-Profile-Token'
+        return Response(data, status=status.HTTP_201_CREATED)
+    
+    def delete(self, request):
+        if request.user.role != 'admin':
+            return Response({'error': 'Permission refusée'}, status=status.HTTP_403_FORBIDDEN)
+        
+        count = ProfilingSession.objects.filter(remaining__gt=0).update(remaining=0)
+        armed_state.refresh()
+        return Response({'message': f'{count} session(s) désarmée(s)', 'count': count})
+
+
+class ProfileCaptureListView(generics.ListAPIView):
+    """Captures de profilage (admin uniquement)"""
+    serializer_class = ProfileCaptureSerializer
+    permission_classes = [IsAuthenticated]
+    
+    def get_queryset(self):
+        if self.request.user.role != 'admin':
+            return ProfileCapture.objects.none()
+        queryset = ProfileCapture.objects.defer('prof_data', 'top_functions', 'memory_top')
+        session = self.request.query_params.get('session')
+        if session:
+            queryset = queryset.filter(session_id=session)
+        return queryset
+
+
+class ProfileCaptureDetailView(generics.RetrieveAPIView):
+    """Détail d'une capture: fonctions les plus coûteuses et allocations mémoire"""
+    serializer_class = ProfileCaptureDetailSerializer
+    permission_classes = [IsAuthenticated]
+    
+    def get_queryset(self):
+        if self.request.user.role != 'admin':
+            return ProfileCapture.objects.none()
+        return ProfileCapture.objects.defer('prof_data')
+
+
+class ProfileCaptureDownloadView(APIView):
+    """Téléchargement d'une capture au format .prof (pstats / snakeviz)"""
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, pk):
+        if request.user.role != 'admin':
+            return Response({'error': 'Permission refusée'}, status=status.HTTP_403_FORBIDDEN)
+        
+        capture = ProfileCapture.objects.filter(pk=pk).only('id', 'prof_data', 'created_at').first()
+        if capture is None:
+            return Response({'error': 'Capture non trouvée'}, status=status.HTTP_404_NOT_FOUND)
+        
+        response = HttpResponse(bytes(capture.prof_data), content_type='application/octet-stream')
+        response['Content-Disposition'] = (
+            f'attachment; filename="profile_{capture.id}_{capture.created_at:%Y%m%d_%H%M%S}.prof"'
+        )
+        return response
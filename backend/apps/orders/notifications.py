@@ -1,32 +1,60 @@
 """
 Système de notifications pour les commandes
+
+Les signaux publient des événements métier (apps/authentication/events.py):
+order_created, order_status_changed, payment_received. Les gestionnaires
+ci-dessous les reçoivent une fois par transaction validée, dédupliqués et
+groupés, envoient les notifications en un seul bulk_create (tâche différée,
+apps/tasks/runner.py) et diffusent les statuts sur le flux temps réel
+(apps/authentication/stream.py).
 """
 from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
-from apps.authentication.models import User, Notification
+from apps.authentication.events import event_bus
+from apps.authentication.notification_service import ROLE_MAPPING, send_notifications_later
+from apps.authentication.stream import broker
 from .models import Commande, PaiementCommande
 
 
-def create_notification_for_roles(roles, notification_type, title, message, related_order=None):
-    """
-    Crée des notifications pour tous les utilisateurs ayant les rôles spécifiés
-    """
-    users = User.objects.filter(role__in=roles, is_active=True)
-    
-    notifications = []
-    for user in users:
-        notification = Notification(
-            user=user,
-            type=notification_type,
-            title=title,
-            message=message,
-            related_order_id=related_order.id if related_order else None
-        )
-        notifications.append(notification)
-    
-    if notifications:
-        Notification.objects.bulk_create(notifications)
-        print(f"✅ {len(notifications)} notifications créées pour {notification_type}")
+# Statut -> (rôles notifiés, type, titre, message)
+STATUS_NOTIFICATIONS = {
+    # Commande validée → Notifier stock et livreurs
+    'validee': (
+        ['stock', 'livreur'], 'order_validated', 'Commande validée',
+        'Commande {numero} validée. Client: {client}. Montant: {montant_total} HTG',
+    ),
+    # En préparation → Notifier livreurs et admin
+    'en_preparation': (
+        ['livreur', 'admin'], 'order_in_preparation', 'Commande en préparation',
+        'Commande {numero} en cours de préparation. Type: {type_livraison}',
+    ),
+    # En livraison → Notifier admin et vendeur
+    'en_livraison': (
+        ['admin', 'vendeur'], 'order_in_delivery', 'Commande en livraison',
+        'Commande {numero} en cours de livraison par {livreur}. Client: {client}',
+    ),
+    # Livrée → Notifier tous sauf livreurs
+    'livree': (
+        ['admin', 'vendeur', 'stock'], 'order_delivered', 'Commande livrée',
+        'Commande {numero} livrée avec succès. Client: {client}',
+    ),
+    # Annulée → Notifier tous
+    'annulee': (
+        ['admin', 'vendeur', 'stock', 'livreur'], 'order_cancelled', 'Commande annulée',
+        'Commande {numero} annulée. Client: {client}',
+    ),
+}
+
+
+def _order_data(commande):
+    return {
+        'numero': commande.numero_commande,
+        'client': commande.client.nom_commercial or commande.client.raison_sociale,
+        'client_id': commande.client_id,
+        'montant_total': commande.montant_total,
+        'type_livraison': commande.get_type_livraison_display(),
+        'livreur': commande.livreur or 'un livreur',
+    }
 
 
 @receiver(pre_save, sender=Commande)
@@ -35,11 +63,7 @@ def store_old_status(sender, instance, **kwargs):
     Stocke l'ancien statut pour détecter les changements
     """
     if instance.pk:
-        try:
-            old_instance = Commande.objects.get(pk=instance.pk)
-            instance._old_statut = old_instance.statut
-        except Commande.DoesNotExist:
-            instance._old_statut = None
+        instance._old_statut = Commande.objects.filter(pk=instance.pk).values_list('statut', flat=True).first()
     else:
         instance._old_statut = None
 
@@ -47,94 +71,114 @@ def store_old_status(sender, instance, **kwargs):
 @receiver(post_save, sender=Commande)
 def handle_order_status_change(sender, instance, created, **kwargs):
     """
-    Gère les notifications lors des changements d'état de commande
+    Publie la création ou le changement de statut d'une commande
     """
-    print(f"\n🔔 Signal déclenché pour commande {instance.numero_commande}")
-    print(f"   Created: {created}, Statut: {instance.statut}")
-    
     if created:
-        # Nouvelle commande créée
-        print(f"   ➡️ Création de notifications pour 'order_created'")
-        create_notification_for_roles(
-            roles=['admin', 'stock'],
-            notification_type='order_created',
-            title='📦 Nouvelle commande créée',
-            message=f'Commande {instance.numero_commande} créée par {instance.vendeur.username if instance.vendeur else "Système"}. Client: {instance.client.nom_commercial or instance.client.raison_sociale}. En attente de validation.',
-            related_order=instance
+        event_bus.publish(
+            'order_created',
+            instance.id,
+            vendeur_id=instance.vendeur_id,
+            vendeur=instance.vendeur.username if instance.vendeur else 'Système',
+            statut=instance.statut,
+            **_order_data(instance)
+        )
+        return
+
+    old_status = getattr(instance, '_old_statut', None)
+    if old_status and old_status != instance.statut:
+        event_bus.publish(
+            'order_status_changed',
+            instance.id,
+            ancien_statut=old_status,
+            statut=instance.statut,
+            **_order_data(instance)
         )
-    else:
-        # Vérifier si le statut a changé
-        old_status = getattr(instance, '_old_statut', None)
-        print(f"   Old status: {old_status}, New status: {instance.statut}")
-        
-        if old_status and old_status != instance.statut:
-            print(f"   ✅ Changement de statut détecté: {old_status} → {instance.statut}")
-            # Le statut a changé
-            
-            if instance.statut == 'validee':
-                # Commande validée → Notifier stock et livreurs
-                create_notification_for_roles(
-                    roles=['stock', 'livreur'],
-                    notification_type='order_validated',
-                    title='Commande validée',
-                    message=f'Commande {instance.numero_commande} validée. Client: {instance.client.nom_commercial or instance.client.raison_sociale}. Montant: {instance.montant_total} HTG',
-                    related_order=instance
-                )
-            
-            elif instance.statut == 'en_preparation':
-                # En préparation → Notifier livreurs et admin
-                create_notification_for_roles(
-                    roles=['livreur', 'admin'],
-                    notification_type='order_in_preparation',
-                    title='Commande en préparation',
-                    message=f'Commande {instance.numero_commande} en cours de préparation. Type: {instance.get_type_livraison_display()}',
-                    related_order=instance
-                )
-            
-            elif instance.statut == 'en_livraison':
-                # En livraison → Notifier admin et vendeur
-                create_notification_for_roles(
-                    roles=['admin', 'vendeur'],
-                    notification_type='order_in_delivery',
-                    title='Commande en livraison',
-                    message=f'Commande {instance.numero_commande} en cours de livraison par {instance.livreur or "un livreur"}. Client: {instance.client.nom_commercial or instance.client.raison_sociale}',
-                    related_order=instance
-                )
-            
-            elif instance.statut == 'livree':
-                # Livrée → Notifier tous sauf livreurs
-                create_notification_for_roles(
-                    roles=['admin', 'vendeur', 'stock'],
-                    notification_type='order_delivered',
-                    title='Commande livrée',
-                    message=f'Commande {instance.numero_commande} livrée avec succès. Client: {instance.client.nom_commercial or instance.client.raison_sociale}',
-                    related_order=instance
-                )
-            
-            elif instance.statut == 'annulee':
-                # Annulée → Notifier tous
-                create_notification_for_roles(
-                    roles=['admin', 'vendeur', 'stock', 'livreur'],
-                    notification_type='order_cancelled',
-                    title='Commande annulée',
-                    message=f'Commande {instance.numero_commande} annulée. Client: {instance.client.nom_commercial or instance.client.raison_sociale}',
-                    related_order=instance
-                )
 
 
 @receiver(post_save, sender=PaiementCommande)
 def handle_payment_received(sender, instance, created, **kwargs):
     """
-    Notification lors de la réception d'un paiement
+    Publie la réception d'un paiement
     """
     if created:
         commande = instance.commande
-        
-        # Notifier admin et vendeurs
-        create_notification_for_roles(
-            roles=['admin', 'vendeur'],
-            notification_type='payment_received',
-            title='Paiement reçu',
-            message=f'Paiement de {instance.montant} HTG reçu pour la commande {commande.numero_commande}. Méthode: {instance.get_methode_display()}. Reste à payer: {commande.montant_restant} HTG',
-            related_order=commande
+        event_bus.publish(
+            'payment_received',
+            instance.id,
+            commande_id=commande.id,
+            numero=commande.numero_commande,
+            montant=instance.montant,
+            methode=instance.get_methode_display(),
+            montant_restant=commande.montant_restant,
         )
+
+
+# ============== GESTIONNAIRES ==============
+
+@event_bus.subscribe('order_created')
+def notifier_commandes_creees(events):
+    """Nouvelle commande: admin, vendeurs et stock, sauf le vendeur qui l'a créée"""
+    send_notifications_later([
+        {
+            'roles': ROLE_MAPPING['order_created'],
+            'type': 'order_created',
+            'title': '📦 Nouvelle commande créée',
+            'message': (
+                f"Commande {event.donnees['numero']} créée par {event.donnees['vendeur']}. "
+                f"Client: {event.donnees['client']}. En attente de validation."
+            ),
+            'exclude_user_id': event.donnees['vendeur_id'],
+            'related': {'related_order_id': event.cle, 'related_client_id': event.donnees['client_id']},
+        }
+        for event in events
+    ])
+
+
+@event_bus.subscribe('order_status_changed')
+def notifier_changements_statut(events):
+    """Changement de statut: rôles selon STATUS_NOTIFICATIONS (statut final de la transaction)"""
+    items = []
+    for event in events:
+        donnees = event.donnees
+        if donnees['ancien_statut'] == donnees['statut'] or donnees['statut'] not in STATUS_NOTIFICATIONS:
+            continue
+        roles, notification_type, title, message = STATUS_NOTIFICATIONS[donnees['statut']]
+        items.append({
+            'roles': roles,
+            'type': notification_type,
+            'title': title,
+            'message': message.format(**donnees),
+            'related': {'related_order_id': event.cle},
+        })
+    send_notifications_later(items)
+
+
+@event_bus.subscribe('payment_received')
+def notifier_paiements(events):
+    """Paiement reçu: admin et vendeurs"""
+    send_notifications_later([
+        {
+            'roles': ['admin', 'vendeur'],
+            'type': 'payment_received',
+            'title': 'Paiement reçu',
+            'message': (
+                f"Paiement de {event.donnees['montant']} HTG reçu pour la commande {event.donnees['numero']}. "
+                f"Méthode: {event.donnees['methode']}. Reste à payer: {event.donnees['montant_restant']} HTG"
+            ),
+            'related': {'related_order_id': event.donnees['commande_id']},
+        }
+        for event in events
+    ])
+
+
+@event_bus.subscribe('order_created', 'order_status_changed')
+def diffuser_statuts_commandes(events):
+    """Flux temps réel: la liste des commandes se met à jour sans interrogation périodique"""
+    for event in events:
+        broker.publish('order_status', {
+            'id': event.cle,
+            'numero_commande': event.donnees['numero'],
+            'ancien_statut': event.donnees.get('ancien_statut'),
+            'statut': event.donnees['statut'],
+            'created': event.nom == 'order_created',
+        })
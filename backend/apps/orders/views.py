@@ -7,7 +7,6 @@ from .models import Commande, PaiementCommande
 from apps.clients.models import Client
 from .serializers import CommandeSerializer, PaiementCommandeSerializer
 from apps.logs.utils import create_log, LogTimer
-from apps.authentication.notification_service import NotificationService
 
 
 class CommandeHistoriqueSerializer(serializers.ModelSerializer):
@@ -97,12 +96,7 @@ class CommandeListCreateView(generics.ListCreateAPIView):
                         status_code=201,
                         response_time=timer.elapsed
                     )
-                    
-                    # Envoyer notification aux autres utilisateurs
-                    try:
-                        NotificationService.notify_order_created(instance, created_by=request.user)
-                    except Exception as e:
-                        logger.error(f"Erreur notification commande: {e}")
+                    # Les notifications partent de l'événement order_created (apps/orders/notifications.py)
                 
                 return response
                 
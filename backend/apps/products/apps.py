@@ -6,4 +6,5 @@ class ProductsConfig(AppConfig):
     name = 'apps.products'
     
     def ready(self):
+        import apps.products.signals
         import apps.products.notifications
\ No newline at end of file
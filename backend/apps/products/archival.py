@@ -0,0 +1,127 @@
+"""
+Archivage des anciens mouvements de stock
+
+Les mouvements plus anciens que l'horizon (settings.STOCK_ARCHIVE_HORIZON_DAYS)
+sont copiés dans MouvementStockArchive puis supprimés de la table principale.
+Pour chaque produit concerné, un mouvement "ouverture" daté de la date de coupure
+reporte le stock à cette date: le dernier mouvement antérieur à une date donnée
+reste donc la bonne référence pour le stock à cette date.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .models import Produit, MouvementStock, MouvementStockArchive
+
+
+ARCHIVE_FIELDS = [
+    'id', 'produit_id', 'type_mouvement', 'quantite', 'stock_avant', 'stock_apres',
+    'motif', 'utilisateur_id', 'date_creation', 'numero_document',
+]
+OUVERTURE_MOTIF = "Solde d'ouverture (mouvements archivés)"
+
+
+def date_coupure(jours=None):
+    if jours is None:
+        jours = getattr(settings, 'STOCK_ARCHIVE_HORIZON_DAYS', 365)
+    return timezone.now() - timedelta(days=jours)
+
+
+def produits_a_archiver(coupure):
+    """
+    Identifiants des produits ayant des mouvements antérieurs à la coupure.
+    Un produit dont seul le solde d'ouverture est ancien n'a rien à archiver.
+    """
+    return (
+        MouvementStock.objects.filter(date_creation__lt=coupure)
+        .exclude(type_mouvement='ouverture')
+        .values_list('produit_id', flat=True)
+        .distinct()
+        .order_by('produit_id')
+    )
+
+
+def archiver_lot(produit_ids, coupure, batch_size=5000):
+    """
+    Archive les anciens mouvements d'un lot de produits dans une seule transaction.
+    Retourne le nombre de mouvements archivés.
+    """
+    anciens = MouvementStock.objects.filter(produit_id__in=produit_ids, date_creation__lt=coupure)
+    dernier_ancien = anciens.filter(produit_id=OuterRef('pk')).order_by('-date_creation', '-id')
+
+    with transaction.atomic():
+        soldes = list(
+            Produit.objects.select_for_update()
+            .filter(id__in=produit_ids)
+            .annotate(solde=Subquery(dernier_ancien.values('stock_apres')[:1]))
+            .filter(solde__isnull=False)
+            .values_list('id', 'solde')
+        )
+
+        total = 0
+        maintenant = timezone.now()
+        while True:
+            rows = list(anciens.order_by('id').values(*ARCHIVE_FIELDS)[:batch_size])
+            if not rows:
+                break
+            MouvementStockArchive.objects.bulk_create(
+                [MouvementStockArchive(date_archivage=maintenant, **row) for row in rows],
+                ignore_conflicts=True,
+            )
+            MouvementStock.objects.filter(id__in=[row['id'] for row in rows]).delete()
+            total += len(rows)
+
+        ouvertures = MouvementStock.objects.bulk_create([
+            MouvementStock(
+                produit_id=produit_id,
+                type_mouvement='ouverture',
+                quantite=solde,
+                stock_avant=0,
+                stock_apres=solde,
+                motif=OUVERTURE_MOTIF,
+            )
+            for produit_id, solde in soldes
+        ])
+        # date_creation est auto_now_add: la date de coupure est posée après insertion
+        for mouvement in ouvertures:
+            mouvement.date_creation = coupure
+        MouvementStock.objects.bulk_update(ouvertures, ['date_creation'])
+
+    return total
+
+
+def archiver(jours=None, chunk_size=200, batch_size=5000):
+    """
+    Archive tous les mouvements antérieurs à l'horizon, lot de produits par lot.
+    Chaque lot est indépendant: une interruption peut être reprise en relançant.
+    """
+    coupure = date_coupure(jours)
+    total = 0
+    dernier_id = 0
+    while True:
+        ids = list(produits_a_archiver(coupure).filter(produit_id__gt=dernier_id)[:chunk_size])
+        if not ids:
+            break
+        total += archiver_lot(ids, coupure, batch_size=batch_size)
+        dernier_id = ids[-1]
+    return total
+
+
+def stock_a_date(produit_id, date):
+    """
+    Stock d'un produit à une date donnée (registre principal puis archives).
+    Retourne None si aucun mouvement n'est antérieur à la date.
+    """
+    for model in (MouvementStock, MouvementStockArchive):
+        mouvement = (
+            model.objects.filter(produit_id=produit_id, date_creation__lte=date)
+            .order_by('-date_creation', '-id')
+            .values_list('stock_apres', flat=True)
+            .first()
+        )
+        if mouvement is not None:
+            return mouvement
+    return None
@@ -0,0 +1,311 @@
+"""
+Opérations en masse sur le catalogue produits
+
+- importer_produits: crée ou met à jour des produits depuis un fichier CSV/XLSX
+  (clé: code_produit), par lots de bulk_create / bulk_update.
+- reviser_prix: applique une révision de prix (pourcentage ou montant) à un
+  ensemble filtré de produits en une seule requête UPDATE.
+
+Chaque opération s'exécute dans une seule transaction, écrit une seule entrée
+de journal, envoie une seule notification récapitulative et invalide une seule
+fois le cache du catalogue.
+"""
+import csv
+import io
+import random
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Value
+from django.db.models.functions import Greatest, Round
+from django.utils import timezone
+
+from apps.logs.utils import create_log
+from .cache import invalidate_catalog
+from .models import Produit, MouvementStock
+from .notifications import notify_users_by_role
+from .serializers import ProduitSerializer
+
+
+IMPORT_FIELDS = [
+    'nom', 'description', 'type_produit', 'unite_mesure', 'prix_unitaire',
+    'stock_actuel', 'stock_initial', 'stock_minimal', 'is_active',
+]
+IMPORT_MOTIF = 'Import en masse du catalogue'
+MODES_REVISION = ('pourcentage', 'montant')
+
+
+class BulkOperationError(Exception):
+    """Erreur bloquante d'une opération en masse (fichier illisible, paramètres invalides)"""
+
+
+# ============== LECTURE DES FICHIERS ==============
+
+def lire_fichier(fichier, nom_fichier):
+    """
+    Lit un fichier CSV ou XLSX et retourne la liste des lignes (dictionnaires).
+    Les en-têtes sont normalisés en minuscules, sans espaces.
+    """
+    nom_fichier = (nom_fichier or '').lower()
+    if nom_fichier.endswith('.xlsx'):
+        rows = _lire_xlsx(fichier)
+    elif nom_fichier.endswith('.csv'):
+        rows = _lire_csv(fichier)
+    else:
+        raise BulkOperationError('Format non supporté: utilisez un fichier .csv ou .xlsx')
+
+    lignes = []
+    for row in rows:
+        ligne = {
+            str(cle).strip().lower(): (valeur.strip() if isinstance(valeur, str) else valeur)
+            for cle, valeur in row.items()
+            if cle is not None
+        }
+        if any(valeur not in (None, '') for valeur in ligne.values()):
+            lignes.append(ligne)
+    return lignes
+
+
+def _lire_csv(fichier):
+    contenu = fichier.read()
+    if isinstance(contenu, bytes):
+        contenu = contenu.decode('utf-8-sig')
+    try:
+        dialecte = csv.Sniffer().sniff(contenu[:4096], delimiters=';,')
+    except csv.Error:
+        dialecte = csv.excel
+    return list(csv.DictReader(io.StringIO(contenu), dialect=dialecte))
+
+
+def _lire_xlsx(fichier):
+    from openpyxl import load_workbook
+
+    classeur = load_workbook(fichier, read_only=True, data_only=True)
+    try:
+        lignes = classeur.active.iter_rows(values_only=True)
+        entetes = next(lignes, None)
+        if not entetes:
+            return []
+        return [dict(zip(entetes, valeurs)) for valeurs in lignes]
+    finally:
+        classeur.close()
+
+
+# ============== IMPORT ==============
+
+def _valeurs_ligne(ligne):
+    """Ne garde que les colonnes importables effectivement renseignées"""
+    return {
+        champ: ligne[champ]
+        for champ in IMPORT_FIELDS
+        if champ in ligne and ligne[champ] not in (None, '')
+    }
+
+
+def _codes_generes(codes_existants, nombre):
+    """Génère `nombre` codes PROD-XXXXX uniques sans requête par produit"""
+    codes = []
+    while len(codes) < nombre:
+        code = f"PROD-{random.randint(10000, 99999)}"
+        if code not in codes_existants:
+            codes_existants.add(code)
+            codes.append(code)
+    return codes
+
+
+def importer_produits(lignes, user=None, dry_run=False, chunk_size=500, request=None):
+    """
+    Crée ou met à jour les produits décrits par `lignes`.
+
+    Une ligne avec un code_produit existant met à jour ce produit (seules les
+    colonnes renseignées sont modifiées); sinon un nouveau produit est créé.
+    Toute ligne invalide annule l'import complet.
+
+    Retourne un dictionnaire {'crees', 'mis_a_jour', 'erreurs'}.
+    """
+    codes = {str(ligne.get('code_produit') or '').strip() for ligne in lignes} - {''}
+    existants = {p.code_produit: p for p in Produit.objects.filter(code_produit__in=codes)}
+
+    a_creer, a_modifier, mouvements, erreurs = [], [], [], []
+    champs_modifies = set()
+    vus = set()
+    for numero, ligne in enumerate(lignes, start=2):
+        code = str(ligne.get('code_produit') or '').strip()
+        if code and code in vus:
+            erreurs.append({
+                'ligne': numero,
+                'code_produit': code,
+                'erreurs': {'code_produit': ['Code en double dans le fichier']},
+            })
+            continue
+        vus.add(code)
+        valeurs = _valeurs_ligne(ligne)
+        produit = existants.get(code)
+
+        serializer = ProduitSerializer(produit, data=valeurs, partial=produit is not None)
+        if not serializer.is_valid():
+            erreurs.append({'ligne': numero, 'code_produit': code or None, 'erreurs': serializer.errors})
+            continue
+        donnees = serializer.validated_data
+
+        if produit is None:
+            a_creer.append(Produit(code_produit=code, **donnees))
+            continue
+
+        stock_avant = produit.stock_actuel
+        for champ, valeur in donnees.items():
+            setattr(produit, champ, valeur)
+        champs_modifies.update(donnees)
+        a_modifier.append(produit)
+
+        if produit.stock_actuel != stock_avant:
+            difference = produit.stock_actuel - stock_avant
+            mouvements.append(MouvementStock(
+                produit=produit,
+                type_mouvement='ajustement',
+                quantite=abs(difference),
+                stock_avant=stock_avant,
+                stock_apres=produit.stock_actuel,
+                motif=IMPORT_MOTIF,
+                utilisateur=user,
+            ))
+
+    resultat = {'crees': len(a_creer), 'mis_a_jour': len(a_modifier), 'erreurs': erreurs}
+    if erreurs or dry_run:
+        return resultat
+
+    sans_code = [produit for produit in a_creer if not produit.code_produit]
+    if sans_code:
+        codes_pris = set(Produit.objects.values_list('code_produit', flat=True))
+        for produit, code in zip(sans_code, _codes_generes(codes_pris, len(sans_code))):
+            produit.code_produit = code
+
+    with transaction.atomic():
+        Produit.objects.bulk_create(a_creer, batch_size=chunk_size)
+        if a_modifier:
+            maintenant = timezone.now()
+            for produit in a_modifier:
+                produit.date_modification = maintenant
+            Produit.objects.bulk_update(
+                a_modifier, sorted(champs_modifies | {'date_modification'}), batch_size=chunk_size
+            )
+        MouvementStock.objects.bulk_create(mouvements, batch_size=chunk_size)
+        transaction.on_commit(invalidate_catalog)
+
+    create_log(
+        log_type='success',
+        message=f"Import du catalogue: {resultat['crees']} créé(s), {resultat['mis_a_jour']} mis à jour",
+        details=f"{len(lignes)} ligne(s) importée(s)",
+        user=user,
+        module='products',
+        request=request,
+        metadata={
+            'created': resultat['crees'],
+            'updated': resultat['mis_a_jour'],
+            'stockMovements': len(mouvements),
+        },
+    )
+    notify_users_by_role(
+        roles=['admin', 'stock'],
+        notification_type='product_updated',
+        title='Catalogue importé',
+        message=f"{resultat['crees']} produit(s) créé(s) et {resultat['mis_a_jour']} mis à jour par import.",
+    )
+    return resultat
+
+
+# ============== RÉVISION DES PRIX ==============
+
+def _expression_prix(mode, valeur):
+    if mode == 'pourcentage':
+        nouveau = F('prix_unitaire') * (Value(Decimal('100')) + Value(valeur)) / Value(Decimal('100'))
+    else:
+        nouveau = F('prix_unitaire') + Value(valeur)
+    nouveau = ExpressionWrapper(nouveau, output_field=DecimalField(max_digits=10, decimal_places=2))
+    return Greatest(Round(nouveau, 2), Value(Decimal('0')), output_field=DecimalField(max_digits=10, decimal_places=2))
+
+
+def reviser_prix(mode, valeur, type_produit=None, produit_ids=None, inclure_inactifs=False,
+                 user=None, dry_run=False, request=None, apercu=20):
+    """
+    Révise le prix unitaire de tous les produits correspondant aux filtres.
+
+    Args:
+        mode: 'pourcentage' (valeur = +10 pour +10%) ou 'montant' (valeur ajoutée en HTG)
+        valeur: variation à appliquer (peut être négative); le prix ne descend pas sous 0
+        type_produit: limite la révision à un type de produit
+        produit_ids: limite la révision à une liste d'identifiants (entiers) de produits
+
+    Retourne {'nombre', 'apercu'} où apercu liste les premiers changements.
+    """
+    if mode not in MODES_REVISION:
+        raise BulkOperationError(f"Mode invalide: choisissez parmi {', '.join(MODES_REVISION)}")
+    try:
+        valeur = Decimal(str(valeur))
+    except (InvalidOperation, ValueError):
+        raise BulkOperationError('La valeur de révision doit être un nombre')
+    if not valeur.is_finite():
+        raise BulkOperationError('La valeur de révision doit être un nombre fini')
+    if mode == 'pourcentage' and valeur <= -100:
+        raise BulkOperationError('Une baisse de 100% ou plus mettrait les prix à zéro')
+    if produit_ids is not None and (
+        not isinstance(produit_ids, list)
+        or not all(isinstance(pk, int) and not isinstance(pk, bool) for pk in produit_ids)
+    ):
+        raise BulkOperationError('produits doit être une liste d\'identifiants de produits')
+
+    produits = Produit.objects.all()
+    if not inclure_inactifs:
+        produits = produits.filter(is_active=True)
+    if type_produit:
+        produits = produits.filter(type_produit=type_produit)
+    if produit_ids:
+        produits = produits.filter(id__in=produit_ids)
+
+    nouveau_prix = _expression_prix(mode, valeur)
+    exemples = [
+        {
+            'id': row['id'],
+            'code_produit': row['code_produit'],
+            'nom': row['nom'],
+            'ancien_prix': float(row['prix_unitaire']),
+            'nouveau_prix': float(row['nouveau_prix']),
+        }
+        for row in produits.annotate(nouveau_prix=nouveau_prix)
+        .order_by('nom', 'id')
+        .values('id', 'code_produit', 'nom', 'prix_unitaire', 'nouveau_prix')[:apercu]
+    ]
+
+    if dry_run:
+        return {'nombre': produits.count(), 'apercu': exemples}
+
+    with transaction.atomic():
+        nombre = produits.update(prix_unitaire=nouveau_prix, date_modification=timezone.now())
+        transaction.on_commit(invalidate_catalog)
+
+    signe = '+' if valeur >= 0 else ''
+    variation = f"{signe}{valeur}%" if mode == 'pourcentage' else f"{signe}{valeur} HTG"
+    perimetre = f"type '{type_produit}'" if type_produit else 'tout le catalogue'
+    create_log(
+        log_type='success',
+        message=f"Révision des prix: {variation} sur {nombre} produit(s)",
+        details=f"Révision appliquée à {perimetre}",
+        user=user,
+        module='products',
+        request=request,
+        metadata={
+            'mode': mode,
+            'value': float(valeur),
+            'productType': type_produit,
+            'productIds': produit_ids,
+            'updated': nombre,
+        },
+    )
+    if nombre:
+        notify_users_by_role(
+            roles=['admin', 'stock'],
+            notification_type='product_updated',
+            title='Révision des prix',
+            message=f"Les prix de {nombre} produit(s) ont été révisés ({variation}).",
+        )
+    return {'nombre': nombre, 'apercu': exemples}
@@ -0,0 +1,62 @@
+"""
+Cache du catalogue produits
+
+Les réponses de la liste des produits sont mises en cache sous une clé qui
+contient un numéro de version. Invalider le catalogue revient à incrémenter
+cette version: toutes les anciennes entrées deviennent inaccessibles d'un coup.
+
+La version doit être commune à tous les processus (workers gunicorn, commandes
+manage.py qui modifient prix et stocks). Avec un cache partagé (Redis,
+Memcached, base) elle est gardée dans le cache; avec un cache propre au
+processus (LocMemCache) elle est lue en base (CatalogVersion, une ligne lue par
+clé primaire), sinon une invalidation ne viderait que le cache de son processus.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+
+
+CATALOG_VERSION_KEY = 'products:catalog_version'
+CATALOG_CACHE_TIMEOUT = 300
+
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def shared_cache():
+    """Le cache par défaut est-il commun à tous les processus ?"""
+    return settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_BACKENDS
+
+
+def catalog_version():
+    if shared_cache():
+        return cache.get_or_set(CATALOG_VERSION_KEY, 1, None)
+
+    from .models import CatalogVersion
+
+    version = CatalogVersion.objects.filter(pk=1).values_list('version', flat=True)[:1]
+    return version[0] if version else 1
+
+
+def catalog_cache_key(identifiant):
+    digest = hashlib.md5(identifiant.encode('utf-8')).hexdigest()
+    return f'products:catalog:{catalog_version()}:{digest}'
+
+
+def invalidate_catalog():
+    """Invalide toutes les entrées du cache catalogue, dans tous les processus"""
+    if shared_cache():
+        try:
+            cache.incr(CATALOG_VERSION_KEY)
+        except ValueError:
+            cache.set(CATALOG_VERSION_KEY, 2, None)
+        return
+
+    from .models import CatalogVersion
+
+    if not CatalogVersion.objects.filter(pk=1).update(version=F('version') + 1):
+        CatalogVersion.objects.get_or_create(pk=1, defaults={'version': 2})
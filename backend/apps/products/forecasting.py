@@ -0,0 +1,190 @@
+"""
+Prévision de la demande et calcul des points de commande
+
+Les sorties journalières de tous les produits sont lues en une seule requête
+agrégée puis rangées dans une matrice dense (produits x jours). Tous les
+indicateurs sont calculés sur cette matrice avec NumPy, sans boucle par produit.
+"""
+import math
+from datetime import datetime, time, timedelta
+
+import numpy as np
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .cache import invalidate_catalog
+from .models import Produit, MouvementStock, PrevisionStock
+
+
+FENETRE_COURTE = 7
+FENETRE_LONGUE = 28
+
+
+def _debut_journee(jour):
+    return timezone.make_aware(datetime.combine(jour, time.min))
+
+
+def charger_matrice_sorties(produit_ids, debut, fin):
+    """
+    Retourne une matrice (len(produit_ids) x jours) des quantités sorties par jour,
+    pour les jours de `debut` (inclus) à `fin` (exclu).
+    `produit_ids` doit être trié par ordre croissant.
+    """
+    nb_jours = (fin - debut).days
+    matrice = np.zeros((len(produit_ids), nb_jours), dtype=np.float64)
+    if not produit_ids or nb_jours <= 0:
+        return matrice
+
+    rows = list(
+        MouvementStock.objects.filter(
+            type_mouvement='sortie',
+            date_creation__gte=_debut_journee(debut),
+            date_creation__lt=_debut_journee(fin),
+        )
+        .annotate(jour=TruncDate('date_creation'))
+        .values_list('produit_id', 'jour')
+        .annotate(total=Sum('quantite'))
+        .order_by()
+    )
+    if not rows:
+        return matrice
+
+    ids = np.asarray(produit_ids, dtype=np.int64)
+    produits = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    jours = np.fromiter((row[1].toordinal() for row in rows), dtype=np.int64, count=len(rows)) - debut.toordinal()
+    totaux = np.fromiter((row[2] for row in rows), dtype=np.float64, count=len(rows))
+
+    lignes = np.searchsorted(ids, produits)
+    lignes = np.minimum(lignes, len(ids) - 1)
+    valides = (ids[lignes] == produits) & (jours >= 0) & (jours < nb_jours)
+    np.add.at(matrice, (lignes[valides], jours[valides]), totaux[valides])
+    return matrice
+
+
+def calculer_previsions(matrice, debut, delai, z):
+    """
+    Calcule les indicateurs de prévision pour toutes les lignes de la matrice.
+
+    Args:
+        matrice: sorties journalières (produits x jours), jours consécutifs depuis `debut`
+        debut: date de la première colonne
+        delai: délai de réapprovisionnement en jours
+        z: facteur de niveau de service (1.65 ~ 95%)
+    """
+    nb_produits, nb_jours = matrice.shape
+    if nb_jours == 0:
+        zeros = np.zeros(nb_produits)
+        return {
+            'demande_moyenne_7j': zeros,
+            'demande_moyenne_28j': zeros,
+            'ecart_type_journalier': zeros,
+            'saisonnalite': np.ones((nb_produits, 7)),
+            'demande_prevue_delai': zeros,
+            'stock_securite': zeros,
+            'point_commande_suggere': zeros,
+        }
+
+    moyenne_7j = matrice[:, -FENETRE_COURTE:].mean(axis=1)
+    moyenne_28j = matrice[:, -FENETRE_LONGUE:].mean(axis=1)
+    ecart_type = matrice[:, -FENETRE_LONGUE:].std(axis=1)
+    moyenne_globale = matrice.mean(axis=1)
+
+    # Saisonnalité: moyenne par jour de semaine rapportée à la moyenne globale
+    jours_semaine = (np.arange(nb_jours) + debut.weekday()) % 7
+    indicatrices = np.zeros((nb_jours, 7))
+    indicatrices[np.arange(nb_jours), jours_semaine] = 1.0
+    occurrences = np.maximum(indicatrices.sum(axis=0), 1.0)
+    moyenne_par_jour = (matrice @ indicatrices) / occurrences
+    with np.errstate(divide='ignore', invalid='ignore'):
+        saisonnalite = np.where(
+            moyenne_globale[:, None] > 0,
+            moyenne_par_jour / moyenne_globale[:, None],
+            1.0,
+        )
+
+    # Demande attendue sur les prochains jours du délai, ajustée par jour de semaine
+    fin = debut + timedelta(days=nb_jours)
+    prochains_jours = (np.arange(delai) + fin.weekday()) % 7
+    demande_delai = (moyenne_28j[:, None] * saisonnalite[:, prochains_jours]).sum(axis=1)
+
+    stock_securite = np.ceil(z * ecart_type * math.sqrt(delai))
+    point_commande = np.ceil(demande_delai + stock_securite)
+
+    return {
+        'demande_moyenne_7j': moyenne_7j,
+        'demande_moyenne_28j': moyenne_28j,
+        'ecart_type_journalier': ecart_type,
+        'saisonnalite': saisonnalite,
+        'demande_prevue_delai': demande_delai,
+        'stock_securite': stock_securite,
+        'point_commande_suggere': point_commande,
+    }
+
+
+def rafraichir_previsions(jours_historique=365, delai=2, z=1.65, appliquer_stock_minimal=False):
+    """
+    Recalcule la table PrevisionStock pour tous les produits actifs.
+    Retourne le nombre de produits traités.
+    """
+    fin = timezone.localdate()
+    debut = fin - timedelta(days=jours_historique)
+
+    produits = list(
+        Produit.objects.filter(is_active=True).order_by('id').values_list('id', 'stock_actuel')
+    )
+    if not produits:
+        return 0
+
+    produit_ids = [pid for pid, _ in produits]
+    stocks = np.fromiter((stock for _, stock in produits), dtype=np.float64, count=len(produits))
+
+    matrice = charger_matrice_sorties(produit_ids, debut, fin)
+    resultats = calculer_previsions(matrice, debut, delai, z)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        couverture = np.where(resultats['demande_moyenne_28j'] > 0, stocks / resultats['demande_moyenne_28j'], np.nan)
+
+    maintenant = timezone.now()
+    colonnes = {nom: valeurs.tolist() for nom, valeurs in resultats.items()}
+    couverture = couverture.tolist()
+    previsions = [
+        PrevisionStock(
+            produit_id=pid,
+            demande_moyenne_7j=round(colonnes['demande_moyenne_7j'][i], 3),
+            demande_moyenne_28j=round(colonnes['demande_moyenne_28j'][i], 3),
+            ecart_type_journalier=round(colonnes['ecart_type_journalier'][i], 3),
+            saisonnalite=[round(coef, 3) for coef in colonnes['saisonnalite'][i]],
+            demande_prevue_delai=round(colonnes['demande_prevue_delai'][i], 3),
+            stock_securite=int(colonnes['stock_securite'][i]),
+            point_commande_suggere=int(colonnes['point_commande_suggere'][i]),
+            jours_couverture=None if math.isnan(couverture[i]) else round(couverture[i], 1),
+            delai_reapprovisionnement=delai,
+            jours_historique=jours_historique,
+            date_calcul=maintenant,
+        )
+        for i, pid in enumerate(produit_ids)
+    ]
+
+    champs = [
+        'demande_moyenne_7j', 'demande_moyenne_28j', 'ecart_type_journalier', 'saisonnalite',
+        'demande_prevue_delai', 'stock_securite', 'point_commande_suggere', 'jours_couverture',
+        'delai_reapprovisionnement', 'jours_historique', 'date_calcul',
+    ]
+    PrevisionStock.objects.bulk_create(
+        previsions,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['produit'],
+        update_fields=champs,
+    )
+
+    if appliquer_stock_minimal:
+        Produit.objects.bulk_update(
+            [Produit(id=p.produit_id, stock_minimal=p.point_commande_suggere) for p in previsions],
+            ['stock_minimal'],
+            batch_size=1000,
+        )
+        invalidate_catalog()
+
+    return len(previsions)
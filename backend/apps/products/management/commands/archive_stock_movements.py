@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.products.archival import archiver, date_coupure, produits_a_archiver
+from apps.products.models import MouvementStock
+
+
+class Command(BaseCommand):
+    help = (
+        "Archive les mouvements de stock plus anciens que l'horizon configuré "
+        "(STOCK_ARCHIVE_HORIZON_DAYS) en laissant un solde d'ouverture par produit"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help="Horizon en jours (défaut: settings.STOCK_ARCHIVE_HORIZON_DAYS)")
+        parser.add_argument('--chunk-size', type=int, default=200,
+                            help='Nombre de produits par transaction (défaut: 200)')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Nombre de mouvements copiés par requête (défaut: 5000)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Affiche ce qui serait archivé sans rien modifier')
+
+    def handle(self, *args, **options):
+        if options['days'] is not None and options['days'] < 1:
+            raise CommandError('--days doit être supérieur à 0')
+        if options['chunk_size'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--chunk-size et --batch-size doivent être supérieurs à 0')
+
+        coupure = date_coupure(options['days'])
+        self.stdout.write(f"Date de coupure: {coupure.strftime('%d/%m/%Y %H:%M')}")
+
+        if options['dry_run']:
+            produit_ids = produits_a_archiver(coupure)
+            mouvements = MouvementStock.objects.filter(
+                date_creation__lt=coupure, produit_id__in=produit_ids
+            ).count()
+            produits = produit_ids.count()
+            self.stdout.write(f'{mouvements} mouvement(s) à archiver pour {produits} produit(s)')
+            return
+
+        total = archiver(
+            jours=options['days'],
+            chunk_size=options['chunk_size'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'{total} mouvement(s) archivé(s)'))
@@ -0,0 +1,41 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.products.bulk import BulkOperationError, importer_produits, lire_fichier
+
+
+class Command(BaseCommand):
+    help = 'Importe ou met à jour des produits depuis un fichier CSV ou XLSX (clé: code_produit)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('fichier', help='Chemin du fichier .csv ou .xlsx')
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Valide le fichier sans modifier la base")
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Taille des lots bulk_create / bulk_update (défaut: 500)')
+
+    def handle(self, *args, **options):
+        chemin = options['fichier']
+        if not os.path.exists(chemin):
+            raise CommandError(f'Fichier introuvable: {chemin}')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size doit être supérieur à 0')
+
+        try:
+            with open(chemin, 'rb') as f:
+                lignes = lire_fichier(f, chemin)
+        except BulkOperationError as e:
+            raise CommandError(str(e))
+
+        resultat = importer_produits(lignes, dry_run=options['dry_run'], chunk_size=options['chunk_size'])
+        for erreur in resultat['erreurs']:
+            self.stderr.write(f"Ligne {erreur['ligne']} ({erreur['code_produit'] or 'nouveau'}): {erreur['erreurs']}")
+        if resultat['erreurs']:
+            raise CommandError(f"{len(resultat['erreurs'])} ligne(s) invalide(s): import annulé")
+
+        message = f"{resultat['crees']} produit(s) créé(s), {resultat['mis_a_jour']} mis à jour"
+        if options['dry_run']:
+            self.stdout.write(f'{message} (aucune modification effectuée)')
+        else:
+            self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,89 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.products.models import Produit
+from apps.products.reconciliation import appliquer_lot, calculer_ecarts
+
+
+DEFAULT_STATE_FILE = os.path.join(settings.BASE_DIR, 'logs', 'reconcile_stock.state.json')
+
+
+class Command(BaseCommand):
+    help = (
+        'Réconcilie le stock des produits avec le registre des mouvements '
+        'et les lignes de commandes/ventes (par lots, reprise possible)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Affiche les écarts sans modifier la base')
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Nombre de produits traités par lot (défaut: 500)')
+        parser.add_argument('--resume', action='store_true',
+                            help='Reprend après le dernier lot appliqué')
+        parser.add_argument('--state-file', default=DEFAULT_STATE_FILE,
+                            help='Fichier de reprise (défaut: logs/reconcile_stock.state.json)')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        chunk_size = options['chunk_size']
+        state_file = options['state_file']
+        if chunk_size < 1:
+            raise CommandError('--chunk-size doit être supérieur à 0')
+
+        state = {'last_product_id': 0, 'corrected': 0, 'started_at': timezone.now().isoformat()}
+        if options['resume']:
+            if dry_run:
+                raise CommandError('--resume ne peut pas être combiné avec --dry-run')
+            if not os.path.exists(state_file):
+                raise CommandError(f'Aucun fichier de reprise trouvé: {state_file}')
+            with open(state_file, encoding='utf-8') as f:
+                state = json.load(f)
+            self.stdout.write(f"Reprise après le produit #{state['last_product_id']}")
+
+        last_id = state['last_product_id']
+        total_ecarts = 0
+        while True:
+            ids = list(
+                Produit.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+
+            ecarts = calculer_ecarts(ids) if dry_run else appliquer_lot(ids)
+            for ecart in ecarts:
+                self._print_ecart(ecart)
+            total_ecarts += len(ecarts)
+            last_id = ids[-1]
+
+            if not dry_run:
+                state['last_product_id'] = last_id
+                state['corrected'] += len(ecarts)
+                self._save_state(state_file, state)
+
+        if dry_run:
+            self.stdout.write(f'{total_ecarts} produit(s) à corriger (aucune modification effectuée)')
+            return
+
+        if os.path.exists(state_file):
+            os.remove(state_file)
+        self.stdout.write(self.style.SUCCESS(f"{state['corrected']} produit(s) corrigé(s)"))
+
+    def _print_ecart(self, ecart):
+        produit = ecart['produit']
+        self.stdout.write(
+            f"{produit.code_produit} {produit.nom}: {ecart['stock_actuel']} -> {ecart['stock_attendu']} "
+            f"({ecart['difference']:+d}) [registre: {ecart['stock_registre']}, "
+            f"commandes non enregistrées: {ecart['commandes_non_enregistrees']}, "
+            f"ventes non enregistrées: {ecart['ventes_non_enregistrees']}]"
+        )
+
+    def _save_state(self, state_file, state):
+        tmp_file = f'{state_file}.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_file, state_file)
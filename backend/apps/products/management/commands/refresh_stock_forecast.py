@@ -0,0 +1,38 @@
+import math
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.products.forecasting import rafraichir_previsions
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les prévisions de demande et les points de commande suggérés (à lancer chaque nuit)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=365,
+                            help="Nombre de jours d'historique analysés (défaut: 365)")
+        parser.add_argument('--lead-time', type=int, default=2,
+                            help='Délai de réapprovisionnement en jours (défaut: 2)')
+        parser.add_argument('--service-factor', type=float, default=1.65,
+                            help='Facteur z du niveau de service (défaut: 1.65, ~95%%)')
+        parser.add_argument('--apply-stock-minimal', action='store_true',
+                            help='Remplace stock_minimal par le point de commande suggéré')
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError('--days doit être supérieur à 0')
+        if options['lead_time'] < 1:
+            raise CommandError('--lead-time doit être supérieur à 0')
+        if not math.isfinite(options['service_factor']) or options['service_factor'] <= 0:
+            raise CommandError('--service-factor doit être un nombre supérieur à 0')
+
+        debut = time.monotonic()
+        count = rafraichir_previsions(
+            jours_historique=options['days'],
+            delai=options['lead_time'],
+            z=options['service_factor'],
+            appliquer_stock_minimal=options['apply_stock_minimal'],
+        )
+        duree = time.monotonic() - debut
+        self.stdout.write(self.style.SUCCESS(f'{count} prévision(s) recalculée(s) en {duree:.2f}s'))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.products.bulk import BulkOperationError, reviser_prix
+
+
+class Command(BaseCommand):
+    help = 'Révise les prix unitaires en masse (pourcentage ou montant) en une seule transaction'
+
+    def add_arguments(self, parser):
+        variation = parser.add_mutually_exclusive_group(required=True)
+        variation.add_argument('--percent', type=str,
+                               help='Variation en pourcentage (ex: 10 ou -5)')
+        variation.add_argument('--amount', type=str,
+                               help='Variation en HTG ajoutée au prix (ex: 2.50 ou -1)')
+        parser.add_argument('--type-produit', help='Limite la révision à un type de produit')
+        parser.add_argument('--include-inactive', action='store_true',
+                            help='Inclut les produits inactifs')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Affiche les nouveaux prix sans modifier la base')
+
+    def handle(self, *args, **options):
+        mode = 'pourcentage' if options['percent'] is not None else 'montant'
+        valeur = options['percent'] if mode == 'pourcentage' else options['amount']
+        try:
+            resultat = reviser_prix(
+                mode=mode,
+                valeur=valeur,
+                type_produit=options['type_produit'],
+                inclure_inactifs=options['include_inactive'],
+                dry_run=options['dry_run'],
+            )
+        except BulkOperationError as e:
+            raise CommandError(str(e))
+
+        for ligne in resultat['apercu']:
+            self.stdout.write(
+                f"{ligne['code_produit']} {ligne['nom']}: {ligne['ancien_prix']:.2f} -> {ligne['nouveau_prix']:.2f} HTG"
+            )
+        if options['dry_run']:
+            self.stdout.write(f"{resultat['nombre']} produit(s) concerné(s) (aucune modification effectuée)")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{resultat['nombre']} prix révisé(s)"))
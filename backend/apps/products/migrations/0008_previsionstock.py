@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_add_stock_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrevisionStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('demande_moyenne_7j', models.FloatField(default=0, help_text='Sorties moyennes par jour sur les 7 derniers jours', verbose_name='Demande moyenne (7 jours)')),
+                ('demande_moyenne_28j', models.FloatField(default=0, help_text='Sorties moyennes par jour sur les 28 derniers jours', verbose_name='Demande moyenne (28 jours)')),
+                ('ecart_type_journalier', models.FloatField(default=0, verbose_name='Écart type journalier')),
+                ('saisonnalite', models.JSONField(default=list, help_text='Coefficient par jour de la semaine (lundi = 0)', verbose_name='Saisonnalité hebdomadaire')),
+                ('demande_prevue_delai', models.FloatField(default=0, help_text='Demande attendue pendant le délai de réapprovisionnement', verbose_name='Demande prévue sur le délai')),
+                ('stock_securite', models.PositiveIntegerField(default=0, verbose_name='Stock de sécurité')),
+                ('point_commande_suggere', models.PositiveIntegerField(default=0, verbose_name='Point de commande suggéré')),
+                ('jours_couverture', models.FloatField(blank=True, help_text='Nombre de jours couverts par le stock actuel', null=True, verbose_name='Jours de couverture')),
+                ('delai_reapprovisionnement', models.PositiveIntegerField(default=2, verbose_name='Délai de réapprovisionnement (jours)')),
+                ('jours_historique', models.PositiveIntegerField(default=0, verbose_name="Jours d'historique analysés")),
+                ('date_calcul', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Date du calcul')),
+                ('produit', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='prevision', to='products.produit', verbose_name='Produit')),
+            ],
+            options={
+                'verbose_name': 'Prévision de stock',
+                'verbose_name_plural': 'Prévisions de stock',
+                'ordering': ['produit__nom'],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:59
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('products', '0008_previsionstock'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='mouvementstock',
+            name='type_mouvement',
+            field=models.CharField(choices=[('entree', 'Entrée'), ('sortie', 'Sortie'), ('ajustement', 'Ajustement'), ('perte', 'Perte'), ('ouverture', "Solde d'ouverture")], max_length=20, verbose_name='Type de mouvement'),
+        ),
+        migrations.CreateModel(
+            name='MouvementStockArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID du mouvement')),
+                ('type_mouvement', models.CharField(choices=[('entree', 'Entrée'), ('sortie', 'Sortie'), ('ajustement', 'Ajustement'), ('perte', 'Perte'), ('ouverture', "Solde d'ouverture")], max_length=20, verbose_name='Type de mouvement')),
+                ('quantite', models.PositiveIntegerField(verbose_name='Quantité')),
+                ('stock_avant', models.PositiveIntegerField(verbose_name='Stock avant')),
+                ('stock_apres', models.PositiveIntegerField(verbose_name='Stock après')),
+                ('motif', models.CharField(max_length=200, verbose_name='Motif')),
+                ('date_creation', models.DateTimeField(verbose_name='Date du mouvement')),
+                ('numero_document', models.CharField(blank=True, max_length=100, verbose_name='Numéro de document')),
+                ('date_archivage', models.DateTimeField(default=django.utils.timezone.now, verbose_name="Date d'archivage")),
+                ('produit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mouvements_archives', to='products.produit', verbose_name='Produit')),
+                ('utilisateur', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': 'Mouvement de stock archivé',
+                'verbose_name_plural': 'Mouvements de stock archivés',
+                'ordering': ['-date_creation'],
+                'indexes': [models.Index(fields=['produit', '-date_creation'], name='products_mo_produit_ed224a_idx'), models.Index(fields=['numero_document'], name='products_mo_numero__ba2aa6_idx')],
+            },
+        ),
+    ]
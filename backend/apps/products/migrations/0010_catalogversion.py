@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-19 19:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_mouvementstockarchive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField(default=1, verbose_name='Version')),
+            ],
+            options={
+                'verbose_name': 'Version du catalogue',
+                'verbose_name_plural': 'Versions du catalogue',
+                'db_table': 'catalog_version',
+            },
+        ),
+    ]
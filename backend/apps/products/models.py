@@ -1,5 +1,6 @@
 from django.db import models
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 import uuid
 
 
@@ -214,6 +215,7 @@ class MouvementStock(models.Model):
         ('sortie', 'Sortie'),
         ('ajustement', 'Ajustement'),
         ('perte', 'Perte'),
+        ('ouverture', "Solde d'ouverture"),
     ]
     
     produit = models.ForeignKey(
@@ -278,4 +280,162 @@ class MouvementStock(models.Model):
         # Calculer le stock_avant si ce n'est pas défini
         if not self.stock_avant and not self.pk:
             self.stock_avant = self.produit.stock_actuel
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+class MouvementStockArchive(models.Model):
+    """
+    Mouvements de stock archivés (plus anciens que l'horizon configuré).
+    Conserve l'identifiant d'origine du MouvementStock.
+    """
+    id = models.BigIntegerField(
+        primary_key=True,
+        verbose_name='ID du mouvement'
+    )
+    produit = models.ForeignKey(
+        Produit,
+        on_delete=models.CASCADE,
+        related_name='mouvements_archives',
+        verbose_name='Produit'
+    )
+    type_mouvement = models.CharField(
+        max_length=20,
+        choices=MouvementStock.TYPE_MOUVEMENT_CHOICES,
+        verbose_name='Type de mouvement'
+    )
+    quantite = models.PositiveIntegerField(
+        verbose_name='Quantité'
+    )
+    stock_avant = models.PositiveIntegerField(
+        verbose_name='Stock avant'
+    )
+    stock_apres = models.PositiveIntegerField(
+        verbose_name='Stock après'
+    )
+    motif = models.CharField(
+        max_length=200,
+        verbose_name='Motif'
+    )
+    utilisateur = models.ForeignKey(
+        'authentication.User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Utilisateur'
+    )
+    date_creation = models.DateTimeField(
+        verbose_name='Date du mouvement'
+    )
+    numero_document = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name='Numéro de document'
+    )
+    date_archivage = models.DateTimeField(
+        default=timezone.now,
+        verbose_name="Date d'archivage"
+    )
+
+    class Meta:
+        verbose_name = 'Mouvement de stock archivé'
+        verbose_name_plural = 'Mouvements de stock archivés'
+        ordering = ['-date_creation']
+        indexes = [
+            models.Index(fields=['produit', '-date_creation']),
+            models.Index(fields=['numero_document']),
+        ]
+
+    def __str__(self):
+        return f"[Archive] {self.get_type_mouvement_display()} - {self.produit.nom} ({self.quantite})"
+
+
+class PrevisionStock(models.Model):
+    """
+    Prévision de demande et point de commande suggéré pour un produit.
+    Table précalculée, rafraîchie chaque nuit par `manage.py refresh_stock_forecast`.
+    """
+    produit = models.OneToOneField(
+        Produit,
+        on_delete=models.CASCADE,
+        related_name='prevision',
+        verbose_name='Produit'
+    )
+    demande_moyenne_7j = models.FloatField(
+        default=0,
+        verbose_name='Demande moyenne (7 jours)',
+        help_text='Sorties moyennes par jour sur les 7 derniers jours'
+    )
+    demande_moyenne_28j = models.FloatField(
+        default=0,
+        verbose_name='Demande moyenne (28 jours)',
+        help_text='Sorties moyennes par jour sur les 28 derniers jours'
+    )
+    ecart_type_journalier = models.FloatField(
+        default=0,
+        verbose_name='Écart type journalier'
+    )
+    saisonnalite = models.JSONField(
+        default=list,
+        verbose_name='Saisonnalité hebdomadaire',
+        help_text='Coefficient par jour de la semaine (lundi = 0)'
+    )
+    demande_prevue_delai = models.FloatField(
+        default=0,
+        verbose_name='Demande prévue sur le délai',
+        help_text='Demande attendue pendant le délai de réapprovisionnement'
+    )
+    stock_securite = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Stock de sécurité'
+    )
+    point_commande_suggere = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Point de commande suggéré'
+    )
+    jours_couverture = models.FloatField(
+        null=True,
+        blank=True,
+        verbose_name='Jours de couverture',
+        help_text='Nombre de jours couverts par le stock actuel'
+    )
+    delai_reapprovisionnement = models.PositiveIntegerField(
+        default=2,
+        verbose_name='Délai de réapprovisionnement (jours)'
+    )
+    jours_historique = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Jours d'historique analysés"
+    )
+    date_calcul = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Date du calcul'
+    )
+
+    class Meta:
+        verbose_name = 'Prévision de stock'
+        verbose_name_plural = 'Prévisions de stock'
+        ordering = ['produit__nom']
+
+    def __str__(self):
+        return f"Prévision {self.produit.nom} (point de commande: {self.point_commande_suggere})"
+
+    @property
+    def sous_point_commande(self):
+        """Vérifie si le stock actuel est sous le point de commande suggéré"""
+        return self.produit.stock_actuel <= self.point_commande_suggere
+
+
+class CatalogVersion(models.Model):
+    """
+    Version du cache catalogue, commune à tous les processus (apps/products/cache.py).
+    Une seule ligne (pk=1), utilisée quand le cache Django est propre à chaque processus.
+    """
+    version = models.PositiveIntegerField(default=1, verbose_name='Version')
+
+    class Meta:
+        db_table = 'catalog_version'
+        verbose_name = 'Version du catalogue'
+        verbose_name_plural = 'Versions du catalogue'
+
+    def __str__(self):
+        return f"Catalogue v{self.version}"
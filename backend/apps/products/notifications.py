@@ -3,29 +3,18 @@ Signaux de notifications pour le module Produits
 """
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from apps.authentication.models import User, Notification
+from apps.authentication.events import event_bus
+from apps.authentication.notification_service import fan_out, send_notifications_later, check_and_notify_low_stock
+from apps.logs.utils import create_log
 from .models import Produit, MouvementStock
 
 
 def notify_users_by_role(roles, notification_type, title, message, **kwargs):
     """
     Crée des notifications pour tous les utilisateurs ayant les rôles spécifiés
+    (en un bulk_create après le commit de la transaction)
     """
-    users = User.objects.filter(role__in=roles, is_active=True)
-    
-    notifications = []
-    for user in users:
-        notification = Notification(
-            user=user,
-            type=notification_type,
-            title=title,
-            message=message,
-            **kwargs
-        )
-        notifications.append(notification)
-    
-    if notifications:
-        Notification.objects.bulk_create(notifications)
+    fan_out(roles, notification_type, title, message, respect_preferences=False, **kwargs)
 
 
 @receiver(post_save, sender=Produit)
@@ -71,20 +60,56 @@ def handle_stock_movement(sender, instance, created, **kwargs):
                 related_product_id=produit.id
             )
         
-        # Vérifier si le stock est faible ou en rupture
-        if produit.stock_actuel == 0:
-            notify_users_by_role(
-                roles=['admin', 'stock', 'vendeur'],
-                notification_type='stock_out',
-                title='⚠️ Rupture de stock',
-                message=f'Le produit {produit.nom} est en rupture de stock!',
-                related_product_id=produit.id
-            )
-        elif produit.stock_actuel <= produit.stock_minimal:
-            notify_users_by_role(
-                roles=['admin', 'stock'],
-                notification_type='stock_low',
-                title='Stock faible',
-                message=f'Le stock de {produit.nom} est faible: {produit.stock_actuel} unités (seuil: {produit.stock_minimal})',
-                related_product_id=produit.id
-            )
+        # Vérifier si le stock est faible ou en rupture (événement stock_low, dédupliqué par produit)
+        check_and_notify_low_stock(produit)
+
+
+# ============== GESTIONNAIRES ==============
+
+@event_bus.subscribe('stock_low')
+def notifier_stock_faible(events):
+    """Stock faible ou rupture: une notification par produit et par transaction"""
+    items = []
+    for event in events:
+        donnees = event.donnees
+        if donnees['stock_actuel'] <= 0:
+            items.append({
+                'roles': ['admin', 'stock', 'vendeur'],
+                'type': 'stock_out',
+                'title': '⚠️ Rupture de stock',
+                'message': f"Le produit {donnees['nom']} est en rupture de stock!",
+                'related': {'related_product_id': event.cle},
+            })
+        else:
+            items.append({
+                'roles': ['admin', 'stock'],
+                'type': 'stock_low',
+                'title': 'Stock faible',
+                'message': (
+                    f"Le stock de {donnees['nom']} est faible: {donnees['stock_actuel']} unités "
+                    f"(seuil: {donnees['stock_minimal']})"
+                ),
+                'related': {'related_product_id': event.cle},
+            })
+    send_notifications_later(items)
+
+
+@event_bus.subscribe('stock_low')
+def journaliser_stock_faible(events):
+    """Trace les alertes de stock dans les logs système"""
+    for event in events:
+        donnees = event.donnees
+        create_log(
+            log_type='warning',
+            message=(
+                f"Rupture de stock: {donnees['nom']}" if donnees['stock_actuel'] <= 0
+                else f"Stock faible: {donnees['nom']}"
+            ),
+            details=f"{donnees['stock_actuel']} unité(s) en stock, seuil: {donnees['stock_minimal']}",
+            module='stock',
+            metadata={
+                'productId': event.cle,
+                'stock': donnees['stock_actuel'],
+                'threshold': donnees['stock_minimal'],
+            },
+        )
@@ -0,0 +1,180 @@
+"""
+Réconciliation du stock des produits
+
+Le stock attendu d'un produit est calculé à partir du registre des mouvements
+(stock_apres du dernier MouvementStock, éventuellement un solde d'ouverture
+laissé par l'archivage), diminué des quantités vendues dans des
+ItemCommande / LigneVente pour lesquelles aucune sortie n'a été enregistrée.
+Tous les calculs se font par agrégats SQL groupés sur un lot de produits.
+"""
+from django.db import transaction
+from django.db.models import CharField, Exists, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Concat
+
+from apps.orders.models import ItemCommande
+from apps.sales.models import LigneVente
+from .cache import invalidate_catalog
+from .models import Produit, MouvementStock, MouvementStockArchive
+
+
+RECONCILIATION_MOTIF = 'Réconciliation du stock'
+
+
+def _sortie_enregistree(numero_field, prefixe_motif):
+    """
+    Sous-requête: existe-t-il une sortie de stock pour cette ligne ?
+    Les signaux renseignent numero_document, les anciennes méthodes du modèle
+    seulement le motif ("Commande CMD..." / "Vente VTE...").
+    """
+    motif = Concat(Value(prefixe_motif), OuterRef(numero_field), output_field=CharField())
+
+    def sorties(model):
+        return Exists(
+            model.objects.filter(
+                produit_id=OuterRef('produit_id'),
+                type_mouvement='sortie',
+            ).filter(
+                Q(numero_document=OuterRef(numero_field)) | Q(motif=motif)
+            )
+        )
+
+    # Les sorties anciennes peuvent avoir été déplacées dans les archives
+    return sorties(MouvementStock) | sorties(MouvementStockArchive)
+
+
+def lignes_commande_non_enregistrees(produit_ids):
+    return ItemCommande.objects.filter(produit_id__in=produit_ids).filter(
+        ~_sortie_enregistree('commande__numero_commande', 'Commande ')
+    )
+
+
+def lignes_vente_non_enregistrees(produit_ids):
+    return LigneVente.objects.filter(produit_id__in=produit_ids).filter(
+        ~_sortie_enregistree('vente__numero_vente', 'Vente ')
+    )
+
+
+def _totaux_par_produit(queryset):
+    rows = queryset.values('produit_id').annotate(total=Sum('quantite')).order_by()
+    return {row['produit_id']: int(row['total'] or 0) for row in rows}
+
+
+def calculer_ecarts(produit_ids):
+    """
+    Calcule le stock attendu pour un lot de produits (4 requêtes au total).
+
+    Retourne la liste des produits dont le stock actuel diffère du stock attendu.
+    """
+    dernier_mouvement = MouvementStock.objects.filter(
+        produit_id=OuterRef('pk')
+    ).order_by('-date_creation', '-id')
+
+    produits = Produit.objects.filter(id__in=produit_ids).annotate(
+        stock_registre=Subquery(dernier_mouvement.values('stock_apres')[:1])
+    ).order_by('id')
+
+    non_enregistre_commandes = _totaux_par_produit(lignes_commande_non_enregistrees(produit_ids))
+    non_enregistre_ventes = _totaux_par_produit(lignes_vente_non_enregistrees(produit_ids))
+
+    ecarts = []
+    for produit in produits:
+        stock_registre = produit.stock_registre
+        if stock_registre is None:
+            stock_registre = produit.stock_actuel
+        commandes = non_enregistre_commandes.get(produit.id, 0)
+        ventes = non_enregistre_ventes.get(produit.id, 0)
+        stock_attendu = max(stock_registre - commandes - ventes, 0)
+
+        if stock_attendu != produit.stock_actuel:
+            ecarts.append({
+                'produit': produit,
+                'stock_actuel': produit.stock_actuel,
+                'stock_registre': stock_registre,
+                'commandes_non_enregistrees': commandes,
+                'ventes_non_enregistrees': ventes,
+                'stock_attendu': stock_attendu,
+                'difference': stock_attendu - produit.stock_actuel,
+            })
+    return ecarts
+
+
+def _mouvements_correctifs(ecarts):
+    """
+    Construit (sans les sauvegarder) les mouvements qui expliquent la correction:
+    un ajustement si le stock a dérivé du registre, puis une sortie par ligne
+    non enregistrée. Les prochaines réconciliations retrouveront ces sorties.
+    """
+    par_produit = {ecart['produit'].id: ecart for ecart in ecarts}
+    ids_avec_lignes = [
+        pid for pid, ecart in par_produit.items()
+        if ecart['commandes_non_enregistrees'] or ecart['ventes_non_enregistrees']
+    ]
+
+    lignes = {pid: [] for pid in ids_avec_lignes}
+    if ids_avec_lignes:
+        for row in lignes_commande_non_enregistrees(ids_avec_lignes).values(
+            'produit_id', 'quantite', 'commande__numero_commande', 'commande__vendeur_id'
+        ).order_by('commande__date_creation', 'id'):
+            numero = row['commande__numero_commande'] or ''
+            lignes[row['produit_id']].append(
+                (int(row['quantite']), f"Commande {numero}", numero, row['commande__vendeur_id'])
+            )
+        for row in lignes_vente_non_enregistrees(ids_avec_lignes).values(
+            'produit_id', 'quantite', 'vente__numero_vente', 'vente__vendeur_id'
+        ).order_by('vente__date_vente', 'id'):
+            numero = row['vente__numero_vente'] or ''
+            lignes[row['produit_id']].append(
+                (int(row['quantite']), f"Vente {numero}", numero, row['vente__vendeur_id'])
+            )
+
+    mouvements = []
+    for pid, ecart in par_produit.items():
+        produit = ecart['produit']
+        stock = ecart['stock_registre']
+        if ecart['stock_actuel'] != stock:
+            mouvements.append(MouvementStock(
+                produit=produit,
+                type_mouvement='ajustement',
+                quantite=abs(stock - ecart['stock_actuel']),
+                stock_avant=ecart['stock_actuel'],
+                stock_apres=stock,
+                motif=RECONCILIATION_MOTIF,
+            ))
+        for quantite, motif, numero, utilisateur_id in lignes.get(pid, []):
+            stock_apres = max(stock - quantite, 0)
+            mouvements.append(MouvementStock(
+                produit=produit,
+                type_mouvement='sortie',
+                quantite=quantite,
+                stock_avant=stock,
+                stock_apres=stock_apres,
+                motif=motif,
+                numero_document=numero,
+                utilisateur_id=utilisateur_id,
+            ))
+            stock = stock_apres
+    return mouvements
+
+
+def appliquer_lot(produit_ids):
+    """
+    Recalcule et corrige un lot de produits dans une seule transaction.
+    Les produits du lot sont verrouillés pendant le calcul.
+    """
+    with transaction.atomic():
+        list(Produit.objects.select_for_update().filter(id__in=produit_ids).values_list('id', flat=True))
+        ecarts = calculer_ecarts(produit_ids)
+        if not ecarts:
+            return ecarts
+
+        # bulk_create ne déclenche pas les signaux: pas de notification par ligne
+        MouvementStock.objects.bulk_create(_mouvements_correctifs(ecarts))
+
+        produits = []
+        for ecart in ecarts:
+            produit = ecart['produit']
+            produit.stock_actuel = ecart['stock_attendu']
+            produits.append(produit)
+        Produit.objects.bulk_update(produits, ['stock_actuel'])
+        transaction.on_commit(invalidate_catalog)
+    return ecarts
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Produit, MouvementStock
+from .models import Produit, MouvementStock, PrevisionStock
 
 
 class ProduitSerializer(serializers.ModelSerializer):
@@ -66,6 +66,11 @@ class MouvementStockCreateSerializer(serializers.ModelSerializer):
     """
     Sérialiseur pour créer un mouvement de stock
     """
+    # Le solde d'ouverture est réservé à l'archivage (apps/products/archival.py)
+    type_mouvement = serializers.ChoiceField(choices=[
+        choice for choice in MouvementStock.TYPE_MOUVEMENT_CHOICES if choice[0] != 'ouverture'
+    ])
+
     class Meta:
         model = MouvementStock
         fields = [
@@ -130,4 +135,39 @@ class MouvementStockCreateSerializer(serializers.ModelSerializer):
             numero_document=numero_document
         )
         
-        return mouvement
\ No newline at end of file
+        return mouvement
+
+
+class PrevisionStockSerializer(serializers.ModelSerializer):
+    """
+    Sérialiseur pour les prévisions de stock
+    """
+    produit_nom = serializers.CharField(source='produit.nom', read_only=True)
+    produit_code = serializers.CharField(source='produit.code_produit', read_only=True)
+    stock_actuel = serializers.IntegerField(source='produit.stock_actuel', read_only=True)
+    stock_minimal = serializers.IntegerField(source='produit.stock_minimal', read_only=True)
+    sous_point_commande = serializers.BooleanField(read_only=True)
+    
+    class Meta:
+        model = PrevisionStock
+        fields = [
+            'id',
+            'produit',
+            'produit_nom',
+            'produit_code',
+            'stock_actuel',
+            'stock_minimal',
+            'demande_moyenne_7j',
+            'demande_moyenne_28j',
+            'ecart_type_journalier',
+            'saisonnalite',
+            'demande_prevue_delai',
+            'stock_securite',
+            'point_commande_suggere',
+            'sous_point_commande',
+            'jours_couverture',
+            'delai_reapprovisionnement',
+            'jours_historique',
+            'date_calcul'
+        ]
+        read_only_fields = fields
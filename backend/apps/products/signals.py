@@ -0,0 +1,24 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.authentication.events import event_bus
+from .models import Produit
+from .cache import invalidate_catalog
+
+
+@receiver(post_save, sender=Produit)
+@receiver(post_delete, sender=Produit)
+def invalider_cache_catalogue(sender, instance, **kwargs):
+    """
+    Invalide le cache du catalogue à chaque modification unitaire d'un produit.
+    Les opérations en masse (bulk_create/bulk_update) invalident explicitement.
+
+    Passe par l'événement catalog_changed: une seule invalidation par transaction,
+    après le commit (une requête concurrente ne peut pas remettre en cache
+    l'ancien état entre l'invalidation et le commit).
+    """
+    event_bus.publish('catalog_changed', 'catalogue')
+
+
+@event_bus.subscribe('catalog_changed')
+def vider_cache_catalogue(events):
+    invalidate_catalog()
@@ -6,9 +6,15 @@ urlpatterns = [
     path('', views.ProduitListCreateView.as_view(), name='produit-list-create'),
     path('<int:pk>/', views.ProduitDetailView.as_view(), name='produit-detail'),
     path('<int:pk>/ajuster-stock/', views.StockAjustementView.as_view(), name='produit-ajuster-stock'),
+    path('import/', views.ProduitImportView.as_view(), name='produit-import'),
+    path('revision-prix/', views.RevisionPrixView.as_view(), name='produit-revision-prix'),
     
     # Mouvements de stock
     path('mouvements/', views.MouvementStockListView.as_view(), name='mouvement-stock-list'),
     path('mouvements/create/', views.MouvementStockCreateView.as_view(), name='mouvement-stock-create'),
     path('<int:produit_id>/mouvements/', views.MouvementStockByProductView.as_view(), name='mouvement-stock-by-product'),
+    
+    # Prévisions de demande
+    path('previsions/', views.PrevisionStockListView.as_view(), name='prevision-stock-list'),
+    path('<int:produit_id>/prevision/', views.PrevisionStockDetailView.as_view(), name='prevision-stock-detail'),
 ]
\ No newline at end of file
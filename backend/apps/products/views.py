@@ -4,8 +4,17 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
-from .models import Produit, MouvementStock
-from .serializers import ProduitSerializer, MouvementStockSerializer, MouvementStockCreateSerializer
+from rest_framework.pagination import CursorPagination
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncDay, TruncMonth, TruncWeek
+from django.core.cache import cache
+from django.http import StreamingHttpResponse
+import json
+from .models import Produit, MouvementStock, PrevisionStock
+from .serializers import ProduitSerializer, MouvementStockSerializer, MouvementStockCreateSerializer, PrevisionStockSerializer
+from .bulk import BulkOperationError, importer_produits, lire_fichier, reviser_prix
+from .cache import CATALOG_CACHE_TIMEOUT, catalog_cache_key
 from apps.logs.utils import create_log, LogTimer
 from apps.authentication.notification_service import NotificationService, check_and_notify_low_stock
 
@@ -18,6 +27,17 @@ class ProduitListCreateView(generics.ListCreateAPIView):
     serializer_class = ProduitSerializer
     permission_classes = [IsAuthenticated]
     
+    def list(self, request, *args, **kwargs):
+        """
+        Lister les produits (réponse mise en cache jusqu'à la prochaine modification du catalogue)
+        """
+        cache_key = catalog_cache_key(request.get_full_path())
+        data = cache.get(cache_key)
+        if data is None:
+            data = super().list(request, *args, **kwargs).data
+            cache.set(cache_key, data, CATALOG_CACHE_TIMEOUT)
+        return Response(data)
+    
     def create(self, request, *args, **kwargs):
         """
         Créer un produit avec logging
@@ -232,17 +252,157 @@ class MouvementStockCreateView(generics.CreateAPIView):
             return Response(response_serializer.data, status=status.HTTP_201_CREATED)
 
 
+class MouvementStockCursorPagination(CursorPagination):
+    """
+    Pagination par curseur pour l'historique des mouvements d'un produit.
+    Le coût d'une page ne dépend pas de la longueur de l'historique.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('-date_creation', '-id')
+
+
 class MouvementStockByProductView(generics.ListAPIView):
     """
     Vue pour lister les mouvements de stock d'un produit spécifique
+
+    Modes disponibles :
+    - par défaut : liste paginée par curseur (?cursor=..., ?page_size=...)
+    - ?group_by=day|week|month : totaux par période calculés en SQL (?limit=...)
+    - ?export=ndjson : export complet en streaming (curseur côté serveur)
     """
     serializer_class = MouvementStockSerializer
     permission_classes = [IsAuthenticated]
-    pagination_class = None  # Désactiver la pagination pour afficher tous les mouvements
+    pagination_class = MouvementStockCursorPagination
+    
+    GROUP_BY_FUNCTIONS = {
+        'day': TruncDay,
+        'week': TruncWeek,
+        'month': TruncMonth,
+    }
+    DEFAULT_GROUP_LIMIT = 100
+    MAX_GROUP_LIMIT = 1000
+    EXPORT_CHUNK_SIZE = 2000
     
     def get_queryset(self):
         produit_id = self.kwargs.get('produit_id')
-        return MouvementStock.objects.filter(produit_id=produit_id).select_related('produit', 'utilisateur').order_by('-date_creation')
+        return MouvementStock.objects.filter(produit_id=produit_id).select_related('produit', 'utilisateur').order_by('-date_creation', '-id')
+    
+    def list(self, request, *args, **kwargs):
+        group_by = request.query_params.get('group_by')
+        if group_by:
+            return self.list_grouped(request, group_by)
+        
+        export = request.query_params.get('export')
+        if export:
+            if export != 'ndjson':
+                return Response(
+                    {'error': "Format d'export non supporté (valeur acceptée: ndjson)"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            return self.export_ndjson()
+        
+        return super().list(request, *args, **kwargs)
+    
+    def list_grouped(self, request, group_by):
+        """
+        Totaux entree/sortie/ajustement/perte par période, agrégés par la base
+        """
+        trunc = self.GROUP_BY_FUNCTIONS.get(group_by)
+        if trunc is None:
+            return Response(
+                {'error': 'group_by doit valoir day, week ou month'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            limit = int(request.query_params.get('limit', self.DEFAULT_GROUP_LIMIT))
+        except (TypeError, ValueError):
+            limit = self.DEFAULT_GROUP_LIMIT
+        limit = max(1, min(limit, self.MAX_GROUP_LIMIT))
+        
+        def total(type_mouvement):
+            return Coalesce(Sum('quantite', filter=Q(type_mouvement=type_mouvement)), 0)
+        
+        buckets = (
+            MouvementStock.objects
+            .filter(produit_id=self.kwargs.get('produit_id'))
+            .annotate(periode=trunc('date_creation'))
+            .values('periode')
+            .annotate(
+                entree=total('entree'),
+                sortie=total('sortie'),
+                ajustement=total('ajustement'),
+                perte=total('perte'),
+                nombre_mouvements=Count('id'),
+            )
+            .order_by('-periode')[:limit]
+        )
+        
+        return Response({
+            'produit': int(self.kwargs.get('produit_id')),
+            'group_by': group_by,
+            'results': list(buckets),
+        })
+    
+    def export_ndjson(self):
+        """
+        Exporte tout l'historique en NDJSON sans le charger en mémoire
+        """
+        produit_id = self.kwargs.get('produit_id')
+        rows = (
+            MouvementStock.objects
+            .filter(produit_id=produit_id)
+            .order_by('-date_creation', '-id')
+            .values(
+                'id', 'produit_id', 'type_mouvement', 'quantite',
+                'stock_avant', 'stock_apres', 'motif', 'numero_document',
+                'date_creation', 'utilisateur_id',
+                'utilisateur__username', 'utilisateur__first_name', 'utilisateur__last_name',
+            )
+            .iterator(chunk_size=self.EXPORT_CHUNK_SIZE)
+        )
+        
+        def generate():
+            for row in rows:
+                username = row.pop('utilisateur__username')
+                full_name = f"{row.pop('utilisateur__first_name')} {row.pop('utilisateur__last_name')}".strip()
+                row['utilisateur_nom'] = (full_name or username) if row['utilisateur_id'] else None
+                yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+        
+        response = StreamingHttpResponse(generate(), content_type='application/x-ndjson')
+        response['Content-Disposition'] = f'attachment; filename="mouvements_produit_{produit_id}.ndjson"'
+        return response
+
+
+class PrevisionStockListView(generics.ListAPIView):
+    """
+    Vue pour lister les prévisions de demande précalculées
+    (?a_commander=true pour ne garder que les produits sous le point de commande)
+    """
+    serializer_class = PrevisionStockSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['produit']
+    ordering_fields = ['point_commande_suggere', 'jours_couverture', 'demande_moyenne_28j']
+    ordering = ['jours_couverture']
+    
+    def get_queryset(self):
+        queryset = PrevisionStock.objects.select_related('produit').filter(produit__is_active=True)
+        if self.request.query_params.get('a_commander') in ('true', '1'):
+            queryset = queryset.filter(produit__stock_actuel__lte=F('point_commande_suggere'))
+        return queryset
+
+
+class PrevisionStockDetailView(generics.RetrieveAPIView):
+    """
+    Vue pour récupérer la prévision d'un produit
+    """
+    serializer_class = PrevisionStockSerializer
+    permission_classes = [IsAuthenticated]
+    queryset = PrevisionStock.objects.select_related('produit')
+    lookup_field = 'produit_id'
 
 
 class StockAjustementView(APIView):
@@ -319,4 +479,68 @@ class StockAjustementView(APIView):
             'message': 'Stock ajusté avec succès',
             'produit': ProduitSerializer(produit).data,
             'mouvement': MouvementStockSerializer(mouvement).data
-        })
\ No newline at end of file
+        })
+
+
+class ProduitImportView(APIView):
+    """
+    Import en masse de produits depuis un fichier CSV ou XLSX
+    (création ou mise à jour par code_produit)
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        if not request.user.can_manage_stock():
+            return Response({'error': 'Permission refusée'}, status=status.HTTP_403_FORBIDDEN)
+        
+        fichier = request.FILES.get('fichier') or request.FILES.get('file')
+        if fichier is None:
+            return Response({'error': 'Le fichier est requis'}, status=status.HTTP_400_BAD_REQUEST)
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'oui')
+        
+        try:
+            lignes = lire_fichier(fichier, fichier.name)
+        except BulkOperationError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({'error': f'Fichier illisible: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        resultat = importer_produits(lignes, user=request.user, dry_run=dry_run, request=request)
+        if resultat['erreurs']:
+            return Response(
+                {'error': 'Import annulé: lignes invalides', **resultat},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response({'dry_run': dry_run, **resultat})
+
+
+class RevisionPrixView(APIView):
+    """
+    Révision des prix en masse (pourcentage ou montant) sur un ensemble filtré de produits
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        if not request.user.can_manage_stock():
+            return Response({'error': 'Permission refusée'}, status=status.HTTP_403_FORBIDDEN)
+        
+        if request.data.get('valeur') in (None, ''):
+            return Response({'error': 'valeur est requis'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Même lecture des options que l'import ("false", "0" -> False)
+        inclure_inactifs = str(request.data.get('inclure_inactifs', '')).lower() in ('1', 'true', 'oui')
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'oui')
+        try:
+            resultat = reviser_prix(
+                mode=request.data.get('mode', 'pourcentage'),
+                valeur=request.data.get('valeur'),
+                type_produit=request.data.get('type_produit') or None,
+                produit_ids=request.data.get('produits') or None,
+                inclure_inactifs=inclure_inactifs,
+                user=request.user,
+                dry_run=dry_run,
+                request=request,
+            )
+        except BulkOperationError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(resultat)
@@ -3,29 +3,16 @@ Signaux de notifications pour le module Ventes
 """
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from apps.authentication.models import User, Notification
+from apps.authentication.notification_service import fan_out
 from .models import Vente
 
 
 def notify_users_by_role(roles, notification_type, title, message, **kwargs):
     """
     Crée des notifications pour tous les utilisateurs ayant les rôles spécifiés
+    (en un bulk_create après le commit de la transaction)
     """
-    users = User.objects.filter(role__in=roles, is_active=True)
-    
-    notifications = []
-    for user in users:
-        notification = Notification(
-            user=user,
-            type=notification_type,
-            title=title,
-            message=message,
-            **kwargs
-        )
-        notifications.append(notification)
-    
-    if notifications:
-        Notification.objects.bulk_create(notifications)
+    fan_out(roles, notification_type, title, message, respect_preferences=False, **kwargs)
 
 
 @receiver(post_save, sender=Vente)
@@ -0,0 +1,18 @@
+from django.apps import AppConfig
+from django.core.signals import request_started
+from django.utils.module_loading import autodiscover_modules
+
+
+class TasksConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.tasks'
+    verbose_name = 'Tâches différées'
+
+    def ready(self):
+        from .runner import task_runner
+
+        # Enregistre les tâches déclarées dans les modules tasks.py des applications
+        autodiscover_modules('tasks')
+        if task_runner.asynchronous:
+            # Première requête d'un worker: reprise des tâches laissées par le worker précédent
+            request_started.connect(task_runner.ensure_started, dispatch_uid='tasks_runner_start')
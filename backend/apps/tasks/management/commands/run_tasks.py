@@ -0,0 +1,65 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.utils import timezone
+
+from apps.tasks.models import DeferredTask
+from apps.tasks.runner import task_runner
+
+
+class Command(BaseCommand):
+    help = (
+        'Exécute les tâches différées dues (reprise après arrêt des workers, '
+        'ou exécution hors du serveur web avec --loop)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Affiche les tâches en attente et en échec sans les exécuter')
+        parser.add_argument('--retry-failed', action='store_true',
+                            help='Remet en attente les tâches abandonnées après leur dernier essai')
+        parser.add_argument('--loop', action='store_true',
+                            help='Continue à exécuter les tâches jusqu\'à interruption (Ctrl+C)')
+        parser.add_argument('--interval', type=float, default=5,
+                            help='Pause en secondes entre deux passages avec --loop (défaut: 5)')
+
+    def handle(self, *args, **options):
+        if options['interval'] <= 0:
+            raise CommandError('--interval doit être supérieur à 0')
+
+        if options['dry_run']:
+            self._summary()
+            self.stdout.write('Aucune modification effectuée')
+            return
+
+        if options['retry_failed']:
+            relancees = DeferredTask.objects.filter(status='failed').update(
+                status='pending', attempts=0, run_after=timezone.now(), locked_at=None,
+            )
+            self.stdout.write(f'{relancees} tâche(s) en échec remise(s) en attente')
+
+        total = task_runner.run_pending()
+        self.stdout.write(self.style.SUCCESS(f'{total} tâche(s) traitée(s)'))
+        if not options['loop']:
+            return
+
+        try:
+            while True:
+                time.sleep(options['interval'])
+                traitees = task_runner.run_pending()
+                if traitees:
+                    self.stdout.write(f'{traitees} tâche(s) traitée(s)')
+        except KeyboardInterrupt:
+            self.stdout.write('Arrêt')
+
+    def _summary(self):
+        now = timezone.now()
+        par_statut = (
+            DeferredTask.objects.order_by().values('name', 'status')
+            .annotate(n=Count('id')).order_by('name', 'status')
+        )
+        for ligne in par_statut:
+            self.stdout.write(f"{ligne['name']}: {ligne['n']} {ligne['status']}")
+        dues = DeferredTask.objects.filter(status='pending', run_after__lte=now).count()
+        self.stdout.write(f'{dues} tâche(s) due(s)')
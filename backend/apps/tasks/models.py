@@ -0,0 +1,37 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class DeferredTask(models.Model):
+    """
+    Tâche différée en attente d'exécution (file durable de apps/tasks/runner.py).
+    Supprimée après succès; gardée avec son erreur après le dernier essai.
+    """
+
+    STATUS_CHOICES = [
+        ('pending', 'En attente'),
+        ('running', 'En cours'),
+        ('failed', 'Échouée'),
+    ]
+
+    name = models.CharField(max_length=100, verbose_name='Tâche')
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder, verbose_name='Arguments')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', verbose_name='Statut')
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='Essais')
+    max_attempts = models.PositiveSmallIntegerField(default=5, verbose_name='Essais maximum')
+    run_after = models.DateTimeField(verbose_name='Exécution à partir de')
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name='Prise en charge le')
+    last_error = models.TextField(blank=True, verbose_name='Dernière erreur')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Créée le')
+
+    class Meta:
+        db_table = 'deferred_tasks'
+        ordering = ['id']
+        verbose_name = 'Tâche différée'
+        verbose_name_plural = 'Tâches différées'
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='task_status_run_after_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.get_status_display()})"
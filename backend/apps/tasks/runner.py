@@ -0,0 +1,289 @@
+"""
+Tâches différées: effets de bord exécutés après la réponse
+
+Les vues n'effectuent plus elles-mêmes les envois lents (emails, notifications):
+elles appellent defer('nom.tache', **arguments). La tâche est insérée dans la
+table deferred_tasks dans la transaction en cours (elle disparaît si la
+transaction est annulée) et le pool de threads du processus est réveillé au
+commit (transaction.on_commit). Aucun broker externe: la table sert de file, ce
+qui la rend durable. Une tâche non exécutée à l'arrêt d'un worker est reprise
+par le prochain worker démarré ou par manage.py run_tasks.
+
+Une tâche atomic=True (écritures en base uniquement) est exécutée dans la même
+transaction que la suppression de sa ligne: elle n'est jamais appliquée deux
+fois. Les autres (emails) peuvent être rejouées si le worker s'arrête pendant
+leur exécution.
+
+En cas d'erreur, la tâche est relancée après TASKS_RETRY_DELAY * 2^(essais - 1)
+secondes, au plus max_attempts fois; elle reste ensuite en statut 'failed' avec
+sa dernière erreur (manage.py run_tasks --retry-failed pour la relancer).
+
+    @task('emails.send', max_attempts=5)
+    def send_email(subject, message, recipient_list, html_message=None):
+        ...
+
+    defer('emails.send', subject=..., message=..., recipient_list=[email])
+
+Les arguments sont enregistrés en JSON: passer des identifiants, pas des objets.
+
+Réglages (settings.py):
+    TASKS_ASYNC            False = exécution au commit dans le processus, sans file (tests, scripts)
+    TASKS_WORKERS          threads d'exécution par processus
+    TASKS_POLL_INTERVAL    délai maximal (s) entre deux recherches de tâches dues (nouveaux essais)
+    TASKS_RETRY_DELAY      délai (s) avant le premier nouvel essai
+    TASKS_LOCK_TIMEOUT     délai (s) après lequel une tâche 'running' abandonnée est reprise
+"""
+import atexit
+import logging
+import os
+import threading
+from collections import namedtuple
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+TaskDefinition = namedtuple('TaskDefinition', ['name', 'func', 'max_attempts', 'atomic'])
+
+_registry = {}
+
+
+class TaskLost(Exception):
+    """La tâche en cours a été reprise par un autre worker (ses effets sont annulés)"""
+
+
+def task(name, max_attempts=5, atomic=False):
+    """
+    Décorateur: enregistre une fonction comme tâche différée sous le nom `name`.
+    atomic=True: la tâche ne fait que des écritures en base, exécutées dans la même
+    transaction que la suppression de sa ligne (exactement une fois). Sinon (email,
+    appel externe), une tâche interrompue avant la fin peut être rejouée.
+    """
+    def decorator(func):
+        _registry[name] = TaskDefinition(name, func, max_attempts, atomic)
+        func.task_name = name
+        return func
+    return decorator
+
+
+def get_task(name):
+    try:
+        return _registry[name]
+    except KeyError:
+        raise LookupError(f"Tâche différée inconnue: '{name}'") from None
+
+
+def defer(name, **payload):
+    """
+    Programme la tâche `name` après le commit de la transaction en cours
+    (immédiatement hors transaction). Retourne la DeferredTask créée (None en mode synchrone).
+    """
+    from .models import DeferredTask
+
+    definition = get_task(name)
+    if not task_runner.asynchronous:
+        transaction.on_commit(partial(run_now, definition, payload))
+        return None
+
+    deferred = DeferredTask.objects.create(
+        name=name,
+        payload=payload,
+        max_attempts=definition.max_attempts,
+        run_after=timezone.now(),
+    )
+    transaction.on_commit(task_runner.wake)
+    return deferred
+
+
+def run_now(definition, payload):
+    """Exécution immédiate (mode synchrone): une erreur est journalisée, pas propagée"""
+    try:
+        definition.func(**payload)
+    except Exception:
+        logger.exception(f"Échec de la tâche '{definition.name}'")
+
+
+class TaskRunner:
+    """Pool de threads qui exécute les tâches dues de la table deferred_tasks"""
+
+    def __init__(self):
+        self._threads = []
+        self._pid = None
+        self._lock = threading.Lock()
+        self._condition = threading.Condition()
+        self._signalled = False  # réveil reçu pendant que les threads travaillaient
+        self._stopping = False
+
+    # ------------------------------------------------------------------ config
+
+    @staticmethod
+    def _setting(name, default):
+        return getattr(settings, name, default)
+
+    @property
+    def asynchronous(self):
+        return self._setting('TASKS_ASYNC', True)
+
+    @property
+    def poll_interval(self):
+        return self._setting('TASKS_POLL_INTERVAL', 30)
+
+    # ------------------------------------------------------------------ pilotage
+
+    def wake(self):
+        """Signale de nouvelles tâches aux threads (démarrés au besoin)"""
+        self.ensure_started()
+        with self._condition:
+            self._signalled = True
+            self._condition.notify_all()
+
+    def ensure_started(self, **kwargs):
+        # Mode synchrone activé après le chargement des applications (lanceur des tests)
+        if not self.asynchronous:
+            return
+        # Après un fork (workers gunicorn), les threads du parent n'existent pas dans l'enfant
+        if self._running():
+            return
+        with self._lock:
+            if self._running():
+                return
+            self._pid = os.getpid()
+            self._stopping = False
+            self._threads = [
+                threading.Thread(target=self._run, name=f'deferred-task-{i}', daemon=True)
+                for i in range(max(self._setting('TASKS_WORKERS', 2), 1))
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def shutdown(self):
+        """Arrêt du processus: les tâches non exécutées restent en base et seront reprises"""
+        self._stopping = True
+        with self._condition:
+            self._condition.notify_all()
+
+    def stats(self):
+        from .models import DeferredTask
+
+        data = dict(DeferredTask.objects.order_by().values('status').annotate(n=Count('id')).values_list('status', 'n'))
+        data.update({
+            'asynchronous': self.asynchronous,
+            'running': self._running(),
+        })
+        return data
+
+    # ------------------------------------------------------------------ exécution
+
+    def run_next(self):
+        """Prend et exécute la prochaine tâche due; False s'il n'y en a pas"""
+        deferred = self._claim()
+        if deferred is None:
+            return False
+        self._execute(deferred)
+        return True
+
+    def run_pending(self):
+        """Traite toutes les tâches dues dans le thread appelant (succès ou échec); retourne leur nombre"""
+        self.release_stale()
+        total = 0
+        while self.run_next():
+            total += 1
+        return total
+
+    def release_stale(self):
+        """Remet en attente les tâches 'running' abandonnées (worker arrêté pendant l'exécution)"""
+        from .models import DeferredTask
+
+        limite = timezone.now() - timedelta(seconds=self._setting('TASKS_LOCK_TIMEOUT', 600))
+        return DeferredTask.objects.filter(status='running', locked_at__lt=limite).update(
+            status='pending', locked_at=None,
+        )
+
+    # ------------------------------------------------------------------ interne
+
+    def _running(self):
+        return self._pid == os.getpid() and any(thread.is_alive() for thread in self._threads)
+
+    def _claim(self):
+        from .models import DeferredTask
+
+        now = timezone.now()
+        candidates = list(
+            DeferredTask.objects.filter(status='pending', run_after__lte=now)
+            .order_by('run_after', 'id').values_list('id', flat=True)[:10]
+        )
+        for task_id in candidates:
+            # UPDATE conditionnel: une seule prise en charge, même avec plusieurs processus
+            claimed = DeferredTask.objects.filter(id=task_id, status='pending').update(
+                status='running', locked_at=now, attempts=F('attempts') + 1,
+            )
+            if claimed:
+                return DeferredTask.objects.get(id=task_id)
+        return None
+
+    def _execute(self, deferred):
+        from .models import DeferredTask
+
+        # Condition sur la prise en charge: une tâche reprise entre-temps par un autre
+        # worker (TASKS_LOCK_TIMEOUT dépassé) ne lui est pas retirée
+        owned = DeferredTask.objects.filter(id=deferred.id, status='running', locked_at=deferred.locked_at)
+        try:
+            definition = get_task(deferred.name)
+            if definition.atomic:
+                # Effets de la tâche et suppression de la ligne validés ensemble:
+                # un worker arrêté avant le commit ne laisse rien, la tâche est rejouée proprement
+                with transaction.atomic():
+                    definition.func(**deferred.payload)
+                    if not owned.delete()[0]:
+                        raise TaskLost(f"Tâche #{deferred.id} reprise par un autre worker")
+                return
+            definition.func(**deferred.payload)
+        except TaskLost as e:
+            logger.warning(str(e))
+        except Exception as e:
+            self._fail(deferred, e)
+        else:
+            owned.delete()
+
+    def _fail(self, deferred, error):
+        from .models import DeferredTask
+
+        owned = DeferredTask.objects.filter(id=deferred.id, status='running', locked_at=deferred.locked_at)
+        message = f'{type(error).__name__}: {error}'
+        if deferred.attempts >= deferred.max_attempts:
+            owned.update(status='failed', locked_at=None, last_error=message)
+            logger.error(f"Tâche '{deferred.name}' #{deferred.id} abandonnée après {deferred.attempts} essai(s): {message}")
+            return
+        delay = self._setting('TASKS_RETRY_DELAY', 30) * 2 ** (deferred.attempts - 1)
+        owned.update(
+            status='pending',
+            locked_at=None,
+            last_error=message,
+            run_after=timezone.now() + timedelta(seconds=delay),
+        )
+        logger.warning(f"Tâche '{deferred.name}' #{deferred.id} en échec ({message}), nouvel essai dans {delay}s")
+
+    def _run(self):
+        while not self._stopping:
+            try:
+                close_old_connections()
+                self.release_stale()
+                while not self._stopping and self.run_next():
+                    pass
+            except Exception:
+                logger.exception('Erreur du thread des tâches différées')
+            with self._condition:
+                if not self._signalled and not self._stopping:
+                    self._condition.wait(self.poll_interval)
+                self._signalled = False
+        connection.close()
+
+
+task_runner = TaskRunner()
+atexit.register(task_runner.shutdown)
@@ -71,11 +71,14 @@ LOCAL_APPS = [
     'apps.deliveries',
     'apps.reports',
     'apps.logs',
+    'apps.tasks',
 ]
 
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 MIDDLEWARE = [
+    'apps.logs.middleware.RequestTimingMiddleware',  # Server-Timing et statistiques par route
+    'apps.logs.middleware.ProfilingMiddleware',  # Profilage à la demande (admin)
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -194,9 +197,77 @@ CACHES = {
     }
 }
 
+# Lanceur des tests: logs et tâches différées synchrones (sygla_h2o/test_runner.py)
+TEST_RUNNER = 'sygla_h2o.test_runner.SyglaTestRunner'
+
 # Optimisation des connexions base de données
 CONN_MAX_AGE = 60  # Garde les connexions ouvertes pendant 60 secondes
 
+# Archivage des mouvements de stock (manage.py archive_stock_movements)
+STOCK_ARCHIVE_HORIZON_DAYS = config('STOCK_ARCHIVE_HORIZON_DAYS', default=365, cast=int)
+
+# Logs système écrits en arrière-plan par lots (apps/logs/buffer.py)
+# Écriture synchrone pendant les tests (SyglaTestRunner) ou avec SYSTEM_LOG_ASYNC=False (scripts)
+SYSTEM_LOG_ASYNC = config('SYSTEM_LOG_ASYNC', default=True, cast=bool)
+SYSTEM_LOG_QUEUE_SIZE = config('SYSTEM_LOG_QUEUE_SIZE', default=10000, cast=int)
+SYSTEM_LOG_BATCH_SIZE = config('SYSTEM_LOG_BATCH_SIZE', default=200, cast=int)
+SYSTEM_LOG_FLUSH_INTERVAL = config('SYSTEM_LOG_FLUSH_INTERVAL', default=2.0, cast=float)
+SYSTEM_LOG_FULL_POLICY = config('SYSTEM_LOG_FULL_POLICY', default='drop')  # 'drop' ou 'block'
+SYSTEM_LOG_BLOCK_TIMEOUT = config('SYSTEM_LOG_BLOCK_TIMEOUT', default=0.05, cast=float)
+
+# Tâches différées exécutées hors de la requête (apps/tasks/runner.py, manage.py run_tasks)
+# Exécution au commit, sans file, pendant les tests (SyglaTestRunner) ou avec TASKS_ASYNC=False
+TASKS_ASYNC = config('TASKS_ASYNC', default=True, cast=bool)
+TASKS_WORKERS = config('TASKS_WORKERS', default=2, cast=int)  # threads par worker gunicorn
+TASKS_POLL_INTERVAL = config('TASKS_POLL_INTERVAL', default=30, cast=float)
+TASKS_RETRY_DELAY = config('TASKS_RETRY_DELAY', default=30, cast=int)  # doublé à chaque nouvel essai
+TASKS_LOCK_TIMEOUT = config('TASKS_LOCK_TIMEOUT', default=600, cast=int)
+
+# Mesure des performances par requête (apps/logs/middleware.py)
+PERF_SAMPLE_RATE = config('PERF_SAMPLE_RATE', default=1.0, cast=float)  # part des requêtes dans les histogrammes
+PERF_WINDOW_MINUTES = config('PERF_WINDOW_MINUTES', default=15, cast=int)
+PERF_SLOW_REQUEST_MS = config('PERF_SLOW_REQUEST_MS', default=1000, cast=float)  # journalisées dans SystemLog
+
+# Inspection des requêtes SQL (apps/logs/queries.py, manage.py query_offenders)
+QUERY_INSPECTOR_MODE = config('QUERY_INSPECTOR_MODE', default='sample')  # 'off', 'sample' ou 'raise'
+QUERY_INSPECTOR_SAMPLE_RATE = config('QUERY_INSPECTOR_SAMPLE_RATE', default=0.05, cast=float)
+QUERY_N1_THRESHOLD = config('QUERY_N1_THRESHOLD', default=5, cast=int)  # même requête répétée N fois
+QUERY_SLOW_MS = config('QUERY_SLOW_MS', default=200, cast=float)
+QUERY_STATS_FLUSH_INTERVAL = config('QUERY_STATS_FLUSH_INTERVAL', default=60, cast=int)
+
+# Utilisateurs authentifiés par JWT mis en cache (apps/authentication/cache.py), cache partagé uniquement
+AUTH_USER_CACHE_TIMEOUT = config('AUTH_USER_CACHE_TIMEOUT', default=300, cast=int)
+
+# Activité des utilisateurs écrite par lots (apps/authentication/activity.py)
+# Doit rester inférieur à la fenêtre « en ligne » des sessions (5 minutes)
+USER_ACTIVITY_FLUSH_INTERVAL = config('USER_ACTIVITY_FLUSH_INTERVAL', default=60, cast=int)
+# Sessions sans activité désactivées après ce délai (manage.py deactivate_stale_sessions)
+USER_SESSION_STALE_HOURS = config('USER_SESSION_STALE_HOURS', default=24, cast=int)
+
+# Flux temps réel des notifications (apps/authentication/stream.py)
+# Chaque flux ouvert occupe un thread: gunicorn doit tourner en gthread (voir render.yaml)
+SSE_BACKEND = config('SSE_BACKEND', default='local')  # 'local' (un worker) ou 'postgres' (LISTEN/NOTIFY)
+SSE_HEARTBEAT_SECONDS = config('SSE_HEARTBEAT_SECONDS', default=20, cast=int)
+SSE_STREAM_MAX_SECONDS = config('SSE_STREAM_MAX_SECONDS', default=300, cast=int)
+SSE_BUFFER_SIZE = config('SSE_BUFFER_SIZE', default=500, cast=int)
+SSE_MAX_STREAMS = config('SSE_MAX_STREAMS', default=24, cast=int)
+SSE_TICKET_MAX_AGE = config('SSE_TICKET_MAX_AGE', default=60, cast=int)  # ticket dans l'URL: nouveau ticket à chaque connexion
+
+# Séries temporelles des logs: au-delà de cette période, lecture des agrégats horaires
+LOG_TIMESERIES_RAW_MAX_HOURS = config('LOG_TIMESERIES_RAW_MAX_HOURS', default=48, cast=int)
+
+# Durée de conservation des logs système par type, en jours (manage.py purge_logs, 0 = illimitée)
+SYSTEM_LOG_RETENTION_DAYS = {
+    'info': config('LOG_RETENTION_INFO_DAYS', default=30, cast=int),
+    'success': config('LOG_RETENTION_SUCCESS_DAYS', default=30, cast=int),
+    'warning': config('LOG_RETENTION_WARNING_DAYS', default=90, cast=int),
+    'error': config('LOG_RETENTION_ERROR_DAYS', default=180, cast=int),
+}
+
+# Rétention des notifications (manage.py purge_notifications, 0 = étape désactivée)
+NOTIFICATION_READ_RETENTION_DAYS = config('NOTIFICATION_READ_RETENTION_DAYS', default=30, cast=int)  # lues supprimées
+NOTIFICATION_COMPACT_AFTER_DAYS = config('NOTIFICATION_COMPACT_AFTER_DAYS', default=7, cast=int)  # non lues regroupées
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -205,7 +276,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.authentication.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
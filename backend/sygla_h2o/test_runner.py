@@ -0,0 +1,17 @@
+"""
+Lanceur des tests Django (settings.TEST_RUNNER)
+"""
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class SyglaTestRunner(DiscoverRunner):
+    """
+    Les tests lisent dans leur transaction ce que les vues écrivent: logs système
+    et tâches différées sont exécutés de façon synchrone, sans thread d'arrière-plan.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.SYSTEM_LOG_ASYNC = False
+        settings.TASKS_ASYNC = False
@@ -0,0 +1,167 @@
+"""
+Jeu de données fixe pour les tests de budget de requêtes
+
+seed(n) ajoute n enregistrements de chaque type (clients, produits, commandes
+avec lignes et paiements, ventes, mouvements de stock, logs, notifications,
+sessions). Les insertions passent par bulk_create: les save() des modèles
+(numérotation, recalcul des montants) ne sont pas exécutés, les champs calculés
+sont donc renseignés ici directement.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+
+from apps.authentication.models import Notification, User, UserSession
+from apps.clients.models import Client
+from apps.logs.models import SystemLog
+from apps.orders.models import Commande, ItemCommande, PaiementCommande
+from apps.products.models import MouvementStock, Produit
+from apps.sales.models import LigneVente, Paiement, Vente
+
+
+STATUTS_COMMANDE = ['en_attente', 'validee', 'en_preparation', 'en_livraison', 'livree']
+METHODES = ['especes', 'carte', 'virement', 'mobile']
+LOG_TYPES = ['info', 'success', 'warning', 'error']
+LOG_MODULES = ['orders', 'sales', 'stock', 'clients', 'auth']
+
+
+def create_users():
+    """Un utilisateur par rôle, renvoyés dans un dict rôle -> utilisateur"""
+    users = {}
+    for role in ('admin', 'vendeur', 'stock', 'livreur'):
+        users[role] = User.objects.create_user(
+            username=f'{role}_budget',
+            email=f'{role}@budget.test',
+            password='budget-test-123',
+            role=role,
+        )
+    return users
+
+
+def seed(count, users, offset=0):
+    """Ajoute `count` enregistrements de chaque type; `offset` évite les collisions de numéros"""
+    now = timezone.now()
+    vendeur = users['vendeur']
+    admin = users['admin']
+    numeros = range(offset, offset + count)
+
+    clients = Client.objects.bulk_create([
+        Client(
+            type_client='entreprise' if i % 3 else 'particulier',
+            nom_commercial=f'Client {i}',
+            raison_sociale=f'Client {i} SA',
+            telephone=f'509-3{i:07d}',
+            adresse=f'{i} rue des Tests, Port-au-Prince',
+            contact=f'Contact {i}',
+            email=f'client{i}@budget.test',
+        )
+        for i in numeros
+    ])
+    produits = Produit.objects.bulk_create([
+        Produit(
+            nom=f'Produit {i}',
+            code_produit=f'BUD{i:05d}',
+            type_produit='eau' if i % 2 else 'glace',
+            unite_mesure='bouteille' if i % 2 else 'sachet',
+            prix_unitaire=Decimal('25.00') + i,
+            stock_actuel=100 + i,
+            stock_minimal=10,
+        )
+        for i in numeros
+    ])
+
+    commandes = Commande.objects.bulk_create([
+        Commande(
+            numero_commande=f'CMDBUD{i:06d}',
+            client=client,
+            vendeur=vendeur,
+            statut=STATUTS_COMMANDE[i % len(STATUTS_COMMANDE)],
+            type_livraison='livraison_domicile' if i % 2 else 'retrait_magasin',
+            adresse_livraison=client.adresse,
+            montant_produits=Decimal('250.00'),
+            montant_total=Decimal('250.00'),
+            montant_paye=Decimal('100.00'),
+            montant_restant=Decimal('150.00'),
+            statut_paiement='paye_partiel',
+        )
+        for i, client in zip(numeros, clients)
+    ])
+    ItemCommande.objects.bulk_create([
+        ItemCommande(
+            commande=commande,
+            produit=produit,
+            quantite=10,
+            prix_unitaire=Decimal('25.00'),
+            sous_total=Decimal('250.00'),
+        )
+        for commande, produit in zip(commandes, produits)
+    ])
+    PaiementCommande.objects.bulk_create([
+        PaiementCommande(commande=commande, montant=Decimal('100.00'), methode='especes', recu_par=vendeur)
+        for commande in commandes
+    ])
+
+    ventes = Vente.objects.bulk_create([
+        Vente(
+            numero_vente=f'VBUD{i:06d}',
+            client=client,
+            vendeur=vendeur,
+            montant_total=Decimal('250.00'),
+            montant_paye=Decimal('250.00'),
+            montant_restant=Decimal('0.00'),
+            statut_paiement='paye',
+            methode_paiement=METHODES[i % len(METHODES)],
+            date_vente=now - timedelta(days=i % 30),
+        )
+        for i, client in zip(numeros, clients)
+    ])
+    LigneVente.objects.bulk_create([
+        LigneVente(
+            vente=vente,
+            produit=produit,
+            quantite=10,
+            prix_unitaire=Decimal('25.00'),
+            montant=Decimal('250.00'),
+        )
+        for vente, produit in zip(ventes, produits)
+    ])
+    Paiement.objects.bulk_create([
+        Paiement(vente=vente, montant=Decimal('250.00'), methode='especes', recu_par=vendeur)
+        for vente in ventes
+    ])
+
+    MouvementStock.objects.bulk_create([
+        MouvementStock(
+            produit=produit,
+            type_mouvement='sortie',
+            quantite=10,
+            stock_avant=produit.stock_actuel + 10,
+            stock_apres=produit.stock_actuel,
+            motif='Vente',
+            utilisateur=users['stock'],
+        )
+        for produit in produits
+    ])
+
+    SystemLog.objects.bulk_create([
+        SystemLog(
+            type=LOG_TYPES[i % len(LOG_TYPES)],
+            message=f'Opération de test {i}',
+            details=f'Détails de l\'opération {i}',
+            user=admin,
+            module=LOG_MODULES[i % len(LOG_MODULES)],
+            timestamp=now - timedelta(minutes=i),
+            response_time_ms=float(10 + i % 50),
+        )
+        for i in numeros
+    ])
+    Notification.objects.bulk_create([
+        Notification(user=user, type='order_created', title=f'Commande {i}', message=f'Commande {i} créée')
+        for i in numeros
+        for user in (admin, vendeur)
+    ])
+    UserSession.objects.bulk_create([
+        UserSession(user=admin, token=f'budget-session-{i}')
+        for i in numeros
+    ])
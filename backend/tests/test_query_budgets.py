@@ -0,0 +1,127 @@
+"""
+Budget de requêtes SQL par endpoint
+
+Chaque endpoint de query_budgets.json est appelé deux fois: avec le petit jeu de
+données (SMALL) puis après extension au grand jeu (LARGE). Le test échoue si
+- le nombre de requêtes du grand jeu dépasse `max_queries`;
+- la croissance entre les deux appels dépasse `growth` (0 = indépendant du
+  volume; une valeur > 0 documente un N+1 connu, à ne pas aggraver).
+
+Lancement:   python manage.py test tests
+Recalibrage: QUERY_BUDGETS_UPDATE=1 python manage.py test tests
+             (réécrit query_budgets.json avec les valeurs mesurées)
+"""
+import json
+import os
+from collections import Counter
+from pathlib import Path
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.logs.profiling import armed_state
+from apps.logs.queries import normalize_sql
+
+from . import dataset
+
+
+BUDGET_FILE = Path(__file__).with_name('query_budgets.json')
+SMALL = 10
+LARGE = 100
+
+
+def load_budgets():
+    with open(BUDGET_FILE, encoding='utf-8') as handle:
+        return json.load(handle)
+
+
+@override_settings(
+    QUERY_INSPECTOR_MODE='off',
+    PERF_SLOW_REQUEST_MS=10 ** 9,
+    SYSTEM_LOG_ASYNC=False,
+    USER_ACTIVITY_FLUSH_INTERVAL=10 ** 9,
+)
+class QueryBudgetTests(TestCase):
+    """Nombre de requêtes par endpoint, indépendant du volume de données"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = dataset.create_users()
+        dataset.seed(SMALL, cls.users)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.users['admin'])
+        # Pas de lecture des sessions de profilage (rafraîchie selon l'horloge)
+        patcher = mock.patch.object(armed_state, 'sessions', return_value=[])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def measure(self, url):
+        cache.clear()  # catalogue produits: on mesure le chemin non mis en cache
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertLess(response.status_code, 400, f'GET {url} -> {response.status_code}')
+        return [query['sql'] for query in context.captured_queries]
+
+    def resolve(self, url):
+        """Remplace {client}, {commande}... par l'identifiant du premier enregistrement seedé"""
+        from apps.clients.models import Client
+        from apps.orders.models import Commande
+        from apps.products.models import Produit
+        from apps.sales.models import Vente
+
+        return url.format(
+            client=Client.objects.order_by('id').values_list('id', flat=True).first(),
+            commande=Commande.objects.order_by('id').values_list('id', flat=True).first(),
+            produit=Produit.objects.order_by('id').values_list('id', flat=True).first(),
+            vente=Vente.objects.order_by('id').values_list('id', flat=True).first(),
+        )
+
+    def test_query_budgets(self):
+        budgets = load_budgets()
+        urls = {name: self.resolve(name) for name in budgets}
+
+        small = {name: self.measure(url) for name, url in urls.items()}
+        dataset.seed(LARGE - SMALL, self.users, offset=SMALL)
+        large = {name: self.measure(url) for name, url in urls.items()}
+
+        if os.environ.get('QUERY_BUDGETS_UPDATE'):
+            self.write_budgets(budgets, small, large)
+            return
+
+        for name, budget in budgets.items():
+            with self.subTest(endpoint=name):
+                count, growth = len(large[name]), len(large[name]) - len(small[name])
+                if count > budget['max_queries'] or growth > budget['growth']:
+                    self.fail(self.report(name, budget, small[name], large[name]))
+
+    @staticmethod
+    def report(name, budget, small, large):
+        """Message d'échec: compteurs, requêtes qui croissent avec le volume, puis tout le SQL"""
+        growing = Counter(map(normalize_sql, large))
+        growing.subtract(Counter(map(normalize_sql, small)))
+        lines = [
+            f"GET {name}: {len(small)} requêtes ({SMALL} lignes) -> {len(large)} requêtes ({LARGE} lignes); "
+            f"budget max_queries={budget['max_queries']}, growth={budget['growth']}",
+        ]
+        offenders = [(sql, extra) for sql, extra in growing.most_common() if extra > 0]
+        if offenders:
+            lines.append('Requêtes qui croissent avec le volume:')
+            lines.extend(f'  +{extra}  {sql}' for sql, extra in offenders)
+        lines.append(f'SQL exécuté ({LARGE} lignes):')
+        lines.extend(f'  {index:3d}. {sql}' for index, sql in enumerate(large, 1))
+        return '\n'.join(lines)
+
+    @staticmethod
+    def write_budgets(budgets, small, large):
+        for name, budget in budgets.items():
+            budget['max_queries'] = len(large[name])
+            budget['growth'] = max(len(large[name]) - len(small[name]), 0)
+        with open(BUDGET_FILE, 'w', encoding='utf-8') as handle:
+            json.dump(budgets, handle, indent=2, ensure_ascii=False)
+            handle.write('\n')
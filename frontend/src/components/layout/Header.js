@@ -136,17 +136,29 @@ const Header = ({ onMenuToggle, isSidebarOpen, isMobile }) => {
     return () => document.removeEventListener('mousedown', handleClickOutside);
   }, []);
 
-  // Charger les notifications au montage et quand l'utilisateur change
+  // Charger les notifications au montage et quand l'utilisateur change, puis
+  // suivre le flux temps réel (interrogation toutes les 5 secondes en secours)
   useEffect(() => {
     if (user) {
       loadNotifications();
-      
-      // Recharger les notifications toutes les 5 secondes
-      const interval = setInterval(() => {
-        loadNotifications();
-      }, 5000);
-      
-      return () => clearInterval(interval);
+
+      let interval = null;
+      const closeStream = notificationService.openNotificationStream({
+        notification: () => loadNotifications(),
+        unread_count: ({ count }) => setUnreadCount(count),
+        order_status: (data) => window.dispatchEvent(new CustomEvent('order-status', { detail: data })),
+        resync: () => loadNotifications(),
+        onFallback: () => {
+          interval = setInterval(() => {
+            loadNotifications();
+          }, 5000);
+        },
+      });
+
+      return () => {
+        closeStream();
+        clearInterval(interval);
+      };
     }
   }, [user]);
   
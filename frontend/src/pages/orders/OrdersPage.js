@@ -158,6 +158,20 @@ const OrdersPage = () => {
     fetchOrders();
   }, []);
 
+  // Flux temps réel (Header.js): commande créée ou statut modifié par un autre utilisateur
+  useEffect(() => {
+    const handleOrderStatus = async () => {
+      try {
+        const response = await orderService.getAll();
+        setOrders(response.results || response);
+      } catch (error) {
+        console.error('Erreur lors du rafraîchissement des commandes:', error);
+      }
+    };
+    window.addEventListener('order-status', handleOrderStatus);
+    return () => window.removeEventListener('order-status', handleOrderStatus);
+  }, []);
+
   const fetchOrders = async () => {
     try {
       setLoading(true);
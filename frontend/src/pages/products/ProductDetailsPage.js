@@ -12,6 +12,7 @@ const ProductDetailsPage = () => {
   const [product, setProduct] = useState(null);
   const [loading, setLoading] = useState(true);
   const [mouvements, setMouvements] = useState([]);
+  const [hasMoreMouvements, setHasMoreMouvements] = useState(false);
   const [loadingMouvements, setLoadingMouvements] = useState(true);
 
   useEffect(() => {
@@ -34,12 +35,14 @@ const ProductDetailsPage = () => {
   const fetchMouvements = async () => {
     try {
       setLoadingMouvements(true);
-      const data = await productService.getStockMovements(id);
-      // Prendre les derniers mouvements (les plus récents d'abord)
+      // Seule la première page (les plus récents d'abord) est chargée
+      const data = await productService.getStockMovements(id, { page_size: 15 });
       setMouvements(Array.isArray(data) ? data : (data.results || []));
+      setHasMoreMouvements(Boolean(data && data.next));
     } catch (error) {
       console.error('Erreur lors du chargement des mouvements:', error);
       setMouvements([]);
+      setHasMoreMouvements(false);
     } finally {
       setLoadingMouvements(false);
     }
@@ -373,10 +376,10 @@ const ProductDetailsPage = () => {
                       </tbody>
                     </table>
                   </div>
-                  {mouvements.length > 15 && (
+                  {hasMoreMouvements && (
                     <div className={`px-4 py-2 text-center ${theme === 'light' ? 'bg-slate-100' : 'bg-dark-700'}`}>
                       <span className={`text-sm ${theme === 'light' ? 'text-slate-500' : 'text-dark-400'}`}>
-                        Affichage des 15 derniers mouvements sur {mouvements.length} au total
+                        Affichage des 15 derniers mouvements
                       </span>
                     </div>
                   )}
@@ -58,12 +58,16 @@ api.interceptors.response.use(
       try {
         const refreshToken = localStorage.getItem('refresh_token');
         if (refreshToken) {
-          const response = await axios.post('/auth/token/refresh/', {
+          const response = await axios.post(`${api.defaults.baseURL}/auth/token/refresh/`, {
             refresh: refreshToken,
           });
 
-          const { access } = response.data;
+          // Rotation: le refresh token utilisé est révoqué, garder le nouveau
+          const { access, refresh } = response.data;
           localStorage.setItem('access_token', access);
+          if (refresh) {
+            localStorage.setItem('refresh_token', refresh);
+          }
 
           // Retry la requête originale avec le nouveau token
           originalRequest.headers.Authorization = `Bearer ${access}`;
@@ -228,8 +232,8 @@ export const productService = {
   },
 
   // Obtenir les mouvements de stock d'un produit
-  getStockMovements: async (id) => {
-    const response = await api.get(`/products/${id}/mouvements/`);
+  getStockMovements: async (id, params = {}) => {
+    const response = await api.get(`/products/${id}/mouvements/`, { params });
     return response.data;
   },
 
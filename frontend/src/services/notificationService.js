@@ -64,11 +64,95 @@ export const markAllAsRead = async () => {
   }
 };
 
+/**
+ * Ouvre le flux temps réel (Server-Sent Events) des notifications et statuts de commande.
+ * EventSource ne pouvant pas envoyer l'en-tête Authorization, un ticket est demandé
+ * au backend puis passé dans l'URL. Après une erreur, le flux est rouvert avec un
+ * nouveau ticket à partir du dernier événement reçu; après plusieurs échecs
+ * consécutifs (ou si le navigateur ne gère pas EventSource), onFallback est appelé
+ * pour revenir à l'interrogation périodique.
+ * @param {Object} handlers - { notification, unread_count, order_status, resync, onFallback }
+ * @returns {Function} Fermeture du flux
+ */
+export const openNotificationStream = (handlers = {}) => {
+  const MAX_FAILURES = 3;
+  let source = null;
+  let lastEventId = null;
+  let failures = 0;
+  let received = false;
+  let closed = false;
+  let retryTimer = null;
+
+  const fallback = () => {
+    closed = true;
+    if (handlers.onFallback) handlers.onFallback();
+  };
+
+  if (typeof window.EventSource === 'undefined') {
+    fallback();
+    return () => {};
+  }
+
+  const listen = (type) => {
+    source.addEventListener(type, (event) => {
+      failures = 0;
+      received = true;
+      if (event.lastEventId) lastEventId = event.lastEventId;
+      if (handlers[type]) handlers[type](JSON.parse(event.data));
+    });
+  };
+
+  const connect = async () => {
+    try {
+      const { data } = await api.post('/auth/notifications/stream_ticket/');
+      if (closed) return;
+      const params = new URLSearchParams({ ticket: data.ticket });
+      if (lastEventId) params.set('last_event_id', lastEventId);
+      received = false;
+      source = new EventSource(`${api.defaults.baseURL}/auth/notifications/stream/?${params}`);
+      ['notification', 'unread_count', 'order_status', 'resync'].forEach(listen);
+      source.onerror = () => {
+        // Le ticket ne vaut qu'une minute: pas de reconnexion automatique du navigateur
+        // avec l'ancienne URL, mais un nouveau ticket (immédiatement après une fin
+        // normale du flux, avec délai croissant après un échec)
+        source.close();
+        if (received) {
+          connect();
+        } else {
+          reconnect();
+        }
+      };
+    } catch (error) {
+      console.error('Erreur ouverture du flux de notifications:', error);
+      reconnect();
+    }
+  };
+
+  const reconnect = () => {
+    if (closed) return;
+    failures += 1;
+    if (failures >= MAX_FAILURES) {
+      fallback();
+      return;
+    }
+    retryTimer = setTimeout(connect, 5000 * failures);
+  };
+
+  connect();
+
+  return () => {
+    closed = true;
+    clearTimeout(retryTimer);
+    if (source) source.close();
+  };
+};
+
 const notificationService = {
   getNotifications,
   getUnreadCount,
   markAsRead,
   markAllAsRead,
+  openNotificationStream,
 };
 
 export default notificationService;